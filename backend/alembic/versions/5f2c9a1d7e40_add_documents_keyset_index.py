@@ -0,0 +1,27 @@
+"""Add composite index for keyset pagination of documents
+
+Revision ID: 5f2c9a1d7e40
+Revises: b3443eedb87f
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2c9a1d7e40'
+down_revision: Union[str, None] = 'b3443eedb87f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_documents_user_created_id', 'documents', ['user_id', 'created_at', 'id'], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_documents_user_created_id', table_name='documents')
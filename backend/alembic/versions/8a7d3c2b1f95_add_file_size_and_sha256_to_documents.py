@@ -0,0 +1,30 @@
+"""Add file_size and content_sha256 to documents
+
+Revision ID: 8a7d3c2b1f95
+Revises: 5f2c9a1d7e40
+Create Date: 2026-10-19 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a7d3c2b1f95'
+down_revision: Union[str, None] = '5f2c9a1d7e40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('file_size', sa.Integer(), nullable=True))
+    op.add_column('documents', sa.Column('content_sha256', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_documents_content_sha256'), 'documents', ['content_sha256'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_documents_content_sha256'), table_name='documents')
+    op.drop_column('documents', 'content_sha256')
+    op.drop_column('documents', 'file_size')
@@ -0,0 +1,26 @@
+"""Add timeline to documents
+
+Revision ID: a9d4e1f6b238
+Revises: f7a1d2c8e5b4
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d4e1f6b238'
+down_revision: Union[str, None] = 'f7a1d2c8e5b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('timeline', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('documents', 'timeline')
@@ -0,0 +1,73 @@
+"""Add chunk_fingerprints, chunk_bands and chunk_duplicates
+
+Revision ID: b6e2d9f4a183
+Revises: c8f3a6e1b924
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e2d9f4a183'
+down_revision: Union[str, None] = 'c8f3a6e1b924'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'chunk_fingerprints',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('collection_name', sa.String(length=255), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('chunk_index', sa.Integer(), nullable=False),
+        sa.Column('signature', sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_chunk_fingerprints_collection_document', 'chunk_fingerprints',
+        ['collection_name', 'document_id', 'chunk_index'], unique=False,
+    )
+    op.create_index(op.f('ix_chunk_fingerprints_document_id'), 'chunk_fingerprints', ['document_id'], unique=False)
+    op.create_index(op.f('ix_chunk_fingerprints_user_id'), 'chunk_fingerprints', ['user_id'], unique=False)
+
+    op.create_table(
+        'chunk_bands',
+        sa.Column('key', sa.BigInteger(), autoincrement=False, nullable=False),
+        sa.Column('fingerprint_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['fingerprint_id'], ['chunk_fingerprints.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('key', 'fingerprint_id'),
+    )
+    op.create_index(op.f('ix_chunk_bands_fingerprint_id'), 'chunk_bands', ['fingerprint_id'], unique=False)
+
+    op.create_table(
+        'chunk_duplicates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('fingerprint_id', sa.Integer(), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('chunk_index', sa.Integer(), nullable=False),
+        sa.Column('page_number', sa.Integer(), nullable=False),
+        sa.Column('parent_id', sa.String(length=64), nullable=True),
+        sa.ForeignKeyConstraint(['fingerprint_id'], ['chunk_fingerprints.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_chunk_duplicates_document_id'), 'chunk_duplicates', ['document_id'], unique=False)
+    op.create_index(op.f('ix_chunk_duplicates_fingerprint_id'), 'chunk_duplicates', ['fingerprint_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_chunk_duplicates_fingerprint_id'), table_name='chunk_duplicates')
+    op.drop_index(op.f('ix_chunk_duplicates_document_id'), table_name='chunk_duplicates')
+    op.drop_table('chunk_duplicates')
+    op.drop_index(op.f('ix_chunk_bands_fingerprint_id'), table_name='chunk_bands')
+    op.drop_table('chunk_bands')
+    op.drop_index(op.f('ix_chunk_fingerprints_user_id'), table_name='chunk_fingerprints')
+    op.drop_index(op.f('ix_chunk_fingerprints_document_id'), table_name='chunk_fingerprints')
+    op.drop_index('ix_chunk_fingerprints_collection_document', table_name='chunk_fingerprints')
+    op.drop_table('chunk_fingerprints')
@@ -0,0 +1,28 @@
+"""Add ingest_batch_id to documents
+
+Revision ID: c41e6b9d2a87
+Revises: 8a7d3c2b1f95
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e6b9d2a87'
+down_revision: Union[str, None] = '8a7d3c2b1f95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('ingest_batch_id', sa.String(length=32), nullable=True))
+    op.create_index(op.f('ix_documents_ingest_batch_id'), 'documents', ['ingest_batch_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_documents_ingest_batch_id'), table_name='documents')
+    op.drop_column('documents', 'ingest_batch_id')
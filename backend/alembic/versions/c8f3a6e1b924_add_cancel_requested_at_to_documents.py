@@ -0,0 +1,26 @@
+"""Add cancel_requested_at to documents
+
+Revision ID: c8f3a6e1b924
+Revises: d5c8a3f1e702
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8f3a6e1b924'
+down_revision: Union[str, None] = 'd5c8a3f1e702'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('cancel_requested_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('documents', 'cancel_requested_at')
@@ -0,0 +1,33 @@
+"""Add ingest lease to documents
+
+Revision ID: d5c8a3f1e702
+Revises: a9d4e1f6b238
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5c8a3f1e702'
+down_revision: Union[str, None] = 'a9d4e1f6b238'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('documents', sa.Column('lease_owner', sa.String(length=128), nullable=True))
+    op.add_column('documents', sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+    # Existing rows start at 0 attempts
+    op.add_column('documents', sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+    op.create_index(op.f('ix_documents_lease_expires_at'), 'documents', ['lease_expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_documents_lease_expires_at'), table_name='documents')
+    op.drop_column('documents', 'attempts')
+    op.drop_column('documents', 'lease_expires_at')
+    op.drop_column('documents', 'lease_owner')
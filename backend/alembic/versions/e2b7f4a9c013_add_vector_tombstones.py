@@ -0,0 +1,36 @@
+"""Add vector_tombstones
+
+Revision ID: e2b7f4a9c013
+Revises: c41e6b9d2a87
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7f4a9c013'
+down_revision: Union[str, None] = 'c41e6b9d2a87'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'vector_tombstones',
+        sa.Column('document_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('document_id'),
+    )
+    op.create_index(op.f('ix_vector_tombstones_next_attempt_at'), 'vector_tombstones', ['next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_vector_tombstones_next_attempt_at'), table_name='vector_tombstones')
+    op.drop_table('vector_tombstones')
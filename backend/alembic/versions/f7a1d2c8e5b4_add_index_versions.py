@@ -0,0 +1,45 @@
+"""Add index_versions
+
+Revision ID: f7a1d2c8e5b4
+Revises: e2b7f4a9c013
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7a1d2c8e5b4'
+down_revision: Union[str, None] = 'e2b7f4a9c013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'index_versions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('collection_name', sa.String(length=255), nullable=False),
+        sa.Column('config', sa.Text(), nullable=False),
+        sa.Column('status', sa.Enum('BUILDING', 'ACTIVE', 'RETIRED', 'FAILED', name='indexversionstatus'), nullable=False),
+        sa.Column('cursor_document_id', sa.Integer(), nullable=False),
+        sa.Column('documents_indexed', sa.Integer(), nullable=False),
+        sa.Column('chunks_indexed', sa.Integer(), nullable=False),
+        sa.Column('error_message', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('activated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('collection_name'),
+    )
+    op.create_index(op.f('ix_index_versions_id'), 'index_versions', ['id'], unique=False)
+    op.create_index(op.f('ix_index_versions_status'), 'index_versions', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_index_versions_status'), table_name='index_versions')
+    op.drop_index(op.f('ix_index_versions_id'), table_name='index_versions')
+    op.drop_table('index_versions')
+    sa.Enum(name='indexversionstatus').drop(op.get_bind(), checkfirst=True)
@@ -13,19 +13,75 @@ class Settings(BaseSettings):
 
     # OCR
     tesseract_cmd: str = "tesseract"
+    # Concurrent page work (preprocess + OCR, rasterize, PDF generation) per process.
+    # 0 = one slot per CPU core ÷ ocr_threads_per_page
+    ocr_cpu_budget: int = 0
+    ocr_threads_per_page: int = 1  # OMP_THREAD_LIMIT for Tesseract, cv2.setNumThreads for OpenCV
+    ocr_small_document_pages: int = 3  # documents with at most this many pages left jump the queue
+    ocr_layout_analysis: bool = True  # skip blank pages and crop OCR to text regions
+    # Decode/rasterize each page so text reaches OCR at this x-height (px), resampling at most once.
+    # Tesseract's LSTM models normalise text lines to 36 px high, i.e. roughly a 16 px x-height
+    ocr_adaptive_resolution: bool = True
+    ocr_target_x_height: int = 16
+
+    # Pipeline time budgets in seconds (0 = unlimited). The page budget covers one page's
+    # layout analysis, preprocessing and OCR, but not its wait for a CPU slot
+    pipeline_page_timeout_seconds: int = 300
+    pipeline_document_timeout_seconds: int = 3600
+
+    # Ingestion workers. "inline": the API process runs pipelines itself;
+    # "queue": the API only enqueues and `python -m app.worker` processes claim documents
+    ingest_mode: str = "inline"
+    worker_concurrency: int = 2  # documents in flight per worker (page work is still CPU-budgeted)
+    worker_lease_seconds: int = 60
+    worker_poll_seconds: float = 2.0
+    worker_drain_seconds: int = 300  # on SIGTERM, wait this long for running documents before requeueing
+    worker_max_attempts: int = 3  # leases lost this many times (crashed/killed workers) → FAILED
 
     # Storage
     storage_dir: str = "./storage"
+    max_upload_bytes: int = 250 * 1024 * 1024
+    upload_chunk_max_bytes: int = 16 * 1024 * 1024
+    upload_session_ttl_seconds: int = 24 * 60 * 60
+    upload_session_gc_interval_seconds: int = 15 * 60
+
+    # Bulk ingestion
+    bulk_max_archive_bytes: int = 2 * 1024 * 1024 * 1024
+    bulk_max_extracted_bytes: int = 4 * 1024 * 1024 * 1024  # all members of one archive, uncompressed
+    bulk_max_files: int = 5000
+    bulk_ingest_concurrency: int = 2
 
     # ChromaDB Cloud
     chroma_api_key: str
     chroma_tenant: str
     chroma_database: str
     chroma_collection: str = "ocrtorag_chunks"
+    vector_cleanup_interval_seconds: int = 30
+    vector_cleanup_retry_base_seconds: int = 5
+    vector_cleanup_retry_max_seconds: int = 15 * 60
+    index_version_poll_seconds: int = 30
+    # Upserts go in batches of at most this many records / estimated JSON bytes, sent
+    # chroma_upsert_concurrency at a time; each batch is retried with exponential backoff.
+    # A single-node Chroma server stalls on more than 2 concurrent writes to one collection
+    chroma_upsert_batch_size: int = 250
+    chroma_upsert_batch_bytes: int = 4 * 1024 * 1024
+    chroma_upsert_concurrency: int = 2
+    chroma_upsert_retries: int = 3
+    chroma_upsert_retry_base_seconds: float = 0.5
+
+    # Re-index
+    reindex_batch_documents: int = 50
+    reindex_concurrency: int = 4
+    cohere_embed_cost_per_million_tokens: float = 0.10
 
     # App
     app_env: str = "development"
     allowed_origins: str = "http://localhost:5173,http://localhost:3000"
+    metrics_token: str = ""  # if set, GET /metrics requires "Authorization: Bearer <token>"
+    warmup_on_startup: bool = False  # pre-import SDKs / OCR stack in the background after startup
+    gzip_minimum_size: int = 1024
+    gzip_compresslevel: int = 6
+    document_total_cache_ttl_seconds: int = 30
 
     # RAG Settings
     parent_chunk_size: int = 1500
@@ -36,11 +92,44 @@ class Settings(BaseSettings):
     cohere_model: str = "embed-english-v3.0"
     gemini_model: str = "gemini-3-flash-preview"
     embed_dimension: int = 1024
+    # Near-duplicate child chunks share one stored vector, within a document and across
+    # a user's library (services/dedup.py); estimated Jaccard at which chunks count as duplicates
+    chunk_dedup_enabled: bool = True
+    chunk_dedup_threshold: float = 0.9
+
+    # Prompt context packing
+    context_token_budget: int = 3000
+    context_dedup_threshold: float = 0.8  # word-shingle Jaccard at which parents count as duplicates
+    context_trim_to_matches: bool = False
+    context_trim_window_sentences: int = 1
+
+    # Bounded thread pools: blocking vector-store / SDK calls, and CPU-bound work (bcrypt)
+    io_thread_pool_size: int = 32
+    cpu_thread_pool_size: int = 4
+
+    # Auth
+    admin_emails: str = ""  # comma-separated; may run re-index and other maintenance endpoints
+    principal_cache_ttl_seconds: int = 60
+    principal_cache_max_entries: int = 10000
+
+    # Batch queries
+    batch_query_max_questions: int = 100
+    batch_query_llm_concurrency: int = 8
+
+    # Answer cache
+    answer_cache_enabled: bool = True
+    answer_cache_ttl_seconds: int = 900
+    answer_cache_max_entries: int = 1024
+    answer_cache_semantic_threshold: float = 0.0  # 0 disables, e.g. 0.95 to reuse paraphrases
 
     @property
     def origins_list(self) -> list[str]:
         return [o.strip() for o in self.allowed_origins.split(",")]
 
+    @property
+    def admin_email_set(self) -> set[str]:
+        return {e.strip().lower() for e in self.admin_emails.split(",") if e.strip()}
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
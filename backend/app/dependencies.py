@@ -1,5 +1,6 @@
 """
 FastAPI dependency: get_current_user from Bearer JWT token.
+Resolved principals are served from an in-process TTL cache (principal_cache.py).
 """
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -7,9 +8,11 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from jose import JWTError
 
+from app.config import get_settings
 from app.database import get_db
 from app.models import User
 from app.services.auth_service import decode_token
+from app.services.principal_cache import principal_cache, Principal
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
@@ -39,8 +42,19 @@ async def get_current_user(
     except (JWTError, ValueError):
         raise credentials_exception
 
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    if not user or not user.is_active:
-        raise credentials_exception
-    return user
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
+        if not user or not user.is_active:
+            raise credentials_exception
+        principal = Principal.from_user(user)
+        principal_cache.put(principal)
+    return principal.to_user()
+
+
+async def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    """Authenticated user whose email is listed in settings.admin_emails."""
+    if current_user.email.lower() not in get_settings().admin_email_set:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required.")
+    return current_user
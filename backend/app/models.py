@@ -1,6 +1,8 @@
 import enum
 from datetime import datetime
-from sqlalchemy import String, Integer, Float, Text, DateTime, Enum as SAEnum, ForeignKey, Boolean
+from sqlalchemy import (
+    String, Integer, BigInteger, Float, Text, DateTime, LargeBinary, Enum as SAEnum, ForeignKey, Boolean, Index,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database import Base
 
@@ -34,6 +36,10 @@ class Document(Base):
     Chunk embeddings are stored in ChromaDB (not here).
     """
     __tablename__ = "documents"
+    __table_args__ = (
+        # Keyset pagination of a user's library: ORDER BY created_at DESC, id DESC
+        Index("ix_documents_user_created_id", "user_id", "created_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(
@@ -44,6 +50,9 @@ class Document(Base):
     file_type: Mapped[str] = mapped_column(String(20), nullable=False)
     original_path: Mapped[str] = mapped_column(String(500), nullable=True)
     pdf_path: Mapped[str] = mapped_column(String(500), nullable=True)
+    file_size: Mapped[int] = mapped_column(Integer, nullable=True)
+    content_sha256: Mapped[str] = mapped_column(String(64), nullable=True, index=True)
+    ingest_batch_id: Mapped[str] = mapped_column(String(32), nullable=True, index=True)
     page_count: Mapped[int] = mapped_column(Integer, default=0)
     chunk_count: Mapped[int] = mapped_column(Integer, default=0)
     ocr_confidence_avg: Mapped[float] = mapped_column(Float, default=0.0)
@@ -53,9 +62,114 @@ class Document(Base):
         SAEnum(DocumentStatus), default=DocumentStatus.PENDING
     )
     error_message: Mapped[str] = mapped_column(Text, nullable=True)
+    # Compact per-stage processing timeline (see services/timeline.py)
+    timeline: Mapped[str] = mapped_column(Text, nullable=True)
+    # Ingestion queue lease, held by the app.worker process running the pipeline
+    lease_owner: Mapped[str] = mapped_column(String(128), nullable=True)
+    lease_expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, index=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    # Set by POST /documents/{id}/cancel; running pipelines poll it (services/cancellation.py)
+    cancel_requested_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
     )
 
     owner: Mapped["User"] = relationship("User", back_populates="documents")
+
+
+class IndexVersionStatus(str, enum.Enum):
+    BUILDING = "building"
+    ACTIVE = "active"
+    RETIRED = "retired"
+    FAILED = "failed"
+
+
+class IndexVersion(Base):
+    """
+    One ChromaDB collection built with a given chunking/embedding configuration.
+    Exactly one version is ACTIVE (serves searches); a re-index builds a new one and
+    swaps it in. No rows means the legacy `settings.chroma_collection` is active.
+    """
+    __tablename__ = "index_versions"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
+    collection_name: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
+    config: Mapped[str] = mapped_column(Text, nullable=False)  # JSON of the chunking/embedding settings
+    status: Mapped[IndexVersionStatus] = mapped_column(
+        SAEnum(IndexVersionStatus), default=IndexVersionStatus.BUILDING, index=True
+    )
+    cursor_document_id: Mapped[int] = mapped_column(Integer, default=0)  # resume point
+    documents_indexed: Mapped[int] = mapped_column(Integer, default=0)
+    chunks_indexed: Mapped[int] = mapped_column(Integer, default=0)
+    error_message: Mapped[str] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    activated_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+
+class VectorTombstone(Base):
+    """
+    A deleted document whose chunks may still be in ChromaDB.
+    Written in the same transaction that deletes the Document; the vector cleanup
+    worker removes the chunks and then the tombstone, retrying with backoff.
+    """
+    __tablename__ = "vector_tombstones"
+
+    document_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class ChunkFingerprint(Base):
+    """
+    MinHash signature of a child chunk whose vector is stored in a collection.
+    Near-duplicate chunks of the same user share that vector (see services/dedup.py).
+    document_id has no foreign key: after a delete, the vector cleanup worker hands
+    the fingerprint over to one of its duplicates before removing the document's chunks.
+    """
+    __tablename__ = "chunk_fingerprints"
+    __table_args__ = (
+        Index("ix_chunk_fingerprints_collection_document", "collection_name", "document_id", "chunk_index"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    collection_name: Mapped[str] = mapped_column(String(255), nullable=False)
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    document_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    chunk_index: Mapped[int] = mapped_column(Integer, nullable=False)
+    signature: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+    bands: Mapped[list["ChunkBand"]] = relationship("ChunkBand", cascade="all, delete-orphan")
+    duplicates: Mapped[list["ChunkDuplicate"]] = relationship(
+        "ChunkDuplicate", back_populates="fingerprint", cascade="all, delete-orphan"
+    )
+
+
+class ChunkBand(Base):
+    """One LSH band of a fingerprint; the key also encodes the user and the collection."""
+    __tablename__ = "chunk_bands"
+
+    key: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    fingerprint_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("chunk_fingerprints.id", ondelete="CASCADE"), primary_key=True, index=True
+    )
+
+
+class ChunkDuplicate(Base):
+    """A child chunk that isn't stored because it shares the vector of `fingerprint`."""
+    __tablename__ = "chunk_duplicates"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    fingerprint_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("chunk_fingerprints.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    document_id: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    chunk_index: Mapped[int] = mapped_column(Integer, nullable=False)
+    page_number: Mapped[int] = mapped_column(Integer, nullable=False)
+    parent_id: Mapped[str] = mapped_column(String(64), nullable=True)
+
+    fingerprint: Mapped["ChunkFingerprint"] = relationship("ChunkFingerprint", back_populates="duplicates")
@@ -0,0 +1,50 @@
+"""
+Admin router: maintenance operations over the shared vector index.
+Restricted to users listed in settings.admin_emails.
+"""
+from fastapi import APIRouter, Depends, BackgroundTasks, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.models import IndexVersion, User
+from app.schemas import IndexVersionResponse, ReindexEstimate
+from app.dependencies import get_admin_user
+from app.services import reindex
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+@router.get("/index-versions", response_model=list[IndexVersionResponse])
+async def list_index_versions(
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(get_admin_user),
+):
+    """All index versions, newest first. The ACTIVE one serves searches."""
+    result = await db.execute(select(IndexVersion).order_by(IndexVersion.id.desc()))
+    return result.scalars().all()
+
+
+@router.post("/reindex/estimate", response_model=ReindexEstimate)
+async def estimate_reindex(
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(get_admin_user),
+):
+    """Dry run: how much chunking/embedding work a re-index with current settings would do."""
+    return await reindex.estimate(db)
+
+
+@router.post("/reindex", response_model=IndexVersionResponse, status_code=202)
+async def start_reindex(
+    background_tasks: BackgroundTasks,
+    concurrency: int | None = Query(None, ge=1, le=32),
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(get_admin_user),
+):
+    """
+    Re-chunk and re-embed stored OCR text into a new collection, then swap it in.
+    Calling this again resumes an interrupted build from its cursor.
+    """
+    version = await reindex.start_or_resume(db)
+    background_tasks.add_task(reindex.run_reindex, version.id, concurrency)
+    return version
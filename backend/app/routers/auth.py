@@ -6,7 +6,7 @@ from sqlalchemy import select
 from app.database import get_db
 from app.models import User
 from app.schemas import SignupRequest, LoginRequest, TokenResponse, UserResponse
-from app.services.auth_service import hash_password, verify_password, create_access_token
+from app.services.auth_service import hash_password_async, verify_password_async, create_access_token
 from app.dependencies import get_current_user
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -31,7 +31,7 @@ async def signup(body: SignupRequest, db: AsyncSession = Depends(get_db)):
     user = User(
         name=body.name,
         email=body.email,
-        password_hash=hash_password(body.password),
+        password_hash=await hash_password_async(body.password),
     )
     db.add(user)
     await db.commit()
@@ -47,7 +47,7 @@ async def login(body: LoginRequest, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == body.email))
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(body.password, user.password_hash):
+    if not user or not await verify_password_async(body.password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password.",
@@ -1,42 +1,72 @@
-"""Documents router: list, detail, download — scoped to the authenticated user."""
+"""Documents router: list, detail, download, cancel — scoped to the authenticated user."""
+from datetime import datetime
 from pathlib import Path
-from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
 from fastapi.responses import FileResponse
 from sse_starlette.sse import EventSourceResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select
 import asyncio
 import json
 
 from app.database import get_db, AsyncSessionLocal
 from app.models import Document, User, DocumentStatus
-from app.schemas import DocumentResponse, DocumentListResponse
+from app.schemas import (
+    DocumentResponse, DocumentListResponse, DocumentTimelineResponse, TimelineStatsResponse,
+)
 from app.dependencies import get_current_user
-from app.services.chroma_store import delete_document_chunks
+from app.services import cancellation, vector_cleanup, timeline
+from app.services.answer_cache import invalidate_documents
+from app.services.document_listing import (
+    list_document_summaries, get_document_total, invalidate_document_total,
+)
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
 
 @router.get("", response_model=DocumentListResponse)
 async def list_documents(
-    skip: int = 0,
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0),
+    include_total: bool = True,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Return paginated documents belonging to the current user."""
+    """
+    Return the current user's documents, newest first, without OCR text.
+    Pass the returned next_cursor to fetch the following page (keyset pagination);
+    `skip` is kept for older clients.
+    """
+    try:
+        docs, next_cursor = await list_document_summaries(
+            db, current_user.id, limit=limit, cursor=cursor, skip=skip
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    total = await get_document_total(db, current_user.id) if include_total else None
+    return DocumentListResponse(documents=docs, total=total, next_cursor=next_cursor)
+
+
+@router.get("/timeline/stats", response_model=TimelineStatsResponse)
+async def timeline_stats(
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Per-stage p50/p95/p99 over the current user's most recently processed documents."""
     result = await db.execute(
-        select(Document)
-        .where(Document.user_id == current_user.id)
-        .order_by(Document.created_at.desc())
-        .offset(skip).limit(limit)
+        select(Document.timeline)
+        .where(Document.user_id == current_user.id, Document.timeline.is_not(None))
+        .order_by(Document.updated_at.desc())
+        .limit(limit)
     )
-    docs = result.scalars().all()
-    count_result = await db.execute(
-        select(func.count()).select_from(Document).where(Document.user_id == current_user.id)
+    timelines = [timeline.parse(raw) for raw in result.scalars()]
+    return TimelineStatsResponse(
+        documents=len(timelines),
+        stages=timeline.stage_percentiles(timelines),
     )
-    total = count_result.scalar()
-    return DocumentListResponse(documents=list(docs), total=total)
 
 
 @router.get("/{document_id}", response_model=DocumentResponse)
@@ -55,20 +85,44 @@ async def get_document(
     return doc
 
 
+@router.get("/{document_id}/timeline", response_model=DocumentTimelineResponse)
+async def get_document_timeline(
+    document_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Stage-by-stage processing timeline recorded the last time the document was ingested."""
+    result = await db.execute(
+        select(Document.status, Document.timeline)
+        .where(Document.id == document_id, Document.user_id == current_user.id)
+    )
+    row = result.one_or_none()
+    if not row:
+        raise HTTPException(status_code=404, detail="Document not found.")
+    parsed = timeline.parse(row.timeline)
+    if parsed is None:
+        raise HTTPException(status_code=404, detail="No timeline recorded for this document yet.")
+    return DocumentTimelineResponse(document_id=document_id, status=row.status, **parsed)
+
+
 @router.delete("/{document_id}")
 async def delete_document(
     document_id: int,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    """Delete a document + ChromaDB chunks (only owner can delete)."""
+    """
+    Delete a document (only owner can delete). Its ChromaDB chunks are tombstoned
+    and removed by the background vector cleanup worker.
+    """
     result = await db.execute(
         select(Document).where(Document.id == document_id, Document.user_id == current_user.id)
     )
     doc = result.scalar_one_or_none()
     if not doc:
         raise HTTPException(status_code=404, detail="Document not found.")
-    delete_document_chunks(document_id)
+    await vector_cleanup.enqueue(db, [document_id])
+    invalidate_documents([document_id])
     
     # Delete physical files
     if doc.original_path:
@@ -78,9 +132,42 @@ async def delete_document(
         
     await db.delete(doc)
     await db.commit()
+    # A pipeline in another process notices the missing row at its next check
+    cancellation.cancel(document_id, cancellation.DOCUMENT_DELETED)
+    vector_cleanup.wake()
+    invalidate_document_total(current_user.id)
     return {"message": "Document deleted successfully."}
 
 
+@router.post("/{document_id}/cancel", response_model=DocumentResponse)
+async def cancel_document(
+    document_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Stop processing a document. A queued document is marked cancelled at once; a running
+    pipeline stops at its next check (within seconds) and then marks it cancelled.
+    """
+    result = await db.execute(
+        select(Document).where(Document.id == document_id, Document.user_id == current_user.id)
+    )
+    doc = result.scalar_one_or_none()
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found.")
+    if doc.status in (DocumentStatus.COMPLETED, DocumentStatus.FAILED):
+        raise HTTPException(status_code=409, detail=f"Document is already {doc.status.value}.")
+
+    doc.cancel_requested_at = datetime.utcnow()
+    if doc.status == DocumentStatus.PENDING:
+        doc.status = DocumentStatus.FAILED
+        doc.processing_step = "Cancelled"
+        doc.error_message = cancellation.CANCELLED_BY_USER
+    await db.commit()
+    cancellation.cancel(document_id)
+    return doc
+
+
 @router.get("/{document_id}/download")
 async def download_pdf(
     document_id: int,
@@ -0,0 +1,44 @@
+"""
+GET /metrics — Prometheus text exposition of this process's metrics (app/utils/metrics.py).
+Cache statistics and the pending-document queue depth are sampled at scrape time.
+"""
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.database import get_db
+from app.models import Document, DocumentStatus
+from app.services.answer_cache import answer_cache
+from app.services.principal_cache import principal_cache
+from app.utils.metrics import REGISTRY, QUEUE_DEPTH, CACHE_HIT_RATE, CACHE_ENTRIES
+
+router = APIRouter(tags=["system"])
+settings = get_settings()
+
+
+def _collect_cache_stats() -> None:
+    for name, cache in (("answer", answer_cache), ("principal", principal_cache)):
+        stats = cache.stats()
+        CACHE_HIT_RATE.set(stats["hit_rate"], cache=name)
+        CACHE_ENTRIES.set(stats["entries"], cache=name)
+
+
+REGISTRY.add_collector(_collect_cache_stats)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request, db: AsyncSession = Depends(get_db)):
+    if settings.metrics_token:
+        supplied = request.headers.get("authorization", "").removeprefix("Bearer ")
+        if not secrets.compare_digest(supplied, settings.metrics_token):
+            raise HTTPException(status_code=401, detail="Invalid metrics token.")
+
+    pending = await db.execute(
+        select(func.count()).select_from(Document).where(Document.status == DocumentStatus.PENDING)
+    )
+    QUEUE_DEPTH.set(pending.scalar())
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,40 +1,42 @@
 """Query router: RAG queries scoped to the current user's documents."""
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import logging
+import time
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sse_starlette.sse import EventSourceResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.database import get_db
+from app.database import get_db, AsyncSessionLocal
 from app.models import Document, User
-from app.schemas import QueryRequest, QueryResponse, SourceChunk
-from app.dependencies import get_current_user
-from app.services.rag import query_rag
+from app.schemas import (
+    QueryRequest, QueryResponse, SourceChunk, AnswerCacheStats,
+    BatchQueryRequest, BatchQueryResponse, BatchQueryItem,
+)
+from app.config import get_settings
+from app.dependencies import get_admin_user, get_current_user
+from app.services.rag import query_rag, stream_rag, query_rag_batch
+from app.services.answer_cache import answer_cache
 
 router = APIRouter(prefix="/query", tags=["query"])
+logger = logging.getLogger("ocrtorag.query")
+settings = get_settings()
 
 
-@router.post("", response_model=QueryResponse)
-async def query_documents(
-    request: QueryRequest,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    """
-    RAG query — automatically scoped to the current user's documents only.
-    Optionally further filtered by document_ids (must belong to the user).
-    """
-    if not request.query.strip():
-        raise HTTPException(status_code=422, detail="Query cannot be empty.")
-
-    # Resolve which document IDs to search — always restrict to current user
-    if request.document_ids:
+async def _resolve_allowed_ids(
+    db: AsyncSession,
+    current_user: User,
+    document_ids: list[int] | None,
+) -> list[int]:
+    """Resolve which document IDs to search — always restricted to the current user."""
+    if document_ids:
         result = await db.execute(
             select(Document.id).where(
                 Document.user_id == current_user.id,
-                Document.id.in_(request.document_ids),
+                Document.id.in_(document_ids),
                 Document.status == "completed",
             )
         )
-        allowed_ids = [row[0] for row in result.fetchall()]
     else:
         result = await db.execute(
             select(Document.id).where(
@@ -42,25 +44,18 @@ async def query_documents(
                 Document.status == "completed",
             )
         )
-        allowed_ids = [row[0] for row in result.fetchall()]
+    allowed_ids = [row[0] for row in result.fetchall()]
 
     if not allowed_ids:
         raise HTTPException(
             status_code=404,
             detail="No completed documents found. Upload and wait for processing to finish.",
         )
+    return allowed_ids
 
-    try:
-        rag_result = await query_rag(
-            db=db,
-            query=request.query,
-            top_k=request.top_k,
-            document_ids=allowed_ids,
-        )
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
 
-    sources = [
+def _to_source_chunks(chunks: list[dict]) -> list[SourceChunk]:
+    return [
         SourceChunk(
             document_id=chunk["document_id"],
             document_name=chunk["document_name"],
@@ -69,12 +64,164 @@ async def query_documents(
             page_number=chunk["page_number"],
             similarity_score=round(chunk.get("similarity", 0.0), 4),
         )
-        for chunk in rag_result["sources"]
+        for chunk in chunks
     ]
 
+
+@router.post("", response_model=QueryResponse)
+async def query_documents(
+    request: QueryRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    RAG query — automatically scoped to the current user's documents only.
+    Optionally further filtered by document_ids (must belong to the user).
+    """
+    if not request.query.strip():
+        raise HTTPException(status_code=422, detail="Query cannot be empty.")
+
+    started = time.perf_counter()
+    allowed_ids = await _resolve_allowed_ids(db, current_user, request.document_ids)
+
+    try:
+        rag_result = await query_rag(
+            db=db,
+            query=request.query,
+            top_k=request.top_k,
+            document_ids=allowed_ids,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
+
+    # The blocking endpoint sends nothing until the answer is complete: TTFB == total
+    total_ms = (time.perf_counter() - started) * 1000
+    response.headers["Server-Timing"] = f"total;dur={total_ms:.1f}"
+    logger.info("query mode=blocking ttfb_ms=%.1f total_ms=%.1f", total_ms, total_ms)
+
     return QueryResponse(
         query=request.query,
         answer=rag_result["answer"],
-        sources=sources,
+        sources=_to_source_chunks(rag_result["sources"]),
         model=rag_result["model"],
+        cached=rag_result.get("cached", False),
+        stats=rag_result.get("stats"),
+    )
+
+
+@router.post("/stream")
+async def query_documents_stream(
+    request: Request,
+    body: QueryRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Streaming RAG query over Server-Sent Events.
+    Events: `sources` (retrieved chunks), `token` (answer deltas), `done` (final answer
+    plus ttfb_ms/total_ms), or `error`.
+    """
+    if not body.query.strip():
+        raise HTTPException(status_code=422, detail="Query cannot be empty.")
+
+    started = time.perf_counter()
+    allowed_ids = await _resolve_allowed_ids(db, current_user, body.document_ids)
+
+    async def event_generator():
+        ttfb_ms = None
+        try:
+            # The request-scoped session is released before the body streams — use our own
+            async with AsyncSessionLocal() as session:
+                async for event, payload in stream_rag(
+                    db=session,
+                    query=body.query,
+                    top_k=body.top_k,
+                    document_ids=allowed_ids,
+                ):
+                    if await request.is_disconnected():
+                        break
+
+                    if event == "sources":
+                        payload = {
+                            "sources": [s.model_dump() for s in _to_source_chunks(payload["sources"])]
+                        }
+                    elif event == "token" and ttfb_ms is None:
+                        ttfb_ms = (time.perf_counter() - started) * 1000
+                    elif event == "done":
+                        total_ms = (time.perf_counter() - started) * 1000
+                        payload = {
+                            **payload,
+                            "query": body.query,
+                            "ttfb_ms": round(ttfb_ms if ttfb_ms is not None else total_ms, 1),
+                            "total_ms": round(total_ms, 1),
+                        }
+                        logger.info(
+                            "query mode=stream ttfb_ms=%.1f total_ms=%.1f",
+                            payload["ttfb_ms"], total_ms,
+                        )
+                    yield {"event": event, "data": json.dumps(payload)}
+        except Exception as e:
+            yield {"event": "error", "data": json.dumps({"detail": f"Query failed: {str(e)}"})}
+
+    return EventSourceResponse(event_generator())
+
+
+@router.post("/batch", response_model=BatchQueryResponse)
+async def query_documents_batch(
+    request: BatchQueryRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Answer many questions over one document scope (e.g. extraction templates).
+    Results are returned in question order; a failed generation sets that item's `error`.
+    """
+    queries = request.queries
+    if not queries or any(not q.strip() for q in queries):
+        raise HTTPException(status_code=422, detail="Queries cannot be empty.")
+    if len(queries) > settings.batch_query_max_questions:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {settings.batch_query_max_questions} queries per batch.",
+        )
+
+    started = time.perf_counter()
+    allowed_ids = await _resolve_allowed_ids(db, current_user, request.document_ids)
+
+    try:
+        rag_results = await query_rag_batch(
+            db=db,
+            queries=queries,
+            top_k=request.top_k,
+            document_ids=allowed_ids,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
+
+    total_ms = (time.perf_counter() - started) * 1000
+    response.headers["Server-Timing"] = f"total;dur={total_ms:.1f}"
+    logger.info("query mode=batch questions=%d total_ms=%.1f", len(queries), total_ms)
+
+    return BatchQueryResponse(
+        results=[
+            BatchQueryItem(
+                query=q,
+                answer=r["answer"],
+                sources=_to_source_chunks(r["sources"]),
+                model=r["model"],
+                cached=r.get("cached", False),
+                stats=r.get("stats"),
+                error=r.get("error"),
+            )
+            for q, r in zip(queries, rag_results)
+        ],
+        model=settings.gemini_model,
     )
+
+
+@router.get("/cache/stats", response_model=AnswerCacheStats)
+async def answer_cache_stats(_: User = Depends(get_admin_user)):
+    """Hit rate and latency saved by the in-process answer cache."""
+    return AnswerCacheStats(**answer_cache.stats())
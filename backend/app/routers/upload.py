@@ -1,15 +1,35 @@
-"""Upload router: accepts files, runs ingestion pipeline for authenticated user."""
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, BackgroundTasks
+"""
+Upload router: accepts files, runs ingestion pipeline for authenticated user.
+Small files use the single-request POST /upload; very large scans can use the
+resumable session protocol under /upload/sessions; ZIP/TAR archives of many
+documents go through POST /upload/bulk.
+"""
+import asyncio
+from datetime import datetime
+from pathlib import Path
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, BackgroundTasks, Request, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import get_settings
 from app.database import get_db
 from app.models import Document, DocumentStatus, User
-from app.schemas import UploadResponse
+from app.schemas import (
+    UploadResponse, UploadSessionCreate, UploadSessionResponse,
+    BulkIngestResponse, BulkIngestProgress,
+)
 from app.dependencies import get_current_user
-from app.utils.file_utils import validate_file_extension, generate_unique_filename, save_upload
+from app.utils.file_utils import (
+    validate_file_extension, generate_unique_filename, stream_upload, UploadTooLargeError,
+    SavedUpload,
+)
+from app.services import upload_sessions, bulk_ingest
+from app.services.upload_sessions import UploadSessionError, UploadSessionNotFound
 from app.services.pipeline import run_pipeline
+from app.services.document_listing import invalidate_document_total
+from app.utils.metrics import BYTES_PROCESSED
 
 router = APIRouter(prefix="/upload", tags=["upload"])
+settings = get_settings()
 
 
 @router.post("", response_model=UploadResponse)
@@ -25,38 +45,230 @@ async def upload_document(
     except ValueError as e:
         raise HTTPException(status_code=422, detail=str(e))
 
-    contents = await file.read()
-    if len(contents) == 0:
-        raise HTTPException(status_code=422, detail="Uploaded file is empty.")
-
     unique_name = generate_unique_filename(file.filename)
-    saved_path = await save_upload(contents, unique_name)
+    try:
+        saved = await stream_upload(file, unique_name, ext)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    doc = await _create_document(db, current_user, file.filename, ext, saved)
+    if _runs_inline():
+        background_tasks.add_task(
+            _run_pipeline_bg,
+            document_id=doc.id,
+            file_path=saved.path,
+            file_type=ext,
+        )
 
+    return UploadResponse(
+        message="File uploaded successfully. Processing started.",
+        document=doc,
+    )
+
+
+async def _create_document(
+    db: AsyncSession,
+    user: User,
+    original_filename: str,
+    ext: str,
+    saved: SavedUpload,
+) -> Document:
     doc = Document(
-        user_id=current_user.id,
-        filename=unique_name,
-        original_filename=file.filename,
+        user_id=user.id,
+        filename=Path(saved.path).name,
+        original_filename=original_filename,
         file_type=ext,
-        original_path=saved_path,
+        original_path=saved.path,
+        file_size=saved.size,
+        content_sha256=saved.sha256,
         status=DocumentStatus.PENDING,
     )
     db.add(doc)
     await db.commit()
     await db.refresh(doc)
+    invalidate_document_total(user.id)
+    BYTES_PROCESSED.inc(saved.size, kind="upload")
+    return doc
 
-    background_tasks.add_task(
-        _run_pipeline_bg,
-        document_id=doc.id,
-        file_path=saved_path,
-        file_type=ext,
+
+# ─── Resumable uploads ────────────────────────────────────────────────────────
+# 1. POST   /upload/sessions                          → session id
+# 2. PUT    /upload/sessions/{id}/chunks?offset=      → raw chunk bytes, appended in order
+# 3. GET    /upload/sessions/{id}                     → received_bytes (where to resume)
+# 4. POST   /upload/sessions/{id}/complete            → creates the Document, starts pipeline
+
+def _session_response(session: upload_sessions.UploadSession) -> UploadSessionResponse:
+    return UploadSessionResponse(
+        id=session.id,
+        filename=session.filename,
+        total_size=session.total_size,
+        received_bytes=session.received_bytes,
+        max_chunk_bytes=settings.upload_chunk_max_bytes,
+        expires_at=datetime.utcfromtimestamp(session.expires_at),
+        complete=session.received_bytes == session.total_size,
     )
 
+
+def _get_session_or_404(session_id: str, user: User) -> upload_sessions.UploadSession:
+    try:
+        return upload_sessions.get_session(session_id, user.id)
+    except UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload session not found or expired.")
+
+
+@router.post("/sessions", response_model=UploadSessionResponse, status_code=201)
+async def create_upload_session(
+    body: UploadSessionCreate,
+    current_user: User = Depends(get_current_user),
+):
+    """Start a resumable upload of `total_size` bytes."""
+    try:
+        session = upload_sessions.create_session(current_user.id, body.filename, body.total_size)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return _session_response(session)
+
+
+@router.get("/sessions/{session_id}", response_model=UploadSessionResponse)
+async def get_upload_session(
+    session_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    """Report how many bytes were received — clients resume from received_bytes."""
+    return _session_response(_get_session_or_404(session_id, current_user))
+
+
+@router.put("/sessions/{session_id}/chunks", response_model=UploadSessionResponse)
+async def put_upload_chunk(
+    request: Request,
+    session_id: str,
+    offset: int = Query(..., ge=0),
+    current_user: User = Depends(get_current_user),
+):
+    """Append one chunk (raw request body) at `offset`. Re-sending a received chunk is a no-op."""
+    session = _get_session_or_404(session_id, current_user)
+    try:
+        session = await upload_sessions.append_chunk(session, offset, request.stream())
+    except UploadSessionError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return _session_response(session)
+
+
+@router.post("/sessions/{session_id}/complete", response_model=UploadResponse)
+async def complete_upload_session(
+    session_id: str,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Finalize a fully received upload: create the Document and start processing."""
+    session = _get_session_or_404(session_id, current_user)
+    try:
+        saved = await upload_sessions.finalize_session(session)
+    except UploadSessionError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    doc = await _create_document(db, current_user, session.filename, session.file_type, saved)
+    if _runs_inline():
+        background_tasks.add_task(
+            _run_pipeline_bg,
+            document_id=doc.id,
+            file_path=saved.path,
+            file_type=session.file_type,
+        )
     return UploadResponse(
         message="File uploaded successfully. Processing started.",
         document=doc,
     )
 
 
+@router.delete("/sessions/{session_id}")
+async def abort_upload_session(
+    session_id: str,
+    current_user: User = Depends(get_current_user),
+):
+    """Abandon a resumable upload and delete its partial data."""
+    _get_session_or_404(session_id, current_user)
+    upload_sessions.discard_session(session_id)
+    return {"message": "Upload session deleted."}
+
+
+# ─── Bulk ingestion ───────────────────────────────────────────────────────────
+
+@router.post("/bulk", response_model=BulkIngestResponse, status_code=202)
+async def upload_bulk(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Upload a ZIP or TAR archive of documents. Supported files become one batch;
+    poll GET /upload/bulk/{batch_id} for progress.
+    """
+    name = (file.filename or "").lower()
+    suffix = next((s for s in bulk_ingest.ARCHIVE_SUFFIXES if name.endswith(s)), None)
+    if suffix is None:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unsupported archive type. Allowed: {', '.join(bulk_ingest.ARCHIVE_SUFFIXES)}",
+        )
+
+    try:
+        archive = await stream_upload(
+            file, generate_unique_filename(file.filename), suffix,
+            max_bytes=settings.bulk_max_archive_bytes,
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    try:
+        items, skipped = await asyncio.to_thread(bulk_ingest.extract_archive, archive.path)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (ValueError, OSError) as e:
+        raise HTTPException(status_code=422, detail=f"Could not read archive: {e}")
+    finally:
+        Path(archive.path).unlink(missing_ok=True)
+    if not items:
+        raise HTTPException(status_code=422, detail="Archive contains no supported documents.")
+
+    batch_id, docs = await bulk_ingest.create_documents(db, current_user.id, items)
+    invalidate_document_total(current_user.id)
+    if _runs_inline():
+        background_tasks.add_task(
+            bulk_ingest.process_documents,
+            [(doc.id, doc.original_path, doc.file_type) for doc in docs],
+        )
+    return BulkIngestResponse(batch_id=batch_id, documents=docs, skipped=skipped)
+
+
+@router.get("/bulk/{batch_id}", response_model=BulkIngestProgress)
+async def get_bulk_progress(
+    batch_id: str,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Per-status document counts for a bulk batch."""
+    progress = await bulk_ingest.batch_progress(db, current_user.id, batch_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Batch not found.")
+    return progress
+
+
+def _runs_inline() -> bool:
+    """In "queue" mode uploads are only enqueued; `python -m app.worker` processes them."""
+    return settings.ingest_mode != "queue"
+
+
 async def _run_pipeline_bg(document_id: int, file_path: str, file_type: str):
     from app.database import AsyncSessionLocal
     async with AsyncSessionLocal() as session:
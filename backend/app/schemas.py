@@ -43,6 +43,8 @@ class DocumentResponse(BaseModel):
     filename: str
     original_filename: str
     file_type: str
+    file_size: Optional[int] = None
+    content_sha256: Optional[str] = None
     page_count: int
     chunk_count: int
     ocr_confidence_avg: float
@@ -57,9 +59,62 @@ class DocumentResponse(BaseModel):
         from_attributes = True
 
 
+class DocumentSummary(BaseModel):
+    """DocumentResponse without ocr_text — used for library listings."""
+    id: int
+    filename: str
+    original_filename: str
+    file_type: str
+    file_size: Optional[int] = None
+    page_count: int
+    chunk_count: int
+    ocr_confidence_avg: float
+    processing_step: Optional[str] = None
+    status: DocumentStatus
+    error_message: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 class DocumentListResponse(BaseModel):
-    documents: list[DocumentResponse]
-    total: int
+    documents: list[DocumentSummary]
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+class TimelineSpan(BaseModel):
+    stage: str
+    page: Optional[int] = None
+    start_ms: int
+    end_ms: int
+    duration_ms: int
+    cpu_ms: int
+    bytes: int
+    retries: int
+
+
+class DocumentTimelineResponse(BaseModel):
+    document_id: int
+    status: DocumentStatus
+    started_at: float
+    total_ms: int
+    spans: list[TimelineSpan]
+
+
+class StageStats(BaseModel):
+    count: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class TimelineStatsResponse(BaseModel):
+    documents: int
+    stages: dict[str, StageStats]
 
 
 # ─── Query Schemas ────────────────────────────────────────────────────────────
@@ -79,11 +134,45 @@ class SourceChunk(BaseModel):
     similarity_score: float
 
 
+class QueryStats(BaseModel):
+    prompt_tokens: int
+    prompt_chars: int
+    context_chunks: int
+    context_chunks_dropped: int
+    generation_ms: float
+
+
 class QueryResponse(BaseModel):
     query: str
     answer: str
     sources: list[SourceChunk]
     model: str
+    cached: bool = False
+    stats: Optional[QueryStats] = None
+
+
+class BatchQueryRequest(BaseModel):
+    queries: list[str]
+    top_k: int = 5
+    document_ids: Optional[list[int]] = None
+
+
+class BatchQueryItem(QueryResponse):
+    error: Optional[str] = None
+
+
+class BatchQueryResponse(BaseModel):
+    results: list[BatchQueryItem]
+    model: str
+
+
+class AnswerCacheStats(BaseModel):
+    entries: int
+    hits: int
+    semantic_hits: int
+    misses: int
+    hit_rate: float
+    latency_saved_ms: float
 
 
 # ─── Upload Response ──────────────────────────────────────────────────────────
@@ -91,3 +180,72 @@ class QueryResponse(BaseModel):
 class UploadResponse(BaseModel):
     message: str
     document: DocumentResponse
+
+
+class UploadSessionCreate(BaseModel):
+    filename: str
+    total_size: int
+
+
+class UploadSessionResponse(BaseModel):
+    id: str
+    filename: str
+    total_size: int
+    received_bytes: int
+    max_chunk_bytes: int
+    expires_at: datetime
+    complete: bool
+
+
+# ─── Bulk Ingestion ───────────────────────────────────────────────────────────
+
+class BulkSkippedFile(BaseModel):
+    name: str
+    reason: str
+
+
+class BulkIngestResponse(BaseModel):
+    batch_id: str
+    documents: list[DocumentSummary]
+    skipped: list[BulkSkippedFile]
+
+
+class BulkIngestProgress(BaseModel):
+    batch_id: str
+    total: int
+    pending: int
+    processing: int
+    completed: int
+    failed: int
+    done: bool
+
+
+# ─── Re-index ─────────────────────────────────────────────────────────────────
+
+class IndexVersionResponse(BaseModel):
+    id: int
+    collection_name: str
+    status: str
+    cursor_document_id: int
+    documents_indexed: int
+    chunks_indexed: int
+    error_message: Optional[str] = None
+    created_at: datetime
+    activated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ReindexEstimate(BaseModel):
+    config: dict
+    documents: int
+    pages: int
+    parent_chunks: int
+    child_chunks: int
+    duplicate_child_chunks: int  # near-duplicates that would share a stored vector
+    stored_vectors: int
+    index_reduction: float       # fraction of chunks that don't get a vector of their own
+    embed_calls: int
+    embed_tokens: int
+    estimated_cost_usd: float
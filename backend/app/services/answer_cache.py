@@ -0,0 +1,191 @@
+"""
+In-process answer cache for RAG queries.
+Keyed by normalized query + sorted document IDs + top_k + model/prompt version,
+with an optional semantic match on the query embedding over the same document set.
+Entries expire by TTL and are dropped when any document in their set changes.
+"""
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Sentinel scope used for queries that were not restricted to specific documents
+_ALL_DOCUMENTS = -1
+
+CacheKey = tuple[str, tuple[int, ...], int, str, str]
+
+
+@dataclass
+class _CacheEntry:
+    result: dict
+    embedding: list[float] | None
+    compute_ms: float   # the whole query, embedding included
+    embed_ms: float     # the query-embedding part of compute_ms
+    expires_at: float
+
+
+def normalize_query(query: str) -> str:
+    """Lower-case, collapse whitespace and drop trailing punctuation."""
+    text = re.sub(r"\s+", " ", query.strip().lower())
+    return text.rstrip(" ?.!")
+
+
+def _cosine(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class AnswerCache:
+    """LRU + TTL cache of finished RAG results with per-document invalidation."""
+
+    def __init__(self, ttl_seconds: int, max_entries: int, semantic_threshold: float = 0.0):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.semantic_threshold = semantic_threshold
+        self._entries: OrderedDict[CacheKey, _CacheEntry] = OrderedDict()
+        self._by_document: dict[int, set[CacheKey]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.latency_saved_ms = 0.0
+
+    @staticmethod
+    def make_key(
+        query: str,
+        document_ids: list[int] | None,
+        top_k: int,
+        model: str,
+        prompt_version: str,
+    ) -> CacheKey:
+        scope = tuple(sorted(set(document_ids))) if document_ids else ()
+        return (normalize_query(query), scope, top_k, model, prompt_version)
+
+    def get(self, key: CacheKey) -> dict | None:
+        """Exact-key lookup. Counts a miss only if semantic matching is disabled."""
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                if self.semantic_threshold <= 0:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.latency_saved_ms += entry.compute_ms
+            return entry.result
+
+    def get_similar(self, key: CacheKey, embedding: list[float]) -> dict | None:
+        """Find a cached answer for a paraphrase of the query over the same document set."""
+        if self.semantic_threshold <= 0:
+            return None
+        with self._lock:
+            best_key, best_score = None, self.semantic_threshold
+            for other_key in list(self._entries):
+                if other_key[1:] != key[1:]:
+                    continue
+                entry = self._live_entry(other_key)
+                if entry is None or entry.embedding is None:
+                    continue
+                score = _cosine(embedding, entry.embedding)
+                if score >= best_score:
+                    best_key, best_score = other_key, score
+
+            if best_key is None:
+                self.misses += 1
+                return None
+            entry = self._entries[best_key]
+            self._entries.move_to_end(best_key)
+            self.semantic_hits += 1
+            # Only the generation/search work is saved — the embed call already ran
+            self.latency_saved_ms += entry.compute_ms - entry.embed_ms
+            return entry.result
+
+    def put(
+        self,
+        key: CacheKey,
+        result: dict,
+        embedding: list[float] | None,
+        compute_ms: float,
+        embed_ms: float = 0.0,
+    ) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _CacheEntry(
+                result=result,
+                embedding=embedding if self.semantic_threshold > 0 else None,
+                compute_ms=compute_ms,
+                embed_ms=min(embed_ms, compute_ms),
+                expires_at=time.monotonic() + self.ttl_seconds,
+            )
+            for doc_id in key[1] or (_ALL_DOCUMENTS,):
+                self._by_document.setdefault(doc_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate_documents(self, document_ids: list[int]) -> int:
+        """Drop every entry whose document set contains any of the given IDs."""
+        with self._lock:
+            stale: set[CacheKey] = set(self._by_document.get(_ALL_DOCUMENTS, ()))
+            for doc_id in document_ids:
+                stale |= self._by_document.get(doc_id, set())
+            for key in stale:
+                self._remove(key)
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_document.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.semantic_hits) / lookups, 4) if lookups else 0.0,
+                "latency_saved_ms": round(self.latency_saved_ms, 1),
+            }
+
+    # ── Internal helpers (caller holds the lock) ─────────────────────────────
+
+    def _live_entry(self, key: CacheKey) -> _CacheEntry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        return entry
+
+    def _remove(self, key: CacheKey) -> None:
+        self._entries.pop(key, None)
+        for doc_id in key[1] or (_ALL_DOCUMENTS,):
+            keys = self._by_document.get(doc_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_document[doc_id]
+
+
+answer_cache = AnswerCache(
+    ttl_seconds=settings.answer_cache_ttl_seconds,
+    max_entries=settings.answer_cache_max_entries,
+    semantic_threshold=settings.answer_cache_semantic_threshold,
+)
+
+
+def invalidate_documents(document_ids: list[int]) -> int:
+    """Drop cached answers that depend on any of the given documents."""
+    return answer_cache.invalidate_documents(document_ids)
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from jose import JWTError, jwt
 import bcrypt
 from app.config import get_settings
+from app.utils.concurrency import run_cpu
 
 settings = get_settings()
 
@@ -28,6 +29,16 @@ def verify_password(plain: str, hashed: str) -> bool:
     return bcrypt.checkpw(pwd_bytes, hashed_bytes)
 
 
+async def hash_password_async(password: str) -> str:
+    """hash_password in the bounded CPU pool so signups don't stall the event loop."""
+    return await run_cpu(hash_password, password)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    """verify_password in the bounded CPU pool so login storms don't stall the event loop."""
+    return await run_cpu(verify_password, plain, hashed)
+
+
 def create_access_token(user_id: int, email: str) -> str:
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     payload = {"sub": str(user_id), "email": email, "exp": expire}
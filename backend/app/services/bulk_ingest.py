@@ -0,0 +1,220 @@
+"""
+Bulk ingestion of many documents at once (ZIP/TAR archives via the API, directories via CLI).
+1. Copy each supported file into storage/uploads (extension + magic number + size checks)
+2. Insert every Document row in one transaction, tagged with a shared ingest_batch_id
+3. Run pipelines with bounded parallelism; progress is counted per batch from the DB
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import tarfile
+import uuid
+import zipfile
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Iterator
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models import Document, DocumentStatus
+from app.utils.metrics import BYTES_PROCESSED
+from app.utils.file_utils import (
+    get_storage_paths, validate_file_extension, validate_magic_number,
+    generate_unique_filename, SavedUpload, UploadTooLargeError, UPLOAD_CHUNK_SIZE,
+)
+
+settings = get_settings()
+logger = logging.getLogger("ocrtorag.bulk")
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz")
+# What zipfile/tarfile/gzip raise for corrupt or truncated archives (none are ValueErrors)
+ARCHIVE_ERRORS = (zipfile.BadZipFile, zipfile.LargeZipFile, tarfile.TarError, zlib.error, EOFError)
+
+
+class ArchiveError(ValueError):
+    """The archive (or one of its members) can't be read."""
+
+
+class ArchiveTooLargeError(UploadTooLargeError):
+    """The archive's members add up to more than bulk_max_extracted_bytes."""
+
+
+@dataclass
+class BulkItem:
+    original_filename: str
+    file_type: str
+    saved: SavedUpload
+
+
+def _store_stream(
+    src: IO[bytes], original_filename: str, ext: str, max_total: int | None = None,
+) -> SavedUpload:
+    """
+    Blocking counterpart of stream_upload for archive members and local files.
+    `max_total` is what's left of the batch's extracted-bytes budget.
+    """
+    uploads_dir, _ = get_storage_paths()
+    dest = uploads_dir / generate_unique_filename(original_filename)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(dest, "wb") as out:
+            while chunk := src.read(UPLOAD_CHUNK_SIZE):
+                if size == 0:
+                    validate_magic_number(chunk, ext)
+                size += len(chunk)
+                if max_total is not None and size > max_total:
+                    raise ArchiveTooLargeError(
+                        f"Archive expands to more than {settings.bulk_max_extracted_bytes // (1024 * 1024)} MB."
+                    )
+                if size > settings.max_upload_bytes:
+                    raise UploadTooLargeError(
+                        f"File exceeds the {settings.max_upload_bytes // (1024 * 1024)} MB upload limit."
+                    )
+                digest.update(chunk)
+                out.write(chunk)
+        if size == 0:
+            raise ValueError("File is empty.")
+    except BaseException:
+        dest.unlink(missing_ok=True)
+        raise
+    return SavedUpload(path=str(dest), size=size, sha256=digest.hexdigest())
+
+
+def _iter_archive(archive_path: str) -> Iterator[tuple[str, IO[bytes]]]:
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as zf:
+            for info in zf.infolist():
+                if not info.is_dir():
+                    with zf.open(info) as member:
+                        yield info.filename, member
+    elif tarfile.is_tarfile(archive_path):
+        with tarfile.open(archive_path) as tf:
+            for info in tf:
+                if info.isfile():
+                    member = tf.extractfile(info)
+                    if member is not None:
+                        yield info.name, member
+    else:
+        raise ValueError("Archive is not a valid ZIP or TAR file.")
+
+
+def _iter_directory(directory: str) -> Iterator[tuple[str, IO[bytes]]]:
+    root = Path(directory)
+    if not root.is_dir():
+        raise ValueError(f"Not a directory: {directory}")
+    for path in sorted(p for p in root.rglob("*") if p.is_file()):
+        with open(path, "rb") as f:
+            yield str(path.relative_to(root)), f
+
+
+def _collect(
+    entries: Iterator[tuple[str, IO[bytes]]],
+    max_total_bytes: int | None = None,
+) -> tuple[list[BulkItem], list[dict]]:
+    items: list[BulkItem] = []
+    skipped: list[dict] = []
+    total = 0
+    try:
+        for name, stream in entries:
+            base = os.path.basename(name)
+            if base.startswith(".") or "__MACOSX" in name:
+                continue
+            if len(items) >= settings.bulk_max_files:
+                skipped.append({"name": name, "reason": f"Batch limit of {settings.bulk_max_files} files reached."})
+                continue
+            try:
+                ext = validate_file_extension(base)
+                remaining = None if max_total_bytes is None else max_total_bytes - total
+                items.append(BulkItem(base, ext, _store_stream(stream, base, ext, remaining)))
+                total += items[-1].saved.size
+            except ArchiveTooLargeError:
+                raise
+            except ValueError as e:
+                skipped.append({"name": name, "reason": str(e)})
+    except BaseException:
+        # Don't leave already-copied files behind if the archive itself is broken
+        for item in items:
+            Path(item.saved.path).unlink(missing_ok=True)
+        raise
+    return items, skipped
+
+
+def extract_archive(archive_path: str) -> tuple[list[BulkItem], list[dict]]:
+    """
+    Copy supported archive members into storage. Returns (items, skipped).
+    Raises ArchiveError for a corrupt archive and ArchiveTooLargeError once the members
+    add up to more than bulk_max_extracted_bytes; nothing is left in storage then.
+    """
+    try:
+        return _collect(_iter_archive(archive_path), settings.bulk_max_extracted_bytes)
+    except ARCHIVE_ERRORS as e:
+        raise ArchiveError(str(e) or type(e).__name__) from e
+
+
+def collect_directory(directory: str) -> tuple[list[BulkItem], list[dict]]:
+    """Copy supported files under a directory into storage. Returns (items, skipped)."""
+    return _collect(_iter_directory(directory))
+
+
+async def create_documents(db: AsyncSession, user_id: int, items: list[BulkItem]) -> tuple[str, list[Document]]:
+    """Insert all Document rows in a single transaction. Returns (batch_id, documents)."""
+    batch_id = uuid.uuid4().hex
+    docs = [
+        Document(
+            user_id=user_id,
+            filename=Path(item.saved.path).name,
+            original_filename=item.original_filename,
+            file_type=item.file_type,
+            original_path=item.saved.path,
+            file_size=item.saved.size,
+            content_sha256=item.saved.sha256,
+            ingest_batch_id=batch_id,
+            status=DocumentStatus.PENDING,
+        )
+        for item in items
+    ]
+    db.add_all(docs)
+    await db.commit()
+    BYTES_PROCESSED.inc(sum(item.saved.size for item in items), kind="upload")
+    return batch_id, docs
+
+
+async def process_documents(documents: list[tuple[int, str, str]], concurrency: int | None = None) -> None:
+    """Run the pipeline for (document_id, file_path, file_type) with bounded parallelism."""
+    from app.database import AsyncSessionLocal
+    from app.services.pipeline import run_pipeline
+
+    semaphore = asyncio.Semaphore(concurrency or settings.bulk_ingest_concurrency)
+
+    async def one(document_id: int, file_path: str, file_type: str) -> None:
+        async with semaphore:
+            async with AsyncSessionLocal() as session:
+                try:
+                    await run_pipeline(session, document_id, file_path, file_type)
+                except Exception:
+                    # run_pipeline already marked the document FAILED; keep the batch going
+                    logger.exception("Bulk pipeline failed for document %s", document_id)
+
+    await asyncio.gather(*(one(*d) for d in documents))
+
+
+async def batch_progress(db: AsyncSession, user_id: int, batch_id: str) -> dict | None:
+    """Per-status document counts for a batch, or None if the batch doesn't exist."""
+    result = await db.execute(
+        select(Document.status, func.count())
+        .where(Document.user_id == user_id, Document.ingest_batch_id == batch_id)
+        .group_by(Document.status)
+    )
+    counts = {status.value: 0 for status in DocumentStatus}
+    for status, count in result.all():
+        counts[status.value] = count
+    total = sum(counts.values())
+    if total == 0:
+        return None
+    finished = counts[DocumentStatus.COMPLETED.value] + counts[DocumentStatus.FAILED.value]
+    return {"batch_id": batch_id, "total": total, **counts, "done": finished == total}
@@ -0,0 +1,169 @@
+"""
+Cooperative cancellation and time budgets for run_pipeline.
+
+POST /documents/{id}/cancel sets Document.cancel_requested_at, and DELETE /documents/{id}
+removes the row; both also signal the pipeline directly if it runs in this process.
+Pipelines elsewhere (app.worker, other API replicas) notice through the database: the
+pipeline checks its CancelToken between stages and pages, and polls the row every
+POLL_SECONDS while it awaits long stage work.
+
+Every pipeline has a document budget (pipeline_document_timeout_seconds) and every page a
+page budget (pipeline_page_timeout_seconds) that starts once the page has its CPU slot.
+CancelToken.guard stops awaiting stage work as soon as the token is cancelled or a budget
+runs out, so the pipeline unwinds and hands back its CPU slot at once. Executor threads
+can't be interrupted, so Tesseract and Poppler are given the remaining budget as their
+subprocess timeout and get killed when it passes instead of running on unowned.
+"""
+import asyncio
+import logging
+import math
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Iterator
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models import Document
+
+settings = get_settings()
+logger = logging.getLogger("ocrtorag.cancellation")
+
+POLL_SECONDS = 2.0
+CANCELLED_BY_USER = "Cancelled by user."
+DOCUMENT_DELETED = "Document was deleted."
+
+
+class PipelineCancelled(Exception):
+    """The document was cancelled or deleted while its pipeline ran."""
+
+
+class PipelineTimeout(Exception):
+    """A page or the whole document ran past its time budget."""
+
+
+class CancelToken:
+    def __init__(self, document_id: int):
+        self.document_id = document_id
+        budget = settings.pipeline_document_timeout_seconds
+        self.deadline = time.monotonic() + budget if budget else math.inf
+        self.page_deadline = math.inf
+        self.reason: str | None = None
+        self._event = asyncio.Event()
+        self._polled_at = -math.inf
+
+    @property
+    def cancelled(self) -> bool:
+        return self.reason is not None
+
+    def cancel(self, reason: str = CANCELLED_BY_USER) -> None:
+        if self.reason is None:
+            self.reason = reason
+            self._event.set()
+
+    @contextmanager
+    def page(self) -> Iterator[None]:
+        """Apply the page budget to the work inside the block."""
+        budget = settings.pipeline_page_timeout_seconds
+        self.page_deadline = time.monotonic() + budget if budget else math.inf
+        try:
+            yield
+        finally:
+            self.page_deadline = math.inf
+
+    def remaining(self) -> float | None:
+        """Seconds until the nearer budget runs out, or None if unbounded."""
+        deadline = min(self.deadline, self.page_deadline)
+        return None if deadline == math.inf else max(0.0, deadline - time.monotonic())
+
+    def check(self) -> None:
+        if self.reason is not None:
+            raise PipelineCancelled(self.reason)
+        now = time.monotonic()
+        if now >= self.page_deadline:
+            raise PipelineTimeout(
+                f"A page took longer than the {settings.pipeline_page_timeout_seconds} s page budget."
+            )
+        if now >= self.deadline:
+            raise PipelineTimeout(
+                f"Processing took longer than the {settings.pipeline_document_timeout_seconds} s budget."
+            )
+
+    async def checkpoint(self, db: AsyncSession, force: bool = False) -> None:
+        """
+        check(), after picking up cancel requests made through other processes. With
+        force, the row is read even if it was polled less than POLL_SECONDS ago.
+        """
+        self.check()
+        await self._poll(db, force)
+        self.check()
+
+    async def guard(self, awaitable: Awaitable[Any], db: AsyncSession) -> Any:
+        """
+        Await `awaitable`, but abandon it as soon as the token is cancelled (here or,
+        via the database, elsewhere) or a budget runs out.
+        """
+        self.check()
+        task = asyncio.ensure_future(awaitable)
+        cancelled = asyncio.ensure_future(self._event.wait())
+        try:
+            while not task.done() and not self.cancelled and self.remaining() != 0.0:
+                remaining = self.remaining()
+                timeout = POLL_SECONDS if remaining is None else min(POLL_SECONDS, remaining)
+                await asyncio.wait({task, cancelled}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not task.done():
+                    await self._poll(db)
+        finally:
+            cancelled.cancel()
+            if not task.done():
+                task.cancel()
+                # Let the stage unwind (timeline span, scheduler slot) before raising
+                await asyncio.gather(task, return_exceptions=True)
+        if task.cancelled() or task.exception() is not None:
+            # A Tesseract/Poppler timeout surfaces as the stage's own error; report the budget
+            self.check()
+        if task.cancelled():
+            raise PipelineTimeout("Processing stopped when its time budget ran out.")
+        return task.result()
+
+    async def _poll(self, db: AsyncSession, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._polled_at < POLL_SECONDS:
+            return
+        self._polled_at = now
+        with db.no_autoflush:
+            row = (
+                await db.execute(
+                    select(Document.cancel_requested_at).where(Document.id == self.document_id)
+                )
+            ).one_or_none()
+        if row is None:
+            self.cancel(DOCUMENT_DELETED)
+        elif row.cancel_requested_at is not None:
+            self.cancel(CANCELLED_BY_USER)
+
+
+_active: dict[int, CancelToken] = {}
+
+
+@contextmanager
+def track(document_id: int) -> Iterator[CancelToken]:
+    """Register a running pipeline so cancel() in this process reaches it directly."""
+    token = CancelToken(document_id)
+    _active[document_id] = token
+    try:
+        yield token
+    finally:
+        if _active.get(document_id) is token:
+            del _active[document_id]
+
+
+def cancel(document_id: int, reason: str = CANCELLED_BY_USER) -> bool:
+    """Cancel the document's pipeline if it runs in this process. Returns whether it did."""
+    token = _active.get(document_id)
+    if token is None:
+        return False
+    logger.info("Cancelling pipeline for document %d: %s", document_id, reason)
+    token.cancel(reason)
+    return True
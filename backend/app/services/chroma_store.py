@@ -2,19 +2,52 @@
 ChromaDB Cloud vector store service.
 Connects to ChromaDB Cloud using API key + tenant + database.
 Stores chunk text + Cohere embeddings — one collection shared, filtered by user via document_id.
+Searches read the active collection; while a re-index builds a new collection
+(see reindex.py) pipeline writes and deletes go to both, so the swap loses nothing.
+Upserts are split into batches by record count and estimated payload size, each retried
+with backoff; chunk ids are deterministic, so re-upserting a document is idempotent.
 """
-import chromadb
+import asyncio
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
 from app.config import get_settings
+from app.utils.concurrency import run_io
+from app.utils.metrics import PIPELINE_STAGE_SECONDS, QUERY_STAGE_SECONDS, timed
 
 settings = get_settings()
+logger = logging.getLogger("ocrtorag.chroma_store")
 
 _client = None
-_collection = None
+_collections: dict = {}
+_active_name: str | None = None  # None → settings.chroma_collection
+_building_names: list[str] = []
+_models: dict[str, str] = {}     # collection → Cohere model its vectors were embedded with
+
+# Documents deleted in PostgreSQL whose chunks may still be in the collection.
+# Mirrors the vector_tombstones table (see vector_cleanup) so search skips them at once.
+_tombstoned: set[int] = set()
+
+
+def add_tombstones(document_ids) -> None:
+    _tombstoned.update(document_ids)
+
+
+def remove_tombstones(document_ids) -> None:
+    _tombstoned.difference_update(document_ids)
+
+
+def set_tombstones(document_ids) -> None:
+    _tombstoned.clear()
+    _tombstoned.update(document_ids)
 
 
 def get_chroma_client():
     global _client
     if _client is None:
+        import chromadb  # imported on first use — ~0.8 s of cold start
         _client = chromadb.HttpClient(
             ssl=True,
             host="api.trychroma.com",
@@ -25,27 +58,86 @@ def get_chroma_client():
     return _client
 
 
-def get_collection():
-    global _collection
-    if _collection is None:
+def active_collection_name() -> str:
+    return _active_name or settings.chroma_collection
+
+
+def set_index_collections(
+    active: str | None,
+    building: list[str] | None = None,
+    models: dict[str, str] | None = None,
+) -> None:
+    """
+    Point searches at `active` and mirror pipeline writes into `building` collections.
+    `models` maps collections to the Cohere model of their index version.
+    """
+    global _active_name, _building_names, _models
+    _active_name = active
+    _building_names = [b for b in building or [] if b != active_collection_name()]
+    _models = dict(models or {})
+
+
+def collection_model(name: str | None = None) -> str:
+    """The Cohere model to embed queries and chunks with for a collection (default: active)."""
+    return _models.get(name or active_collection_name(), settings.cohere_model)
+
+
+def get_collection(name: str | None = None):
+    name = name or active_collection_name()
+    if name not in _collections:
         client = get_chroma_client()
-        _collection = client.get_or_create_collection(
-            name=settings.chroma_collection,
+        _collections[name] = client.get_or_create_collection(
+            name=name,
             metadata={"hnsw:space": "cosine"},
         )
-    return _collection
+    return _collections[name]
 
 
-def upsert_chunks(
-    document_id: int,
-    chunks: list[dict],
-    embeddings: list[list[float]],
-) -> int:
-    """Upsert chunk embeddings into ChromaDB Cloud."""
-    if not chunks or not embeddings:
-        return 0
+def write_collection_names() -> list[str]:
+    """The active collection, then any a re-index is building."""
+    return [active_collection_name(), *_building_names]
 
-    collection = get_collection()
+
+def _write_collections() -> list:
+    return [get_collection(name) for name in write_collection_names()]
+
+
+def chunk_records(chunks, child_embeddings: list[list[float]]) -> tuple[list[dict], list[list[float]]]:
+    """
+    Turn TextChunks into (chunk dicts, embeddings) for upsert_chunks.
+    Child chunks get their real embeddings; parent chunks get dummy embeddings so
+    they can be fetched by parent_id.
+    """
+    child_chunks = [c for c in chunks if c.chunk_type == "child"]
+    parent_chunks = [c for c in chunks if c.chunk_type == "parent"]
+
+    chunk_dicts = []
+    all_embeddings = []
+    for c, emb in zip(child_chunks, child_embeddings):
+        chunk_dicts.append({
+            "text": c.text, "chunk_index": c.chunk_index, "page_number": c.page_number,
+            "chunk_type": c.chunk_type, "parent_id": c.parent_id
+        })
+        all_embeddings.append(emb)
+    for c in parent_chunks:
+        chunk_dicts.append({
+            "text": c.text, "chunk_index": c.chunk_index, "page_number": c.page_number,
+            "chunk_type": c.chunk_type, "parent_id": c.parent_id
+        })
+        all_embeddings.append([0.0] * settings.embed_dimension)  # Dummy embedding
+    return chunk_dicts, all_embeddings
+
+
+@dataclass
+class UpsertResult:
+    records: int = 0
+    batches: int = 0
+    bytes: int = 0
+    retries: int = 0
+
+
+def _upsert_payload(document_id: int, chunks: list[dict]) -> tuple[list[str], list[str], list[dict]]:
+    # Ids depend only on the document and chunk position, so a retry overwrites, never duplicates
     ids       = [f"doc{document_id}_chunk{c['chunk_index']}" for c in chunks]
     documents = [c["text"] for c in chunks]
     metadatas = [
@@ -58,69 +150,242 @@ def upsert_chunks(
         }
         for c in chunks
     ]
+    return ids, documents, metadatas
+
+
+def _record_bytes(document: str, embedding: list[float]) -> int:
+    """Rough JSON size of one record: text, ~12 characters per float, id and metadata."""
+    return len(document.encode()) + 12 * len(embedding) + 256
+
+
+def _batches(documents: list[str], embeddings: list[list[float]]) -> list[tuple[slice, int]]:
+    """(slice, estimated bytes) per batch, within chroma_upsert_batch_size and _batch_bytes."""
+    batches, start, size = [], 0, 0
+    for i, (document, embedding) in enumerate(zip(documents, embeddings)):
+        record = _record_bytes(document, embedding)
+        full = i - start >= settings.chroma_upsert_batch_size or size + record > settings.chroma_upsert_batch_bytes
+        if i > start and full:
+            batches.append((slice(start, i), size))
+            start, size = i, 0
+        size += record
+    if start < len(documents):
+        batches.append((slice(start, len(documents)), size))
+    return batches
+
+
+def _upsert_batch(collection, ids, documents, embeddings, metadatas, stop: threading.Event | None = None) -> int:
+    """
+    collection.upsert with exponential-backoff retries. Returns the retries it took.
+    Setting `stop` gives up instead of retrying (the call in progress still completes).
+    """
+    for attempt in range(settings.chroma_upsert_retries + 1):
+        try:
+            collection.upsert(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
+            return attempt
+        except Exception as e:
+            if attempt == settings.chroma_upsert_retries or (stop is not None and stop.is_set()):
+                raise
+            delay = settings.chroma_upsert_retry_base_seconds * 2 ** attempt
+            logger.warning(
+                "Upsert of %d records failed (attempt %d), retrying in %.1f s: %s",
+                len(ids), attempt + 1, delay, e,
+            )
+            if stop is None:
+                time.sleep(delay)
+            elif stop.wait(delay):
+                raise
+    return settings.chroma_upsert_retries
+
+
+def _delete_stale(collection, document_id: int, chunk_indexes: list[int]) -> None:
+    """
+    Drop chunks left over from an earlier upsert of the document: ones past its current
+    chunk count, or ones now stored as duplicates of another chunk (see dedup.py).
+    """
+    collection.delete(
+        where={
+            "$and": [
+                {"document_id": {"$eq": document_id}},
+                {"chunk_index": {"$nin": chunk_indexes}},
+            ]
+        }
+    )
+
+
+def _upsert_targets(collection_name: str | None) -> list:
+    return [get_collection(collection_name)] if collection_name else _write_collections()
+
+
+@timed(PIPELINE_STAGE_SECONDS, stage="upsert")
+def upsert_chunks(
+    document_id: int,
+    chunks: list[dict],
+    embeddings: list[list[float]],
+    collection_name: str | None = None,
+) -> int:
+    """
+    Upsert chunk embeddings into ChromaDB Cloud, one batch at a time.
+    Writes to `collection_name` only, or by default to the active collection plus
+    any collection a re-index is currently building.
+    """
+    if not chunks or not embeddings:
+        return 0
 
-    collection.upsert(ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas)
+    ids, documents, metadatas = _upsert_payload(document_id, chunks)
+    for collection in _upsert_targets(collection_name):
+        for batch, _size in _batches(documents, embeddings):
+            _upsert_batch(collection, ids[batch], documents[batch], embeddings[batch], metadatas[batch])
+        _delete_stale(collection, document_id, [c["chunk_index"] for c in chunks])
     return len(ids)
 
 
-def search_chunks(
-    query_embedding: list[float],
-    top_k: int = 5,
-    document_ids: list[int] | None = None,
-) -> list[dict]:
-    """Cosine similarity search in ChromaDB Cloud. Filtered by document_ids."""
-    collection = get_collection()
-    count = collection.count()
-    if count == 0:
-        return []
+@timed(PIPELINE_STAGE_SECONDS, stage="upsert")
+async def upsert_chunks_async(
+    document_id: int,
+    chunks: list[dict],
+    embeddings: list[list[float]],
+    collection_name: str | None = None,
+) -> UpsertResult:
+    """
+    upsert_chunks with batches sent concurrently (chroma_upsert_concurrency at a time)
+    from the I/O pool. If any batch still fails after its retries the error is raised
+    once all batches have finished; upserting the document again is safe.
 
-    where = None
-    
+    If cancelled, no further batches or retries start, and the CancelledError is only
+    re-raised once the batches already in the I/O pool have finished. A cleanup the
+    caller runs after that (vector_cleanup) can't be overtaken by a late batch.
+    """
+    if not chunks or not embeddings:
+        return UpsertResult()
+
+    ids, documents, metadatas = _upsert_payload(document_id, chunks)
+    targets = await run_io(_upsert_targets, collection_name)
+    batches = _batches(documents, embeddings)
+    semaphore = asyncio.Semaphore(settings.chroma_upsert_concurrency)
+    stop = threading.Event()
+    in_flight: set[asyncio.Future] = set()
+
+    async def send(collection, batch: slice) -> int:
+        async with semaphore:
+            # Shielded: cancelling the upsert must not stop tracking a batch a thread is running
+            future = asyncio.ensure_future(run_io(
+                _upsert_batch, collection, ids[batch], documents[batch], embeddings[batch], metadatas[batch], stop
+            ))
+            in_flight.add(future)
+            future.add_done_callback(in_flight.discard)
+            return await asyncio.shield(future)
+
+    try:
+        outcomes = await asyncio.gather(
+            *(send(collection, batch) for collection in targets for batch, _size in batches),
+            return_exceptions=True,
+        )
+    except asyncio.CancelledError:
+        stop.set()
+        await asyncio.gather(*in_flight, return_exceptions=True)
+        raise
+    errors = [o for o in outcomes if isinstance(o, BaseException)]
+    if errors:
+        raise errors[0]
+    indexes = [c["chunk_index"] for c in chunks]
+    await asyncio.gather(*(run_io(_delete_stale, c, document_id, indexes) for c in targets))
+    return UpsertResult(
+        records=len(ids),
+        batches=len(batches),
+        bytes=sum(size for _batch, size in batches),
+        retries=sum(outcomes),
+    )
+
+
+def _child_filter(document_ids: list[int] | None) -> dict:
+    """Chroma `where` clause selecting child chunks, optionally restricted to documents."""
+    if not document_ids and _tombstoned:
+        return {
+            "$and": [
+                {"chunk_type": {"$eq": "child"}},
+                {"document_id": {"$nin": sorted(_tombstoned)}}
+            ]
+        }
     if document_ids and len(document_ids) == 1:
-        where = {
+        return {
             "$and": [
                 {"chunk_type": {"$eq": "child"}},
                 {"document_id": {"$eq": document_ids[0]}}
             ]
         }
-    elif document_ids and len(document_ids) > 1:
-        where = {
+    if document_ids and len(document_ids) > 1:
+        return {
             "$and": [
                 {"chunk_type": {"$eq": "child"}},
                 {"document_id": {"$in": document_ids}}
             ]
         }
-    else:
-        where = {"chunk_type": {"$eq": "child"}}
+    return {"chunk_type": {"$eq": "child"}}
 
-    kwargs = {
-        "query_embeddings": [query_embedding],
-        "n_results": min(top_k, count),
-        "include": ["documents", "metadatas", "distances"],
-    }
-    if where:
-        kwargs["where"] = where
 
-    results = collection.query(**kwargs)
+def search_chunks(
+    query_embedding: list[float],
+    top_k: int = 5,
+    document_ids: list[int] | None = None,
+) -> list[dict]:
+    """Cosine similarity search in ChromaDB Cloud. Filtered by document_ids."""
+    return search_chunks_batch([query_embedding], top_k=top_k, document_ids=document_ids)[0]
+
+
+@timed(QUERY_STAGE_SECONDS, stage="retrieval")
+def search_chunks_batch(
+    query_embeddings: list[list[float]],
+    top_k: int = 5,
+    document_ids: list[int] | None = None,
+) -> list[list[dict]]:
+    """
+    Cosine similarity search for many query vectors in a single `collection.query`.
+    Returns one result list per query embedding, in the same order.
+    """
+    if not query_embeddings:
+        return []
+    if document_ids:
+        document_ids = [d for d in document_ids if d not in _tombstoned]
+        if not document_ids:
+            return [[] for _ in query_embeddings]
+
+    collection = get_collection()
+    count = collection.count()
+    if count == 0:
+        return [[] for _ in query_embeddings]
+
+    results = collection.query(
+        query_embeddings=query_embeddings,
+        n_results=min(top_k, count),
+        where=_child_filter(document_ids),
+        include=["documents", "metadatas", "distances"],
+    )
 
     output = []
-    for i, doc_text in enumerate(results["documents"][0]):
-        meta     = results["metadatas"][0][i]
-        distance = results["distances"][0][i]
-        similarity = max(0.0, 1.0 - distance)
-        output.append({
-            "text":        doc_text,
-            "document_id": meta["document_id"],
-            "chunk_index": meta["chunk_index"],
-            "page_number": meta["page_number"],
-            "parent_id":   meta.get("parent_id"),
-            "similarity":  round(similarity, 4),
-        })
+    for q in range(len(query_embeddings)):
+        hits = []
+        for i, doc_text in enumerate(results["documents"][q]):
+            meta     = results["metadatas"][q][i]
+            distance = results["distances"][q][i]
+            similarity = max(0.0, 1.0 - distance)
+            hits.append({
+                "text":        doc_text,
+                "document_id": meta["document_id"],
+                "chunk_index": meta["chunk_index"],
+                "page_number": meta["page_number"],
+                "parent_id":   meta.get("parent_id"),
+                "similarity":  round(similarity, 4),
+            })
+        output.append(hits)
     return output
 
-def get_parent_chunks(parent_ids: list[str]) -> list[dict]:
-    """Retrieve full text for a list of parent_ids from ChromaDB."""
-    if not parent_ids:
+@timed(QUERY_STAGE_SECONDS, stage="parent_fetch")
+def get_parent_chunks(parent_ids: list[str], document_ids: list[int]) -> list[dict]:
+    """
+    Retrieve full text for a list of parent_ids from ChromaDB.
+    parent_ids repeat across documents, so only parents of `document_ids` are returned.
+    """
+    if not parent_ids or not document_ids:
         return []
         
     collection = get_collection()
@@ -128,7 +393,8 @@ def get_parent_chunks(parent_ids: list[str]) -> list[dict]:
         where={
             "$and": [
                 {"chunk_type": {"$eq": "parent"}},
-                {"parent_id": {"$in": parent_ids}}
+                {"parent_id": {"$in": parent_ids}},
+                {"document_id": {"$in": document_ids}},
             ]
         },
         include=["documents", "metadatas"]
@@ -145,13 +411,42 @@ def get_parent_chunks(parent_ids: list[str]) -> list[dict]:
             "document_id": meta["document_id"],
             "chunk_index": meta["chunk_index"],
             "page_number": meta["page_number"],
+            "parent_id": meta.get("parent_id"),
         })
     return output
 
 
+def reassign_chunks(collection_name: str, moves: list[tuple[int, int, dict]]) -> None:
+    """
+    Copy stored child chunks to another document: each move is (document_id, chunk_index,
+    new chunk dict). Text and vector are kept; id and metadata follow the new chunk.
+    """
+    if not moves:
+        return
+    collection = get_collection(collection_name)
+    old_ids = [f"doc{document_id}_chunk{chunk_index}" for document_id, chunk_index, _ in moves]
+    stored = collection.get(ids=old_ids, include=["documents", "embeddings"])
+    by_id = {
+        chunk_id: (stored["documents"][i], stored["embeddings"][i])
+        for i, chunk_id in enumerate(stored["ids"])
+    }
+
+    targets = {}
+    for old_id, (_, _, chunk) in zip(old_ids, moves):
+        if old_id in by_id:
+            targets.setdefault(chunk["document_id"], []).append((chunk, *by_id[old_id]))
+    for document_id, records in targets.items():
+        chunks = [{**chunk, "text": text} for chunk, text, _ in records]
+        ids, documents, metadatas = _upsert_payload(document_id, chunks)
+        embeddings = [list(embedding) for _, _, embedding in records]
+        _upsert_batch(collection, ids, documents, embeddings, metadatas)
+
+
 def delete_document_chunks(document_id: int) -> None:
-    """Remove all chunks for a document from ChromaDB Cloud."""
-    collection = get_collection()
-    results = collection.get(where={"document_id": {"$eq": document_id}})
-    if results["ids"]:
-        collection.delete(ids=results["ids"])
+    """
+    Remove all chunks for a document from ChromaDB Cloud.
+    Deletes server-side by metadata filter — no chunk payloads cross the network.
+    Normally called by the vector cleanup worker rather than on the request path.
+    """
+    for collection in _write_collections():
+        collection.delete(where={"document_id": {"$eq": document_id}})
@@ -7,6 +7,9 @@ from app.config import get_settings
 
 settings = get_settings()
 
+# Separates pages in Document.ocr_text so stored text can be re-chunked per page
+PAGE_BREAK = "\f"
+
 
 @dataclass
 class TextChunk:
@@ -113,3 +116,14 @@ def chunk_pages(page_texts: list[tuple[int, str]]) -> list[TextChunk]:
         )
         all_chunks.extend(new_chunks)
     return all_chunks
+
+
+def split_pages(ocr_text: str) -> list[tuple[int, str]]:
+    """
+    Inverse of how the pipeline builds Document.ocr_text: (page_number, text) tuples.
+    Text stored before page breaks were recorded comes back as a single page 1.
+    """
+    pages = ocr_text.split(PAGE_BREAK)
+    if pages and not pages[-1].strip():
+        pages.pop()
+    return [(i, text) for i, text in enumerate(pages, start=1)]
@@ -0,0 +1,132 @@
+"""
+Token-budgeted context packing for the Gemini prompt.
+1. Score each parent chunk by its best-matching child's similarity
+2. Drop exact and near-duplicate parents (word-shingle Jaccard)
+3. Optionally trim parents to the sentences around their matched children
+4. Fill the configured token budget in score order
+"""
+import re
+from dataclasses import dataclass
+from app.config import get_settings
+
+settings = get_settings()
+
+# Rough chars-per-token ratio for English prose with Gemini/SentencePiece tokenizers
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_RE = re.compile(r"[^.!?\n]+(?:[.!?]+|\n+|$)")
+
+
+@dataclass
+class PackStats:
+    context_tokens: int
+    context_chunks: int
+    context_chunks_dropped: int
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _shingles(text: str, size: int = 3) -> set[tuple[str, ...]]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def trim_to_matches(parent_text: str, child_texts: list[str], window: int = 1) -> str:
+    """Keep only the sentences overlapping the matched children, plus `window` neighbours."""
+    spans = [(m.start(), m.end()) for m in _SENTENCE_RE.finditer(parent_text) if m.group().strip()]
+    if not spans:
+        return parent_text
+
+    keep: set[int] = set()
+    for child in child_texts:
+        start = parent_text.find(child)
+        if start == -1:
+            continue
+        end = start + len(child)
+        for i, (s, e) in enumerate(spans):
+            if s < end and e > start:
+                keep.update(range(max(0, i - window), min(len(spans), i + window + 1)))
+    if not keep:
+        return parent_text
+
+    pieces, prev = [], None
+    for i in sorted(keep):
+        if prev is not None and i != prev + 1:
+            pieces.append("…")
+        pieces.append(parent_text[spans[i][0] : spans[i][1]].strip())
+        prev = i
+    return " ".join(pieces)
+
+
+def pack_context(
+    context_chunks: list[dict],
+    child_chunks: list[dict],
+    token_budget: int | None = None,
+) -> tuple[list[dict], PackStats]:
+    """
+    Order, deduplicate and trim context chunks to fit the token budget.
+    `context_chunks` are parents (or children when there are no parents);
+    `child_chunks` are the search hits used to score them.
+    """
+    token_budget = token_budget or settings.context_token_budget
+
+    # parent_ids repeat across documents, so parents are keyed by (document_id, parent_id)
+    best: dict[tuple[int, str], float] = {}
+    matched: dict[tuple[int, str], list[str]] = {}
+    for child in child_chunks:
+        if child.get("parent_id") is None:
+            continue
+        key = (child["document_id"], child["parent_id"])
+        best[key] = max(best.get(key, 0.0), child.get("similarity", 0.0))
+        matched.setdefault(key, []).append(child["text"])
+
+    scored = []
+    for chunk in context_chunks:
+        chunk = dict(chunk)
+        key = (chunk["document_id"], chunk.get("parent_id"))
+        if key in best:
+            chunk["similarity"] = best[key]
+        scored.append(chunk)
+    scored.sort(key=lambda c: c.get("similarity", 0.0), reverse=True)
+
+    packed: list[dict] = []
+    kept_shingles: list[set] = []
+    used_tokens = 0
+    for chunk in scored:
+        shingles = _shingles(chunk["text"])
+        if any(_jaccard(shingles, other) >= settings.context_dedup_threshold for other in kept_shingles):
+            continue
+
+        key = (chunk["document_id"], chunk.get("parent_id"))
+        if settings.context_trim_to_matches and key in matched:
+            chunk["text"] = trim_to_matches(
+                chunk["text"], matched[key], settings.context_trim_window_sentences
+            )
+
+        tokens = estimate_tokens(chunk["text"])
+        if used_tokens + tokens > token_budget:
+            if packed:
+                continue
+            # Always keep the best chunk, truncated to the budget
+            chunk["text"] = chunk["text"][: token_budget * CHARS_PER_TOKEN]
+            tokens = estimate_tokens(chunk["text"])
+
+        packed.append(chunk)
+        kept_shingles.append(shingles)
+        used_tokens += tokens
+
+    return packed, PackStats(
+        context_tokens=used_tokens,
+        context_chunks=len(packed),
+        context_chunks_dropped=len(context_chunks) - len(packed),
+    )
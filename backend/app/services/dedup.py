@@ -0,0 +1,353 @@
+"""
+Near-duplicate detection for child chunks.
+
+Multi-page forms, letterheads and boilerplate produce many nearly identical child chunks.
+Each child gets a MinHash signature (NUM_PERM hashes over its word 3-shingles). LSH banding
+(BANDS bands of ROWS hashes) finds candidate matches, and a candidate whose estimated
+Jaccard similarity reaches chunk_dedup_threshold is a duplicate. A duplicate is neither
+embedded nor stored. It becomes a provenance entry (ChunkDuplicate) on the stored chunk
+whose vector it shares (ChunkFingerprint), within its document or anywhere in the user's
+library. Only the child vector is shared: parents are stored per document, so answers
+still quote each document's own text.
+
+Fingerprints belong to one collection, since a re-index re-chunks and builds its own.
+While a re-index is building, the pipeline doesn't deduplicate, because new documents
+are written to both collections. The re-index deduplicates them once they are in.
+
+At query time, search_scope adds the documents holding vectors that are shared with the
+documents in scope. attribute then credits each hit to its provenance entries in scope
+and merges hits that are near-duplicates of each other, for example chunks indexed
+before deduplication. Before a deleted document's chunks are removed, release_document
+hands each vector it shares over to one of its duplicates.
+"""
+import hashlib
+import logging
+import re
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models import ChunkBand, ChunkDuplicate, ChunkFingerprint, Document
+from app.services import chroma_store
+from app.services.chunker import TextChunk
+from app.utils.concurrency import run_io
+from app.utils.metrics import CHUNK_DUPLICATES
+
+if TYPE_CHECKING:
+    import numpy as np
+
+settings = get_settings()
+logger = logging.getLogger("ocrtorag.dedup")
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS   # 16 × 8: a pair at Jaccard 0.9 shares a band with p > 0.999, at 0.5 with p ≈ 0.06
+SHINGLE_SIZE = 3
+LOOKUP_BATCH = 500         # band keys per IN (...) query
+
+_PRIME = (1 << 61) - 1
+# numpy is imported on first use, like in timeline.py, so `import main` doesn't pay for it
+_A: "np.ndarray | None" = None
+_B: "np.ndarray | None" = None
+
+
+def _hash_coefficients() -> tuple["np.ndarray", "np.ndarray"]:
+    """Universal hashes (a·x + b) mod p; x and the coefficients stay below 2³², so nothing overflows uint64."""
+    global _A, _B
+    if _A is None:
+        import numpy as np
+        seed = np.random.default_rng(20261019)
+        _A = seed.integers(1, 1 << 32, NUM_PERM, dtype=np.uint64)
+        _B = seed.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64)
+    return _A, _B
+
+
+def _shingles(text: str) -> set[str]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)}
+    return {" ".join(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def signature(text: str) -> "np.ndarray":
+    """MinHash signature of `text`: NUM_PERM uint32 minima."""
+    import numpy as np
+
+    a, b = _hash_coefficients()
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), "little") for s in _shingles(text)),
+        dtype=np.uint64,
+    )
+    permuted = (hashes[:, None] * a + b) % _PRIME
+    return (permuted & 0xFFFFFFFF).min(axis=0).astype(np.uint32)
+
+
+def _unpack(data: bytes) -> "np.ndarray":
+    """A signature stored as ChunkFingerprint.signature."""
+    import numpy as np
+
+    return np.frombuffer(data, dtype=np.uint32)
+
+
+def similarity(a: "np.ndarray", b: "np.ndarray") -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return int((a == b).sum()) / NUM_PERM
+
+
+def band_keys(sig: "np.ndarray", user_id: int, collection_name: str) -> list[int]:
+    """One signed 64-bit key per band, so candidates are looked up per user and collection."""
+    prefix = f"{user_id}:{collection_name}:".encode()
+    return [
+        int.from_bytes(
+            hashlib.blake2b(prefix + bytes([band]) + sig[band * ROWS : (band + 1) * ROWS].tobytes(), digest_size=8).digest(),
+            "little", signed=True,
+        )
+        for band in range(BANDS)
+    ]
+
+
+@dataclass
+class _Canonical:
+    """A stored child vector that duplicates can point at."""
+    signature: "np.ndarray"
+    fingerprint_id: int | None = None        # already in the database
+    fingerprint: ChunkFingerprint | None = None  # planned in this run, saved with save()
+
+
+class Deduplicator:
+    """
+    Plans which child chunks of a user's documents to embed and store in a collection.
+    Without a database session (dry runs), only documents planned by this instance count
+    as the library.
+    """
+
+    def __init__(self, db: AsyncSession | None, user_id: int, collection_name: str):
+        self.db = db
+        self.user_id = user_id
+        self.collection_name = collection_name
+        self.children = 0
+        self.in_document = 0
+        self.in_library = 0
+        self._bands: dict[int, list[_Canonical]] = {}
+        self._fingerprints: list[ChunkFingerprint] = []
+        self._duplicates: list[ChunkDuplicate] = []  # of fingerprints already in the database
+
+    @property
+    def duplicates(self) -> int:
+        return self.in_document + self.in_library
+
+    async def _stored(self, keys: set[int]) -> dict[int, list[_Canonical]]:
+        """Fingerprints already in the database sharing any of `keys`, by key."""
+        found: dict[int, list[_Canonical]] = {}
+        ordered = sorted(keys)
+        for i in range(0, len(ordered), LOOKUP_BATCH):
+            rows = await self.db.execute(
+                select(ChunkBand.key, ChunkFingerprint.id, ChunkFingerprint.signature)
+                .join(ChunkFingerprint, ChunkFingerprint.id == ChunkBand.fingerprint_id)
+                .where(ChunkBand.key.in_(ordered[i : i + LOOKUP_BATCH]))
+            )
+            for key, fingerprint_id, sig in rows.all():
+                found.setdefault(key, []).append(
+                    _Canonical(_unpack(sig), fingerprint_id=fingerprint_id)
+                )
+        return found
+
+    async def plan(self, document_id: int, chunks: list[TextChunk]) -> list[TextChunk]:
+        """The chunks of a document to embed and store: its parents and its unique children."""
+        children = [c for c in chunks if c.chunk_type == "child"]
+        signatures = [signature(c.text) for c in children]
+        keys = [band_keys(s, self.user_id, self.collection_name) for s in signatures]
+        stored = await self._stored({k for ks in keys for k in ks}) if self.db is not None else {}
+
+        duplicate_ids: set[int] = set()
+        for chunk, sig, chunk_keys in zip(children, signatures, keys):
+            self.children += 1
+            best, best_similarity = None, settings.chunk_dedup_threshold
+            for key in chunk_keys:
+                for candidate in (*self._bands.get(key, ()), *stored.get(key, ())):
+                    score = similarity(sig, candidate.signature)
+                    if score >= best_similarity:
+                        best, best_similarity = candidate, score
+
+            if best is None:
+                fingerprint = ChunkFingerprint(
+                    collection_name=self.collection_name, user_id=self.user_id,
+                    document_id=document_id, chunk_index=chunk.chunk_index, signature=sig.tobytes(),
+                )
+                self._fingerprints.append(fingerprint)
+                canonical = _Canonical(sig, fingerprint=fingerprint)
+                for key in chunk_keys:
+                    self._bands.setdefault(key, []).append(canonical)
+                continue
+
+            duplicate_ids.add(id(chunk))
+            owner = best.fingerprint.document_id if best.fingerprint is not None else None
+            if owner == document_id:
+                self.in_document += 1
+            else:
+                self.in_library += 1
+            duplicate = ChunkDuplicate(
+                document_id=document_id, chunk_index=chunk.chunk_index,
+                page_number=chunk.page_number, parent_id=chunk.parent_id,
+            )
+            if best.fingerprint is not None:
+                best.fingerprint.duplicates.append(duplicate)
+            else:
+                duplicate.fingerprint_id = best.fingerprint_id
+                self._duplicates.append(duplicate)
+        return [c for c in chunks if id(c) not in duplicate_ids]
+
+    def save(self) -> None:
+        """Add the planned fingerprints and provenance entries to the session (caller commits)."""
+        for fingerprint in self._fingerprints:
+            sig = _unpack(fingerprint.signature)
+            fingerprint.bands = [ChunkBand(key=key) for key in band_keys(sig, self.user_id, self.collection_name)]
+        self.db.add_all(self._fingerprints)
+        self.db.add_all(self._duplicates)
+        CHUNK_DUPLICATES.inc(self.in_document, scope="document")
+        CHUNK_DUPLICATES.inc(self.in_library, scope="library")
+
+
+async def search_scope(db: AsyncSession, document_ids: list[int]) -> list[int]:
+    """`document_ids` plus the documents holding vectors shared with their duplicates."""
+    result = await db.execute(
+        select(ChunkFingerprint.document_id)
+        .join(ChunkDuplicate, ChunkDuplicate.fingerprint_id == ChunkFingerprint.id)
+        .where(
+            ChunkFingerprint.collection_name == chroma_store.active_collection_name(),
+            ChunkDuplicate.document_id.in_(document_ids),
+            ChunkFingerprint.document_id.not_in(document_ids),
+        )
+        .distinct()
+    )
+    return [*document_ids, *result.scalars().all()]
+
+
+def _provenance(document_id: int, chunk_index: int, page_number: int, parent_id: str | None) -> dict:
+    return {
+        "document_id": document_id, "chunk_index": chunk_index,
+        "page_number": page_number, "parent_id": parent_id,
+    }
+
+
+async def attribute(
+    db: AsyncSession,
+    hits_per_query: list[list[dict]],
+    document_ids: list[int] | None,
+    top_k: int,
+) -> list[list[dict]]:
+    """
+    Credit search hits to the chunks sharing their vector and drop near-duplicate hits.
+    Each hit takes the identity of its first provenance entry in scope (itself when its
+    document is in scope) and lists all of them under "provenance". Returns at most top_k
+    hits per query.
+    """
+    hit_keys = {(h["document_id"], h["chunk_index"]) for hits in hits_per_query for h in hits}
+    shared: dict[tuple[int, int], list[dict]] = {}
+    if hit_keys:
+        query = (
+            select(
+                ChunkFingerprint.document_id, ChunkFingerprint.chunk_index,
+                ChunkDuplicate.document_id, ChunkDuplicate.chunk_index,
+                ChunkDuplicate.page_number, ChunkDuplicate.parent_id,
+            )
+            .join(ChunkDuplicate, ChunkDuplicate.fingerprint_id == ChunkFingerprint.id)
+            .where(
+                ChunkFingerprint.collection_name == chroma_store.active_collection_name(),
+                ChunkFingerprint.document_id.in_({d for d, _ in hit_keys}),
+                ChunkFingerprint.chunk_index.in_({i for _, i in hit_keys}),
+            )
+            .order_by(ChunkDuplicate.document_id, ChunkDuplicate.chunk_index)
+        )
+        if document_ids is not None:
+            query = query.where(ChunkDuplicate.document_id.in_(document_ids))
+        for owner, owner_index, *entry in (await db.execute(query)).all():
+            shared.setdefault((owner, owner_index), []).append(_provenance(*entry))
+
+    scope = set(document_ids) if document_ids is not None else None
+    output = []
+    for hits in hits_per_query:
+        kept: list[tuple[dict, "np.ndarray"]] = []
+        for hit in hits:
+            provenance = shared.get((hit["document_id"], hit["chunk_index"]), [])
+            if scope is None or hit["document_id"] in scope:
+                provenance = [
+                    _provenance(hit["document_id"], hit["chunk_index"], hit["page_number"], hit.get("parent_id")),
+                    *provenance,
+                ]
+            if not provenance:
+                continue  # a chunk of a document outside the scope that no duplicate in scope shares
+            sig = signature(hit["text"])
+            match = next((k for k, s in kept if similarity(sig, s) >= settings.chunk_dedup_threshold), None)
+            if match is not None:
+                match["provenance"].extend(p for p in provenance if p not in match["provenance"])
+                continue
+            kept.append(({**hit, **provenance[0], "provenance": provenance}, sig))
+        output.append([hit for hit, _ in kept[:top_k]])
+    return output
+
+
+async def release_document(db: AsyncSession, document_id: int) -> int:
+    """
+    Before a deleted document's chunks are removed: drop its provenance entries and hand
+    each vector it shares over to one of its duplicates in a document that still exists.
+    Returns how many vectors were handed over. Changes are flushed, not committed.
+    """
+    await db.execute(delete(ChunkDuplicate).where(ChunkDuplicate.document_id == document_id))
+    fingerprints = (
+        await db.execute(select(ChunkFingerprint).where(ChunkFingerprint.document_id == document_id))
+    ).scalars().all()
+    if not fingerprints:
+        return 0
+
+    by_id = {f.id: f for f in fingerprints}
+    heirs: dict[int, ChunkDuplicate] = {}
+    rows = await db.execute(
+        select(ChunkDuplicate)
+        .join(Document, Document.id == ChunkDuplicate.document_id)
+        .where(ChunkDuplicate.fingerprint_id.in_(by_id))
+        .order_by(ChunkDuplicate.fingerprint_id, ChunkDuplicate.document_id, ChunkDuplicate.chunk_index)
+    )
+    for duplicate in rows.scalars().all():
+        heirs.setdefault(duplicate.fingerprint_id, duplicate)
+
+    # Copy the vectors first: if that fails, nothing has changed and the cleanup retries
+    live = set(chroma_store.write_collection_names())
+    moves: dict[str, list] = {}
+    for fingerprint_id, heir in heirs.items():
+        fingerprint = by_id[fingerprint_id]
+        if fingerprint.collection_name in live:
+            moves.setdefault(fingerprint.collection_name, []).append((
+                document_id, fingerprint.chunk_index,
+                {"chunk_type": "child", **_provenance(heir.document_id, heir.chunk_index, heir.page_number, heir.parent_id)},
+            ))
+    for collection_name, collection_moves in moves.items():
+        await run_io(chroma_store.reassign_chunks, collection_name, collection_moves)
+
+    handed_over = 0
+    for fingerprint in fingerprints:
+        heir = heirs.get(fingerprint.id)
+        if heir is not None and fingerprint.collection_name in moves:
+            fingerprint.document_id, fingerprint.chunk_index = heir.document_id, heir.chunk_index
+            await db.delete(heir)
+            handed_over += 1
+        else:
+            # Explicit, since SQLite doesn't enforce the ON DELETE CASCADE
+            await db.execute(delete(ChunkBand).where(ChunkBand.fingerprint_id == fingerprint.id))
+            await db.execute(delete(ChunkDuplicate).where(ChunkDuplicate.fingerprint_id == fingerprint.id))
+            await db.delete(fingerprint)
+    await db.flush()
+    if handed_over:
+        logger.info("Document %d: handed %d shared vectors over to duplicates", document_id, handed_over)
+    return handed_over
+
+
+async def drop_collection(db: AsyncSession, collection_name: str) -> None:
+    """Forget the fingerprints of a collection that will never serve searches."""
+    fingerprint_ids = select(ChunkFingerprint.id).where(ChunkFingerprint.collection_name == collection_name)
+    await db.execute(delete(ChunkBand).where(ChunkBand.fingerprint_id.in_(fingerprint_ids)))
+    await db.execute(delete(ChunkDuplicate).where(ChunkDuplicate.fingerprint_id.in_(fingerprint_ids)))
+    await db.execute(delete(ChunkFingerprint).where(ChunkFingerprint.collection_name == collection_name))
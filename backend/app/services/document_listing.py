@@ -0,0 +1,96 @@
+"""
+Lightweight document listing:
+- summary projection (ocr_text and timeline deferred — ocr_text can be megabytes per document)
+- keyset pagination on (created_at, id), backed by ix_documents_user_created_id
+- per-user cached totals so library refreshes don't COUNT(*) every time
+"""
+import base64
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import select, func, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+
+from app.config import get_settings
+from app.models import Document
+
+settings = get_settings()
+
+_totals: dict[int, tuple[int, float]] = {}
+_totals_lock = threading.Lock()
+
+
+def encode_cursor(doc: Document) -> str:
+    raw = f"{doc.created_at.isoformat()}|{doc.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Raises ValueError on a malformed cursor."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, doc_id = base64.urlsafe_b64decode(padded).decode().rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(doc_id)
+    except Exception as e:
+        raise ValueError("Invalid pagination cursor.") from e
+
+
+async def list_document_summaries(
+    db: AsyncSession,
+    user_id: int,
+    limit: int,
+    cursor: str | None = None,
+    skip: int = 0,
+) -> tuple[list[Document], str | None]:
+    """
+    Newest-first page of a user's documents without OCR text.
+    Uses keyset pagination when a cursor is given, OFFSET otherwise (first page / legacy).
+    Returns (documents, next_cursor); next_cursor is None on the last page.
+    """
+    stmt = (
+        select(Document)
+        .options(defer(Document.ocr_text), defer(Document.timeline))
+        .where(Document.user_id == user_id)
+        .order_by(Document.created_at.desc(), Document.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        created_at, doc_id = decode_cursor(cursor)
+        stmt = stmt.where(
+            or_(
+                Document.created_at < created_at,
+                and_(Document.created_at == created_at, Document.id < doc_id),
+            )
+        )
+    elif skip:
+        stmt = stmt.offset(skip)
+
+    result = await db.execute(stmt)
+    docs = list(result.scalars().all())
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+
+async def get_document_total(db: AsyncSession, user_id: int) -> int:
+    """COUNT(*) of a user's documents, cached for document_total_cache_ttl_seconds."""
+    now = time.monotonic()
+    with _totals_lock:
+        cached = _totals.get(user_id)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
+    result = await db.execute(
+        select(func.count()).select_from(Document).where(Document.user_id == user_id)
+    )
+    total = result.scalar()
+    with _totals_lock:
+        _totals[user_id] = (total, now + settings.document_total_cache_ttl_seconds)
+    return total
+
+
+def invalidate_document_total(user_id: int) -> None:
+    """Call whenever a user's documents are created or deleted."""
+    with _totals_lock:
+        _totals.pop(user_id, None)
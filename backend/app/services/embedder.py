@@ -1,24 +1,42 @@
 """
 Cohere embedding service using embed-english-v3.0 (1024 dimensions).
 """
-import cohere
+import asyncio
+from typing import TYPE_CHECKING
 from app.config import get_settings
+from app.utils.metrics import PIPELINE_STAGE_SECONDS, QUERY_STAGE_SECONDS, timed
+
+if TYPE_CHECKING:
+    import cohere
 
 settings = get_settings()
-_client: cohere.Client | None = None
+# cohere is imported on first use — it costs ~0.8 s of cold start
+_client: "cohere.Client | None" = None
+_async_client: "cohere.AsyncClient | None" = None
 
 
-def get_cohere_client() -> cohere.Client:
+def get_cohere_client() -> "cohere.Client":
     global _client
     if _client is None:
+        import cohere
         _client = cohere.Client(api_key=settings.cohere_api_key)
     return _client
 
 
-def embed_documents(texts: list[str]) -> list[list[float]]:
+def get_cohere_async_client() -> "cohere.AsyncClient":
+    global _async_client
+    if _async_client is None:
+        import cohere
+        _async_client = cohere.AsyncClient(api_key=settings.cohere_api_key)
+    return _async_client
+
+
+def embed_documents(texts: list[str], model: str | None = None) -> list[list[float]]:
     """
     Embed a list of text strings for document storage.
     Uses input_type='search_document' as required by Cohere v3.
+    `model` defaults to settings.cohere_model; pass chroma_store.collection_model()
+    for the collection the vectors go into.
     """
     if not texts:
         return []
@@ -29,17 +47,18 @@ def embed_documents(texts: list[str]) -> list[list[float]]:
     batch_size = 90
     for i in range(0, len(texts), batch_size):
         batch = texts[i : i + batch_size]
-        response = client.embed(
-            texts=batch,
-            model=settings.cohere_model,
-            input_type="search_document",
-            embedding_types=["float"],
-        )
+        with PIPELINE_STAGE_SECONDS.time(stage="embedding"):
+            response = client.embed(
+                texts=batch,
+                model=model or settings.cohere_model,
+                input_type="search_document",
+                embedding_types=["float"],
+            )
         all_embeddings.extend(response.embeddings.float_)
     return all_embeddings
 
 
-def embed_query(text: str) -> list[float]:
+def embed_query(text: str, model: str | None = None) -> list[float]:
     """
     Embed a single query string.
     Uses input_type='search_query' as required by Cohere v3.
@@ -47,8 +66,40 @@ def embed_query(text: str) -> list[float]:
     client = get_cohere_client()
     response = client.embed(
         texts=[text],
-        model=settings.cohere_model,
+        model=model or settings.cohere_model,
         input_type="search_query",
         embedding_types=["float"],
     )
     return response.embeddings.float_[0]
+
+
+@timed(QUERY_STAGE_SECONDS, stage="query_embedding")
+async def embed_query_async(text: str, model: str | None = None) -> list[float]:
+    """Non-blocking embed_query using Cohere's native async client."""
+    client = get_cohere_async_client()
+    response = await client.embed(
+        texts=[text],
+        model=model or settings.cohere_model,
+        input_type="search_query",
+        embedding_types=["float"],
+    )
+    return response.embeddings.float_[0]
+
+
+@timed(QUERY_STAGE_SECONDS, stage="query_embedding")
+async def embed_queries_async(texts: list[str], model: str | None = None) -> list[list[float]]:
+    """Embed many query strings in as few Cohere calls as the batch limit allows."""
+    if not texts:
+        return []
+    client = get_cohere_async_client()
+    batch_size = 90
+    responses = await asyncio.gather(*(
+        client.embed(
+            texts=texts[i : i + batch_size],
+            model=model or settings.cohere_model,
+            input_type="search_query",
+            embedding_types=["float"],
+        )
+        for i in range(0, len(texts), batch_size)
+    ))
+    return [emb for response in responses for emb in response.embeddings.float_]
@@ -0,0 +1,138 @@
+"""
+Database-backed ingestion queue for app.worker.
+
+Pending documents are the queue, served to users in turn (see claim). A worker claims one
+by compare-and-set on its lease columns (lease_owner, lease_expires_at), which is safe
+across any number of worker processes without SKIP LOCKED. It renews the lease with a heartbeat while the pipeline
+runs, and clears it when done. If a worker dies, its lease expires and another worker
+takes the document over. After worker_max_attempts lost leases the document is marked FAILED,
+so a file that crashes workers can't loop forever.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models import Document, DocumentStatus
+
+settings = get_settings()
+logger = logging.getLogger("ocrtorag.ingest_queue")
+
+
+def _claimable(now: datetime):
+    return or_(
+        and_(
+            Document.status == DocumentStatus.PENDING,
+            or_(Document.lease_expires_at.is_(None), Document.lease_expires_at < now),
+        ),
+        # Stale: the worker running it stopped heartbeating
+        and_(Document.status == DocumentStatus.PROCESSING, Document.lease_expires_at < now),
+    )
+
+
+async def fail_exhausted(db: AsyncSession) -> int:
+    """Mark claimable documents that have already used up their attempts as FAILED."""
+    now = datetime.utcnow()
+    result = await db.execute(
+        update(Document)
+        .where(_claimable(now), func.coalesce(Document.attempts, 0) >= settings.worker_max_attempts)
+        .values(
+            status=DocumentStatus.FAILED,
+            processing_step="error",
+            error_message=f"Processing was interrupted {settings.worker_max_attempts} times; giving up.",
+            lease_owner=None,
+            lease_expires_at=None,
+        )
+    )
+    await db.commit()
+    if result.rowcount:
+        logger.warning("Gave up on %d document(s) after repeated lost leases", result.rowcount)
+    return result.rowcount
+
+
+async def claim(db: AsyncSession, worker_id: str, limit: int) -> list[tuple[int, str, str]]:
+    """
+    Lease up to `limit` documents, fairly across users. Returns (id, file_path, file_type).
+
+    Users take turns: a user's n-th pending document ranks after everyone's (n-1)-th,
+    counting the documents they already have in flight, so one user's large batch can't
+    starve the others. Within a user, smaller files (fewer pages, as far as is known
+    before OCR) go first, then the oldest.
+    """
+    now = datetime.utcnow()
+    in_flight = dict((await db.execute(
+        select(Document.user_id, func.count())
+        .where(Document.status == DocumentStatus.PROCESSING, Document.lease_expires_at >= now)
+        .group_by(Document.user_id)
+    )).all())
+    ranked = (
+        select(
+            Document.id, Document.user_id, Document.original_path, Document.file_type, Document.created_at,
+            func.row_number().over(
+                partition_by=Document.user_id,
+                order_by=(func.coalesce(Document.file_size, 0), Document.created_at, Document.id),
+            ).label("turn"),
+        )
+        .where(_claimable(now), Document.original_path.is_not(None))
+        .subquery()
+    )
+    # Over-fetch: other workers may win some of these races
+    result = await db.execute(select(ranked).where(ranked.c.turn <= limit * 2))
+    candidates = sorted(
+        result.all(), key=lambda r: (in_flight.get(r.user_id, 0) + r.turn, r.created_at, r.id)
+    )[: limit * 2]
+    claimed = []
+    for document_id, _, file_path, file_type, *_ in candidates:
+        if len(claimed) == limit:
+            break
+        won = await db.execute(
+            update(Document)
+            .where(Document.id == document_id, _claimable(now))
+            .values(
+                lease_owner=worker_id,
+                lease_expires_at=now + timedelta(seconds=settings.worker_lease_seconds),
+                attempts=func.coalesce(Document.attempts, 0) + 1,
+            )
+        )
+        await db.commit()
+        if won.rowcount == 1:
+            claimed.append((document_id, file_path, file_type))
+    return claimed
+
+
+async def renew(db: AsyncSession, worker_id: str, document_ids: list[int]) -> set[int]:
+    """Extend this worker's leases. Returns the ids whose lease it no longer holds."""
+    if not document_ids:
+        return set()
+    await db.execute(
+        update(Document)
+        .where(Document.id.in_(document_ids), Document.lease_owner == worker_id)
+        .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=settings.worker_lease_seconds))
+    )
+    await db.commit()
+    held = await db.execute(
+        select(Document.id).where(Document.id.in_(document_ids), Document.lease_owner == worker_id)
+    )
+    return set(document_ids) - set(held.scalars().all())
+
+
+async def release(db: AsyncSession, worker_id: str, document_id: int, requeue: bool = False) -> None:
+    """
+    Drop this worker's lease. With requeue (drain timeout), the document goes back to
+    PENDING for the next worker and the interrupted attempt isn't counted against it.
+    """
+    values: dict = {"lease_owner": None, "lease_expires_at": None}
+    if requeue:
+        values.update(
+            status=DocumentStatus.PENDING,
+            processing_step="Queued",
+            attempts=func.coalesce(Document.attempts, 1) - 1,
+        )
+    await db.execute(
+        update(Document)
+        .where(Document.id == document_id, Document.lease_owner == worker_id)
+        .values(**values)
+    )
+    await db.commit()
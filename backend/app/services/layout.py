@@ -0,0 +1,198 @@
+"""
+Fast page-layout analysis, run on each page before preprocessing and OCR.
+
+The page is downscaled to ANALYSIS_WIDTH px and binarized against its local background,
+so scanner noise and paper texture don't count as ink (Otsu on the full page would turn
+a blank page into noise). Speckle is removed with connected components. Then:
+  - a page with almost no ink is blank → skip OCR;
+  - ruling lines (table grids, form boxes, underlines) are removed, so they don't fuse the
+    characters they touch into one blob;
+  - characters are smeared horizontally into line blobs, and blobs with text-line
+    proportions are kept (photos and borders are not); no lines → OCR the full page, since
+    large type and unusual layouts fail the line test too;
+  - nearby lines are merged into blocks, and OCR is cropped to those blocks (or to their
+    union when that is nearly as small), padded by a margin.
+Blank pages skip preprocessing and OCR entirely. Regions are in the analysed
+page's coordinates; PageLayout.scaled_to maps them onto the preprocessed image, which may
+be upscaled and deskewed (each region becomes the bounding box of its rotated corners),
+and extract_regions maps word boxes back so generate_searchable_pdf places them
+unchanged.
+
+estimate_x_height uses the same ink mask to measure text size, which services/rasterizer.py
+uses to pick each page's decode resolution.
+"""
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+from PIL import Image
+
+ANALYSIS_WIDTH = 800
+INK_CONTRAST = 60             # grey levels darker than the local background that count as ink
+MIN_SPECK_AREA = 3            # px at analysis scale; smaller components are noise
+BLANK_INK_RATIO = 0.0001      # ink fraction below which a page counts as blank
+DARK_INK_RATIO = 0.5          # inverted scans / full-bleed photos: don't try to crop
+MAX_LINE_HEIGHT = 0.06        # of page height; taller blobs are pictures, not text
+MIN_LINE_WIDTH = 0.04         # of page width; a short word or page number still qualifies
+RULE_LENGTH = 0.1             # of page width/height; straight ink runs this long are rules
+MAX_REGIONS = 4               # more blocks than this → OCR their union in one call
+REGION_MARGIN = 0.025         # padding around each region, as a fraction of page width
+MIN_X_HEIGHT_SAMPLES = 20     # characters needed before trusting an x-height estimate
+
+
+@dataclass
+class PageLayout:
+    width: int
+    height: int
+    regions: list[tuple[int, int, int, int]] = field(default_factory=list)  # (x0, y0, x1, y1)
+    skip_reason: str | None = None  # "blank"
+    ink_ratio: float = 0.0
+
+    @property
+    def skip(self) -> bool:
+        return self.skip_reason is not None
+
+    @property
+    def pixels_saved(self) -> int:
+        """Pixels of the full page that OCR doesn't have to look at."""
+        ocr_pixels = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in self.regions)
+        return self.width * self.height - ocr_pixels
+
+    def scaled_to(self, size: tuple[int, int], angle: float = 0.0) -> list[tuple[int, int, int, int]]:
+        """
+        Regions in the coordinates of a resized version of the page (e.g. preprocessed),
+        rotated by `angle` degrees about its centre as preprocessing.deskew does.
+        """
+        w, h = size
+        sx, sy = w / self.width, h / self.height
+        rotation = cv2.getRotationMatrix2D((w // 2, h // 2), angle, 1.0)
+        regions = []
+        for x0, y0, x1, y1 in self.regions:
+            corners = np.array([[x0, y0, 1], [x1, y0, 1], [x0, y1, 1], [x1, y1, 1]], dtype=np.float64)
+            corners[:, 0] *= sx
+            corners[:, 1] *= sy
+            xs, ys = (corners @ rotation.T).T
+            regions.append((
+                max(0, int(xs.min())), max(0, int(ys.min())),
+                min(w, int(np.ceil(xs.max()))), min(h, int(np.ceil(ys.max()))),
+            ))
+        return regions
+
+
+def _ink_mask(page: Image.Image) -> tuple[np.ndarray, float]:
+    """Despeckled ink mask of the page at analysis scale, and that scale."""
+    width, height = page.size
+    scale = min(1.0, ANALYSIS_WIDTH / width)
+    small_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    # PIL's reduce/resize on the source is cheaper than converting the full page first
+    small = np.asarray(page.convert("L").resize(small_size, Image.BOX))
+    background = cv2.dilate(small, cv2.getStructuringElement(cv2.MORPH_RECT, (15, 15)))
+    ink = (background.astype(np.int16) - small > INK_CONTRAST).astype(np.uint8)
+
+    n, labels, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    keep = stats[:, cv2.CC_STAT_AREA] >= MIN_SPECK_AREA
+    keep[0] = False  # background
+    return keep[labels].astype(np.uint8), scale
+
+
+def estimate_x_height(page: Image.Image) -> float | None:
+    """
+    Typical lowercase letter height, in pixels of `page`, or None if the page has too
+    few characters to tell. Pages smaller than ANALYSIS_WIDTH are measured as they are.
+    """
+    ink, scale = _ink_mask(page)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    w, h = stats[1:, cv2.CC_STAT_WIDTH], stats[1:, cv2.CC_STAT_HEIGHT]
+    # Single characters: not rules or pictures (too tall/wide), not letters fused into
+    # words (wide), not punctuation (tiny). Fused letters would bias towards ascenders.
+    chars = h[(h >= 3) & (h <= ink.shape[0] * MAX_LINE_HEIGHT) & (w <= 2 * h)]
+    if len(chars) < MIN_X_HEIGHT_SAMPLES:
+        return None
+    # Lowercase x-height letters outnumber ascenders, descenders and capitals in running
+    # text; the lower percentile leans further towards them
+    return float(np.percentile(chars, 40)) / scale
+
+
+def analyze_page(page: Image.Image) -> PageLayout:
+    width, height = page.size
+    full = [(0, 0, width, height)]
+    ink, scale = _ink_mask(page)
+    ink_ratio = float(ink.mean())
+
+    if ink_ratio < BLANK_INK_RATIO:
+        return PageLayout(width, height, skip_reason="blank", ink_ratio=ink_ratio)
+    if ink_ratio > DARK_INK_RATIO:
+        return PageLayout(width, height, regions=full, ink_ratio=ink_ratio)
+
+    sh, sw = ink.shape
+    # Ruling lines would join the characters they touch into one blob that fails every
+    # text-line test below; no text stroke runs straight for RULE_LENGTH
+    rules = cv2.morphologyEx(
+        ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (max(8, int(sw * RULE_LENGTH)), 1))
+    ) | cv2.morphologyEx(
+        ink, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(8, int(sh * RULE_LENGTH))))
+    )
+    ink = ink & (1 - rules)
+
+    # Smear characters (and word gaps) into one blob per text line
+    gap = max(3, sw // 60)
+    lines = cv2.morphologyEx(ink, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (gap, 1)))
+    n, line_labels, stats, _ = cv2.connectedComponentsWithStats(lines, connectivity=8)
+    text_mask = np.zeros_like(ink)
+    max_line = max(4, int(sh * MAX_LINE_HEIGHT))
+    min_line_width = int(sw * MIN_LINE_WIDTH)
+    line_heights = []
+    for label, (x, y, w, h, area) in enumerate(stats[1:], start=1):
+        if w < min_line_width or area < 3 * min_line_width:
+            continue
+        blob = line_labels[y : y + h, x : x + w] == label
+        # Measure the blob along its own axis, so skewed scans don't look like tall blobs
+        _, (rw, rh), _ = cv2.minAreaRect(np.column_stack(np.nonzero(blob)).astype(np.float32))
+        length, thickness = max(rw, rh, 1.0), max(min(rw, rh), 1.0)
+        # A smeared text line is a long, nearly rectangular blob; photo texture smears
+        # into ragged shapes, rules are too thin, pictures too thick
+        if not (3 <= thickness <= max_line and length >= 3 * thickness and area >= 0.5 * length * thickness):
+            continue
+        blob_ink = ink[y : y + h, x : x + w] * blob
+        density = blob_ink.sum() / area
+        if not 0.08 <= density <= 0.85:  # solid bars are denser, faint smudges sparser
+            continue
+        # ...made of several separate characters
+        if cv2.connectedComponents(blob_ink, connectivity=8)[0] - 1 < 4:
+            continue
+        text_mask[y : y + h, x : x + w] = 1
+        line_heights.append(int(thickness))
+
+    if not line_heights:
+        # Ink, but nothing shaped like ordinary text lines: let OCR decide
+        return PageLayout(width, height, regions=full, ink_ratio=ink_ratio)
+
+    # Merge neighbouring lines into blocks
+    line_h = int(np.median(line_heights))
+    blocks_mask = cv2.dilate(
+        text_mask, cv2.getStructuringElement(cv2.MORPH_RECT, (gap * 3, line_h * 2 + 1))
+    )
+    n, _, stats, _ = cv2.connectedComponentsWithStats(blocks_mask, connectivity=8)
+    pad = max(2, int(sw * REGION_MARGIN))
+    blocks = [
+        (max(0, x - pad), max(0, y - pad), min(sw, x + w + pad), min(sh, y + h + pad))
+        for x, y, w, h, _area in stats[1:]
+    ]
+
+    union = (
+        min(b[0] for b in blocks), min(b[1] for b in blocks),
+        max(b[2] for b in blocks), max(b[3] for b in blocks),
+    )
+    union_area = (union[2] - union[0]) * (union[3] - union[1])
+    block_area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in blocks)
+    # Each region is a separate Tesseract call; only split when it saves real work
+    chosen = blocks if len(blocks) <= MAX_REGIONS and block_area < 0.7 * union_area else [union]
+
+    regions = [
+        (
+            int(x0 / scale), int(y0 / scale),
+            min(width, int(np.ceil(x1 / scale))), min(height, int(np.ceil(y1 / scale))),
+        )
+        for x0, y0, x1, y1 in sorted(chosen, key=lambda b: (b[1], b[0]))
+    ]
+    return PageLayout(width, height, regions=regions, ink_ratio=ink_ratio)
@@ -2,11 +2,12 @@
 OCR service using Tesseract (pytesseract).
 Extracts text with bounding boxes and confidence scores per page.
 """
+import struct
+import numpy as np
 import pytesseract
 from PIL import Image
-from dataclasses import dataclass, field
-from typing import Optional
-import pandas as pd
+from dataclasses import dataclass
+from typing import Iterator
 from app.config import get_settings
 
 settings = get_settings()
@@ -37,20 +38,147 @@ class WordBox:
     confidence: float
 
 
-@dataclass
+# Binary layout (little-endian): header, then left/top/width/height int32[n], conf float32[n],
+# offsets uint32[n+1], page text utf-8, word text buffer utf-8
+_MAGIC = b"OCRP"
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sBIIIfIII")
+
+
+@dataclass(eq=False)
 class PageOCRResult:
+    """
+    Columnar OCR result: one NumPy array per box field, and all word texts in a single
+    UTF-8 buffer sliced by `offsets` (word i is word_text[offsets[i]:offsets[i + 1]]).
+    `word_boxes` / iteration still yield WordBox objects for older callers.
+    """
     page_number: int
     text: str
-    word_boxes: list[WordBox]
     avg_confidence: float
     image_width: int
     image_height: int
+    left: np.ndarray     # int32
+    top: np.ndarray      # int32
+    width: np.ndarray    # int32
+    height: np.ndarray   # int32
+    conf: np.ndarray     # float32
+    offsets: np.ndarray  # uint32, len(words) + 1
+    word_text: bytes
+
+    def __len__(self) -> int:
+        return len(self.left)
+
+    def word(self, i: int) -> str:
+        return self.word_text[self.offsets[i] : self.offsets[i + 1]].decode("utf-8")
+
+    @property
+    def words(self) -> list[str]:
+        offsets = self.offsets.tolist()
+        buf = self.word_text
+        return [buf[offsets[i] : offsets[i + 1]].decode("utf-8") for i in range(len(self))]
+
+    def iter_word_boxes(self) -> Iterator[WordBox]:
+        columns = zip(
+            self.words, self.left.tolist(), self.top.tolist(),
+            self.width.tolist(), self.height.tolist(), self.conf.tolist(),
+        )
+        for text, left, top, width, height, conf in columns:
+            yield WordBox(text, left, top, width, height, conf)
+
+    @property
+    def word_boxes(self) -> list[WordBox]:
+        """Compatibility view — materialises one WordBox per word."""
+        return list(self.iter_word_boxes())
+
+    @classmethod
+    def from_columns(
+        cls,
+        page_number: int,
+        text: str,
+        words: list[str],
+        left, top, width, height, conf,
+        image_width: int,
+        image_height: int,
+    ) -> "PageOCRResult":
+        conf = np.asarray(conf, dtype=np.float32)
+        encoded = [w.encode("utf-8") for w in words]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return cls(
+            page_number=page_number,
+            text=text,
+            avg_confidence=float(conf.mean()) if len(conf) else 0.0,
+            image_width=image_width,
+            image_height=image_height,
+            left=np.asarray(left, dtype=np.int32),
+            top=np.asarray(top, dtype=np.int32),
+            width=np.asarray(width, dtype=np.int32),
+            height=np.asarray(height, dtype=np.int32),
+            conf=conf,
+            offsets=offsets,
+            word_text=b"".join(encoded),
+        )
+
+    @classmethod
+    def from_word_boxes(
+        cls, page_number: int, text: str, word_boxes: list[WordBox], image_width: int, image_height: int
+    ) -> "PageOCRResult":
+        return cls.from_columns(
+            page_number, text, [wb.text for wb in word_boxes],
+            [wb.left for wb in word_boxes], [wb.top for wb in word_boxes],
+            [wb.width for wb in word_boxes], [wb.height for wb in word_boxes],
+            [wb.confidence for wb in word_boxes], image_width, image_height,
+        )
+
+    def to_bytes(self) -> bytes:
+        """Compact binary form for caches and checkpoints (~20 bytes per word + text)."""
+        text = self.text.encode("utf-8")
+        header = _HEADER.pack(
+            _MAGIC, _FORMAT_VERSION, self.page_number, self.image_width, self.image_height,
+            self.avg_confidence, len(self), len(text), len(self.word_text),
+        )
+        return b"".join([
+            header,
+            self.left.astype("<i4").tobytes(), self.top.astype("<i4").tobytes(),
+            self.width.astype("<i4").tobytes(), self.height.astype("<i4").tobytes(),
+            self.conf.astype("<f4").tobytes(), self.offsets.astype("<u4").tobytes(),
+            text, self.word_text,
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "PageOCRResult":
+        magic, version, page_number, image_width, image_height, avg_conf, n, text_len, words_len = (
+            _HEADER.unpack_from(data)
+        )
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            raise ValueError("Not a serialized PageOCRResult (or unsupported version).")
+        pos = _HEADER.size
 
+        def take(dtype: str, count: int) -> np.ndarray:
+            nonlocal pos
+            arr = np.frombuffer(data, dtype=dtype, count=count, offset=pos)
+            pos += arr.nbytes
+            return arr.astype(dtype[1:])  # native byte order, writable copy
 
-def extract_page(preprocessed_img: Image.Image, page_number: int = 1) -> PageOCRResult:
+        left, top, width, height = (take("<i4", n) for _ in range(4))
+        conf = take("<f4", n)
+        offsets = take("<u4", n + 1)
+        text = data[pos : pos + text_len].decode("utf-8")
+        pos += text_len
+        word_text = bytes(data[pos : pos + words_len])
+        return cls(
+            page_number=page_number, text=text, avg_confidence=avg_conf,
+            image_width=image_width, image_height=image_height,
+            left=left, top=top, width=width, height=height, conf=conf,
+            offsets=offsets, word_text=word_text,
+        )
+
+
+def extract_page(preprocessed_img: Image.Image, page_number: int = 1, timeout: float = 0) -> PageOCRResult:
     """
     Run Tesseract on a single preprocessed PIL image.
     Returns structured OCR result with bounding boxes and confidence.
+    A non-zero `timeout` (seconds, per Tesseract call) kills Tesseract and raises RuntimeError.
     """
     w, h = preprocessed_img.size
 
@@ -58,6 +186,7 @@ def extract_page(preprocessed_img: Image.Image, page_number: int = 1) -> PageOCR
     full_text = pytesseract.image_to_string(
         preprocessed_img,
         config="--psm 3 --oem 3",  # Auto page segmentation, LSTM engine
+        timeout=timeout,
     ).strip()
 
     # Detailed data with bounding boxes and confidence
@@ -65,35 +194,61 @@ def extract_page(preprocessed_img: Image.Image, page_number: int = 1) -> PageOCR
         preprocessed_img,
         config="--psm 3 --oem 3",
         output_type=pytesseract.Output.DICT,
+        timeout=timeout,
     )
 
-    word_boxes: list[WordBox] = []
-    confidences: list[float] = []
-
-    for i, word_text in enumerate(data["text"]):
-        conf = data["conf"][i]
-        if conf == -1 or not word_text.strip():
-            continue
-        conf_float = float(conf)
-        confidences.append(conf_float)
-        word_boxes.append(
-            WordBox(
-                text=word_text.strip(),
-                left=data["left"][i],
-                top=data["top"][i],
-                width=data["width"][i],
-                height=data["height"][i],
-                confidence=conf_float,
-            )
-        )
-
-    avg_conf = float(sum(confidences) / len(confidences)) if confidences else 0.0
+    # Vectorized filter: drop non-word levels (conf == -1) and blank tokens
+    conf = np.asarray(data["conf"], dtype=np.float32)
+    words = np.char.strip(np.asarray(data["text"], dtype=str))
+    keep = (conf != -1) & (np.char.str_len(words) > 0)
 
-    return PageOCRResult(
+    return PageOCRResult.from_columns(
         page_number=page_number,
         text=full_text,
-        word_boxes=word_boxes,
-        avg_confidence=avg_conf,
+        words=words[keep].tolist(),
+        left=np.asarray(data["left"])[keep],
+        top=np.asarray(data["top"])[keep],
+        width=np.asarray(data["width"])[keep],
+        height=np.asarray(data["height"])[keep],
+        conf=conf[keep],
+        image_width=w,
+        image_height=h,
+    )
+
+
+def extract_regions(
+    preprocessed_img: Image.Image,
+    page_number: int,
+    regions: list[tuple[int, int, int, int]] | None,
+    timeout: float = 0,
+) -> PageOCRResult:
+    """
+    OCR only the given (x0, y0, x1, y1) regions of the page (see services/layout.py).
+    Word boxes are shifted back into full-page coordinates and image_width/height stay
+    those of the full page, so the result is interchangeable with extract_page's.
+    """
+    w, h = preprocessed_img.size
+    if not regions or regions == [(0, 0, w, h)]:
+        return extract_page(preprocessed_img, page_number, timeout)
+
+    parts = [(box, extract_page(preprocessed_img.crop(box), page_number, timeout)) for box in regions]
+    return PageOCRResult.from_columns(
+        page_number=page_number,
+        text="\n\n".join(r.text for _, r in parts if r.text),
+        words=[word for _, r in parts for word in r.words],
+        left=np.concatenate([r.left + box[0] for box, r in parts]),
+        top=np.concatenate([r.top + box[1] for box, r in parts]),
+        width=np.concatenate([r.width for _, r in parts]),
+        height=np.concatenate([r.height for _, r in parts]),
+        conf=np.concatenate([r.conf for _, r in parts]),
         image_width=w,
         image_height=h,
     )
+
+
+def empty_result(page_number: int, image_width: int, image_height: int) -> PageOCRResult:
+    """Result for a page that was not OCR'd (blank)."""
+    return PageOCRResult.from_columns(
+        page_number=page_number, text="", words=[], left=[], top=[], width=[], height=[], conf=[],
+        image_width=image_width, image_height=image_height,
+    )
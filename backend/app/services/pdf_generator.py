@@ -9,6 +9,7 @@ from reportlab.lib.units import mm
 from reportlab.lib.utils import ImageReader
 from PIL import Image
 import io
+import numpy as np
 from app.services.ocr import PageOCRResult
 
 
@@ -54,28 +55,22 @@ def generate_searchable_pdf(
         c.drawImage(img_reader, 0, 0, width=pw, height=ph)
 
         # Invisible text overlay aligned to Tesseract bounding boxes
-        # reportlab origin is bottom-left; image origin is top-left — flip y
-        for wb in ocr_result.word_boxes:
-            if not wb.text.strip() or wb.confidence < 20:
-                continue
-
-            # Scale from OCR image pixels to original image pixels
-            scale_x = img_w / ocr_result.image_width
-            scale_y = img_h / ocr_result.image_height
-
-            x_px = wb.left * scale_x
-            y_px = wb.top * scale_y
-            w_px = wb.width * scale_x
-            h_px = wb.height * scale_y
-
-            # Convert to PDF points, flip y
-            x_pt = _pt(x_px)
-            y_pt = ph - _pt(y_px) - _pt(h_px)
-            font_size = max(4, _pt(h_px) * 0.9)
-
-            c.setFont("Helvetica", font_size)
+        # reportlab origin is bottom-left; image origin is top-left — flip y.
+        # Scaling from OCR image pixels to PDF points is done for all words at once.
+        keep = np.flatnonzero(ocr_result.conf >= 20)
+        if len(keep):
+            to_pt_x = pw / ocr_result.image_width
+            to_pt_y = ph / ocr_result.image_height
+            h_pt = ocr_result.height[keep] * to_pt_y
+            x_pt = ocr_result.left[keep] * to_pt_x
+            y_pt = ph - ocr_result.top[keep] * to_pt_y - h_pt
+            font_sizes = np.maximum(4, h_pt * 0.9)
+
+            words = ocr_result.words
             c.setFillColorRGB(0, 0, 0, alpha=0)  # fully transparent text
-            c.drawString(x_pt, y_pt, wb.text)
+            for i, x, y, size in zip(keep.tolist(), x_pt.tolist(), y_pt.tolist(), font_sizes.tolist()):
+                c.setFont("Helvetica", size)
+                c.drawString(x, y, words[i])
 
         c.showPage()
 
@@ -1,23 +1,36 @@
 """
 Ingestion pipeline orchestrator:
-Preprocessing → OCR → PDF Generation → Chunking → Embedding → ChromaDB upsert
+Preprocessing → OCR → PDF Generation → Chunking → Dedup → Embedding → ChromaDB upsert
+The imaging/OCR stack (PIL, OpenCV, pytesseract, reportlab, pypdf, pdf2image) is
+imported on the first run, so API instances that never ingest don't pay for it.
+Runs can be cancelled and are time-limited; see services/cancellation.py.
 """
-import asyncio
+import os
+from contextlib import asynccontextmanager
 from pathlib import Path
-from PIL import Image
-import pypdf
-from pdf2image import convert_from_path
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm.exc import ObjectDeletedError, StaleDataError
 
+from app.config import get_settings
 from app.models import Document, DocumentStatus
-from app.services.preprocessing import preprocess_image
-from app.services.ocr import extract_page, PageOCRResult
-from app.services.pdf_generator import generate_searchable_pdf
-from app.services.chunker import chunk_pages
+from app.services.chunker import chunk_pages, PAGE_BREAK
 from app.services.embedder import embed_documents
-from app.services.chroma_store import upsert_chunks
+from app.services.chroma_store import (
+    upsert_chunks_async, chunk_records, active_collection_name, write_collection_names, collection_model,
+)
+from app.services.answer_cache import invalidate_documents
+from app.services import cancellation, vector_cleanup
+from app.services.dedup import Deduplicator
+from app.services.cancellation import CancelToken, PipelineCancelled
 from app.utils.file_utils import get_pdf_path
+from app.services.scheduler import apply_thread_limits, get_scheduler
+from app.services.timeline import Timeline
+from app.utils.metrics import (
+    PIPELINES_IN_FLIGHT, PIPELINE_RUNS, PIPELINE_PAGES, BYTES_PROCESSED, OCR_PAGES_SKIPPED, OCR_PIXELS_SAVED,
+)
+
+settings = get_settings()
 
 
 async def run_pipeline(
@@ -26,13 +39,70 @@ async def run_pipeline(
     file_path: str,
     file_type: str,
 ) -> None:
-    """Full OCR-to-RAG ingestion pipeline. Updates Document record in place."""
+    """
+    Full OCR-to-RAG ingestion pipeline. Updates Document record in place.
+    A cancelled run returns normally with the document marked cancelled; failures and
+    timeouts mark it FAILED and raise.
+    """
+    with PIPELINES_IN_FLIGHT.track_inprogress(), cancellation.track(document_id) as token:
+        try:
+            await _run_pipeline(db, document_id, file_path, file_type, token)
+        except Exception:
+            PIPELINE_RUNS.inc(outcome="failed")
+            raise
+    if token.cancelled:
+        PIPELINE_RUNS.inc(outcome="cancelled")
+        return
+    PIPELINE_RUNS.inc(outcome="completed")
+    if os.path.exists(file_path):
+        BYTES_PROCESSED.inc(os.path.getsize(file_path), kind="pipeline")
+
+
+@asynccontextmanager
+async def _cpu_slot(
+    timeline: Timeline,
+    token: CancelToken,
+    db: AsyncSession,
+    user_id: int,
+    pages_left: int,
+    page: int | None = None,
+):
+    """Hold a page-work slot of the CPU budget; time spent queueing goes on the timeline."""
+    scheduler = get_scheduler()
+    await token.guard(timeline.wait("queue", scheduler.acquire(user_id, pages_left), page=page), db)
+    try:
+        yield
+    finally:
+        scheduler.release()
+
+
+async def _run_pipeline(
+    db: AsyncSession,
+    document_id: int,
+    file_path: str,
+    file_type: str,
+    token: CancelToken,
+) -> None:
+    from PIL import Image
+    import pypdf
+    from app.services.rasterizer import decode_image, rasterize_pdf
+    from app.services.preprocessing import preprocess_image
+    from app.services.layout import analyze_page
+    from app.services.ocr import extract_regions, empty_result, PageOCRResult
+    from app.services.pdf_generator import generate_searchable_pdf
+
+    apply_thread_limits()
     doc_result = await db.execute(select(Document).where(Document.id == document_id))
     doc = doc_result.scalar_one_or_none()
     if not doc:
         return
 
+    # Stages also feed the /metrics histograms; embedding and upsert are observed by their services
+    timeline = Timeline()
+    upserted = False
     try:
+        # Cancelled while still queued
+        await token.checkpoint(db)
         doc.status = DocumentStatus.PROCESSING
         doc.processing_step = "Uploading"
         await db.commit()
@@ -47,25 +117,35 @@ async def run_pipeline(
             try:
                 # Attempt to convert PDF to images for OCR (vital for scanned docs)
                 # Note: Requires Poppler to be installed and in PATH on Windows
-                imgs = await asyncio.get_event_loop().run_in_executor(
-                    None, lambda: convert_from_path(file_path, dpi=200)
-                )
+                try:
+                    pages_hint = len(pypdf.PdfReader(file_path).pages)
+                except Exception:
+                    pages_hint = 1
+                async with _cpu_slot(timeline, token, db, doc.user_id, pages_hint):
+                    imgs = await token.guard(
+                        timeline.run_in_executor("rasterize", rasterize_pdf, file_path, token.remaining()), db
+                    )
+                timeline.spans[-1].bytes = os.path.getsize(file_path)
                 if not imgs:
                     raise ValueError("No images extracted from PDF.")
                 pages_pil.extend(imgs)
+            except (PipelineCancelled, cancellation.PipelineTimeout):
+                raise
             except Exception as e:
                 # Fallback to direct text extraction if pdf2image/poppler fails
                 # Log the error so it's visible in uvicorn terminal
                 print(f"pdf2image conversion failed: {e}")
                 
-                reader = pypdf.PdfReader(file_path)
-                if not reader.pages:
-                    raise ValueError("PDF file has no pages or is unreadable.")
-                
-                for page in reader.pages:
-                    text_direct = page.extract_text() or ""
-                    pages_pil.append(None)
-                    fallback_texts.append(text_direct)
+                with timeline.stage("text_extraction") as span:
+                    reader = pypdf.PdfReader(file_path)
+                    if not reader.pages:
+                        raise ValueError("PDF file has no pages or is unreadable.")
+
+                    for page in reader.pages:
+                        text_direct = page.extract_text() or ""
+                        pages_pil.append(None)
+                        fallback_texts.append(text_direct)
+                    span.bytes = sum(len(t.encode()) for t in fallback_texts)
                 
                 # If we have no images and no extracted text, this doc is basically empty for RAG
                 if all(not t.strip() for t in fallback_texts):
@@ -78,13 +158,8 @@ async def run_pipeline(
                     # We don't necessarily raise here if we want to allow "empty" results, 
                     # but usually it's better to fail if it's useless.
         else:
-            img = Image.open(file_path)
-            try:
-                for i in range(img.n_frames):
-                    img.seek(i)
-                    pages_pil.append(img.copy())
-            except (AttributeError, EOFError):
-                pages_pil.append(img.copy())
+            pages_pil.extend(await token.guard(timeline.run_in_executor("decode", decode_image, file_path), db))
+            timeline.spans[-1].bytes = os.path.getsize(file_path)
 
         # ── Step 2: Preprocess + OCR each page ────────────────────────────
         doc.processing_step = "OCR"
@@ -96,22 +171,56 @@ async def run_pipeline(
         page_texts: list[tuple[int, str]] = []
 
         for i, pil_img in enumerate(pages_pil, start=1):
+            await token.checkpoint(db)
             if pil_img is None:
                 text = fallback_texts[i - 1] if (i - 1) < len(fallback_texts) else ""
                 page_texts.append((i, text))
+                doc.ocr_text += text + "\n\n" + PAGE_BREAK
                 continue
 
-            original_rgb, processed = preprocess_image(pil_img)
-            original_pages.append(original_rgb)
+            # One slot covers this page's preprocessing and OCR; other documents' pages
+            # get the next slot, so a long document can't monopolise the CPU budget
+            async with _cpu_slot(timeline, token, db, doc.user_id, len(pages_pil) - i + 1, page=i):
+                with token.page():
+                    layout = None
+                    if settings.ocr_layout_analysis:
+                        layout = await token.guard(
+                            timeline.run_in_executor("layout", analyze_page, pil_img, page=i), db
+                        )
+                        # For this span, bytes = source-page pixels OCR doesn't have to read
+                        timeline.spans[-1].bytes = layout.pixels_saved
+                        OCR_PIXELS_SAVED.inc(layout.pixels_saved)
 
-            ocr_result = await asyncio.get_event_loop().run_in_executor(
-                None, extract_page, processed, i
-            )
+                    if layout is not None and layout.skip:
+                        # Blank: no preprocessing or OCR, but the page stays in the PDF
+                        OCR_PAGES_SKIPPED.inc(reason=layout.skip_reason)
+                        original_rgb = pil_img.convert("RGB")
+                        ocr_result = empty_result(i, *pil_img.size)
+                    else:
+                        # Pages already arrive at OCR resolution unless adaptive decoding is off
+                        min_side = 0 if settings.ocr_adaptive_resolution else 1000
+                        original_rgb, processed, angle = await token.guard(
+                            timeline.run_in_executor("preprocessing", preprocess_image, pil_img, min_side, page=i),
+                            db,
+                        )
+                        timeline.spans[-1].bytes = processed.width * processed.height * len(processed.getbands())
+                        regions = layout.scaled_to(processed.size, angle) if layout is not None else None
+                        # Tesseract gets the rest of the budget as its timeout, so it can't outlive it
+                        ocr_result = await token.guard(
+                            timeline.run_in_executor(
+                                "ocr", extract_regions, processed, i, regions, token.remaining() or 0, page=i
+                            ),
+                            db,
+                        )
+                        timeline.spans[-1].bytes = len(ocr_result.text.encode())
+            original_pages.append(original_rgb)
+            PIPELINE_PAGES.inc()
             page_ocr_results.append(ocr_result)
             page_texts.append((i, ocr_result.text))
             
             # Append to ocr_text for real-time SSE streaming
-            doc.ocr_text += ocr_result.text + "\n\n"
+            # PAGE_BREAK lets reindex.py re-chunk the stored text page by page
+            doc.ocr_text += ocr_result.text + "\n\n" + PAGE_BREAK
             await db.commit()
 
         # ── Step 3: Generate searchable PDF ───────────────────────────────
@@ -123,57 +232,76 @@ async def run_pipeline(
 
         if original_pages and page_ocr_results:
             paired = list(zip(original_pages, page_ocr_results))
-            await asyncio.get_event_loop().run_in_executor(
-                None, generate_searchable_pdf, paired, pdf_output_path
-            )
+            await token.checkpoint(db)
+            async with _cpu_slot(timeline, token, db, doc.user_id, len(paired)):
+                await token.guard(
+                    timeline.run_in_executor("pdf_generation", generate_searchable_pdf, paired, pdf_output_path),
+                    db,
+                )
+            if os.path.exists(pdf_output_path):
+                timeline.spans[-1].bytes = os.path.getsize(pdf_output_path)
         else:
             pdf_output_path = file_path if file_type == ".pdf" else None
 
         # ── Step 4: Chunk text ────────────────────────────────────────────
-        chunks = chunk_pages(page_texts)
+        with timeline.stage("chunking"):
+            chunks = chunk_pages(page_texts)
+
+        # Near-duplicate children (boilerplate, repeated form pages) share a stored vector.
+        # Not while a re-index builds: it deduplicates this document in its own collection.
+        deduplicator = None
+        stored_chunks = chunks
+        if settings.chunk_dedup_enabled and len(write_collection_names()) == 1:
+            deduplicator = Deduplicator(db, doc.user_id, active_collection_name())
+            with timeline.stage("dedup"):
+                stored_chunks = await deduplicator.plan(document_id, chunks)
 
         # ── Step 5: Embed child chunks via Gemini ─────────────────────────
         doc.processing_step = "Embedding"
         await db.commit()
         
-        child_chunks = [c for c in chunks if c.chunk_type == "child"]
-        parent_chunks = [c for c in chunks if c.chunk_type == "parent"]
-        
-        texts_to_embed = [c.text for c in child_chunks]
-        child_embeddings: list[list[float]] = []
-        if texts_to_embed:
-            child_embeddings = await asyncio.get_event_loop().run_in_executor(
-                None, embed_documents, texts_to_embed
-            )
+        # Each collection gets vectors from its own index version's model, so while a
+        # re-index to another Cohere model builds, the children are embedded once per model
+        collections_by_model: dict[str, list[str]] = {}
+        for name in write_collection_names():
+            collections_by_model.setdefault(collection_model(name), []).append(name)
+
+        texts_to_embed = [c.text for c in stored_chunks if c.chunk_type == "child"]
+        child_embeddings: dict[str, list[list[float]]] = {}
+        for model in collections_by_model:
+            child_embeddings[model] = []
+            if texts_to_embed:
+                child_embeddings[model] = await token.guard(
+                    timeline.run_in_executor("embedding", embed_documents, texts_to_embed, model, observe=False), db
+                )
+                timeline.spans[-1].bytes = sum(len(t.encode()) for t in texts_to_embed)
 
         # ── Step 6: Upsert into ChromaDB ──────────────────────────────────
         # We index child chunks with real embeddings.
         # We index parent chunks with dummy embeddings so we can retrieve them by parent_id.
-        from app.config import get_settings
-        dim = get_settings().embed_dimension
-        
-        chunk_dicts = []
-        all_embeddings = []
-        
-        for c, emb in zip(child_chunks, child_embeddings):
-            chunk_dicts.append({
-                "text": c.text, "chunk_index": c.chunk_index, "page_number": c.page_number,
-                "chunk_type": c.chunk_type, "parent_id": c.parent_id
-            })
-            all_embeddings.append(emb)
-            
-        for c in parent_chunks:
-            chunk_dicts.append({
-                "text": c.text, "chunk_index": c.chunk_index, "page_number": c.page_number,
-                "chunk_type": c.chunk_type, "parent_id": c.parent_id
-            })
-            all_embeddings.append([0.0] * dim) # Dummy embedding
-
-        upsert_chunks(
-            document_id=document_id,
-            chunks=chunk_dicts,
-            embeddings=all_embeddings,
-        )
+        # Last chance to stop before writing vectors; after this, cancelling means removing them
+        await token.checkpoint(db)
+        upserted = True
+        with timeline.stage("upsert", observe=False) as span:
+            for model, names in collections_by_model.items():
+                chunk_dicts, all_embeddings = chunk_records(stored_chunks, child_embeddings[model])
+                for name in names:
+                    # On cancel, upsert_chunks_async unwinds only after its in-flight batches land,
+                    # so the cleanup _record_cancelled enqueues can't run ahead of them
+                    result = await token.guard(
+                        upsert_chunks_async(
+                            document_id=document_id, chunks=chunk_dicts, embeddings=all_embeddings,
+                            collection_name=name,
+                        ),
+                        db,
+                    )
+                    span.bytes += result.bytes
+                    span.retries += result.retries
+        # Cached answers over this document were built from its previous chunks
+        invalidate_documents([document_id])
+        # A delete during the upsert must be seen now, not up to POLL_SECONDS later,
+        # so its chunks are cleaned up after they've all landed
+        await token.checkpoint(db, force=True)
 
         # ── Step 7: Update document record ────────────────────────────────
         doc.pdf_path = pdf_output_path
@@ -186,11 +314,43 @@ async def run_pipeline(
         )
         doc.status = DocumentStatus.COMPLETED
         doc.processing_step = "Done"
+        doc.timeline = timeline.to_json()
+        if deduplicator is not None:
+            deduplicator.save()
         await db.commit()
 
     except Exception as exc:
+        if isinstance(exc, (StaleDataError, ObjectDeletedError)):
+            # The row was deleted after the last checkpoint (the UPDATE matched nothing)
+            token.cancel(cancellation.DOCUMENT_DELETED)
+        if token.cancelled:
+            await _record_cancelled(db, doc, token, timeline, upserted)
+            return
         doc.status = DocumentStatus.FAILED
         doc.processing_step = "error"
         doc.error_message = str(exc)
+        doc.timeline = timeline.to_json()
         await db.commit()
         raise
+
+
+async def _record_cancelled(
+    db: AsyncSession,
+    doc: Document,
+    token: CancelToken,
+    timeline: Timeline,
+    upserted: bool,
+) -> None:
+    # Drop uncommitted progress; the last flush may also have failed on a deleted row
+    await db.rollback()
+    if upserted:
+        # Chunks may already be in ChromaDB; the cleanup worker removes them
+        await vector_cleanup.enqueue(db, [token.document_id])
+    if token.reason != cancellation.DOCUMENT_DELETED:
+        doc.status = DocumentStatus.FAILED
+        doc.processing_step = "Cancelled"
+        doc.error_message = token.reason
+        doc.timeline = timeline.to_json()
+    await db.commit()
+    if upserted:
+        vector_cleanup.wake()
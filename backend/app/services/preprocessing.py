@@ -22,12 +22,12 @@ def cv_to_pil(arr: np.ndarray) -> Image.Image:
     return Image.fromarray(cv2.cvtColor(arr, cv2.COLOR_BGR2RGB))
 
 
-def deskew(img_gray: np.ndarray) -> np.ndarray:
-    """Correct skew using Hough line transform."""
+def deskew(img_gray: np.ndarray) -> tuple[np.ndarray, float]:
+    """Correct skew using Hough line transform. Returns the image and the angle it was rotated by."""
     edges = cv2.Canny(img_gray, 50, 150, apertureSize=3)
     lines = cv2.HoughLines(edges, 1, np.pi / 180, threshold=100)
     if lines is None:
-        return img_gray
+        return img_gray, 0.0
 
     angles = []
     for line in lines[:20]:
@@ -37,11 +37,11 @@ def deskew(img_gray: np.ndarray) -> np.ndarray:
             angles.append(angle)
 
     if not angles:
-        return img_gray
+        return img_gray, 0.0
 
     median_angle = float(np.median(angles))
     if abs(median_angle) < 0.5:
-        return img_gray
+        return img_gray, 0.0
 
     h, w = img_gray.shape
     center = (w // 2, h // 2)
@@ -49,7 +49,7 @@ def deskew(img_gray: np.ndarray) -> np.ndarray:
     rotated = cv2.warpAffine(
         img_gray, M, (w, h), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE
     )
-    return rotated
+    return rotated, median_angle
 
 
 def enhance_contrast(img_gray: np.ndarray) -> np.ndarray:
@@ -69,29 +69,33 @@ def binarize(img_gray: np.ndarray) -> np.ndarray:
     return binary
 
 
-def preprocess_image(pil_img: Image.Image) -> tuple[Image.Image, Image.Image]:
+def preprocess_image(pil_img: Image.Image, min_side: int = 1000) -> tuple[Image.Image, Image.Image, float]:
     """
     Full preprocessing pipeline.
+    Args:
+        min_side: upscale smaller pages to this; 0 when services/rasterizer.py already
+                  decoded the page at OCR resolution
     Returns:
         original_rgb: original (for PDF background)
         processed:    preprocessed image (for OCR input)
+        angle:        degrees deskew rotated it by, about its centre (for PageLayout.scaled_to)
     """
     # Keep original at high res for PDF background
     original_rgb = pil_img.convert("RGB")
 
     # Ensure minimum resolution for OCR (300 DPI equivalent)
     w, h = pil_img.size
-    if min(w, h) < 1000:
-        scale = 1000 / min(w, h)
+    if min(w, h) < min_side:
+        scale = min_side / min(w, h)
         pil_img = pil_img.resize((int(w * scale), int(h * scale)), Image.LANCZOS)
 
     arr = pil_to_cv(pil_img)
     gray = cv2.cvtColor(arr, cv2.COLOR_BGR2GRAY)
 
-    gray = deskew(gray)
+    gray, angle = deskew(gray)
     gray = enhance_contrast(gray)
     gray = denoise(gray)
     binary = binarize(gray)
 
     processed = Image.fromarray(binary)
-    return original_rgb, processed
+    return original_rgb, processed, angle
@@ -0,0 +1,103 @@
+"""
+In-process TTL cache of authenticated principals, keyed by JWT subject (user id).
+Lets get_current_user skip the `users` lookup on hot paths such as SSE polling.
+Entries are dropped as soon as a user's is_active flag changes or the user is
+deleted in this process; the TTL bounds staleness for changes made elsewhere.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import event, inspect
+
+from app.config import get_settings
+from app.models import User
+
+settings = get_settings()
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    name: str
+    email: str
+    is_active: bool
+    created_at: datetime
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id, name=user.name, email=user.email,
+            is_active=user.is_active, created_at=user.created_at,
+        )
+
+    def to_user(self) -> User:
+        """A fresh transient User per request — cached ORM instances are never shared."""
+        return User(
+            id=self.id, name=self.name, email=self.email,
+            is_active=self.is_active, created_at=self.created_at,
+        )
+
+
+class PrincipalCache:
+    def __init__(self, ttl_seconds: int, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, tuple[Principal, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Principal | None:
+        with self._lock:
+            item = self._entries.get(user_id)
+            if item is None or item[1] <= time.monotonic():
+                self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return item[0]
+
+    def put(self, principal: Principal) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[principal.id] = (principal, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(principal.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+principal_cache = PrincipalCache(
+    ttl_seconds=settings.principal_cache_ttl_seconds,
+    max_entries=settings.principal_cache_max_entries,
+)
+
+
+@event.listens_for(User.is_active, "set")
+def _on_is_active_set(target: User, value, oldvalue, initiator) -> None:
+    # Transient Users built by Principal.to_user() also fire this; only stored users matter
+    if inspect(target).persistent and value != oldvalue:
+        principal_cache.invalidate(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _on_user_deleted(mapper, connection, target: User) -> None:
+    principal_cache.invalidate(target.id)
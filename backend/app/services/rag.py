@@ -1,24 +1,54 @@
 """
 RAG service:
 1. Embed user query via Cohere
-2. Retrieve top-k similar chunks via ChromaDB cosine search
+2. Retrieve top-k similar chunks via ChromaDB cosine search, credited to every document
+   sharing each vector (dedup.py)
 3. Fetch document names from PostgreSQL
-4. Build grounded prompt → Gemini 2.5 Flash
+4. Pack parents into a token budget (context_packer.py)
+5. Build grounded prompt → Gemini 2.5 Flash
+Finished answers are memoised in the answer cache (see answer_cache.py).
+Nothing on this path blocks the event loop: Cohere and Gemini use their native
+async clients, ChromaDB calls run in the bounded I/O thread pool.
 """
-import google.generativeai as genai
+import asyncio
+import logging
+import time
+from typing import AsyncIterator
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.config import get_settings
-from app.services.embedder import embed_query
-from app.services.chroma_store import search_chunks, get_parent_chunks
+from app.services.embedder import embed_query_async, embed_queries_async
+from app.services.chroma_store import search_chunks_batch, get_parent_chunks, collection_model
+from app.services import dedup
+from app.services.answer_cache import answer_cache
+from app.services.context_packer import pack_context, estimate_tokens, PackStats
+from app.utils.concurrency import run_io
+from app.utils.metrics import QUERY_STAGE_SECONDS, QUERIES
 from app.models import Document
 
 settings = get_settings()
+logger = logging.getLogger("ocrtorag.rag")
 
-genai.configure(api_key=settings.gemini_api_key)
+# Bump whenever build_rag_prompt or context packing changes so old cached answers are ignored
+PROMPT_VERSION = "2"
+
+NO_RESULTS_ANSWER = "No relevant documents found. Please upload some documents first."
+
+_genai = None
+
+
+def _get_genai():
+    """Import and configure google.generativeai on first use (~0.5 s of cold start)."""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        genai.configure(api_key=settings.gemini_api_key)
+        _genai = genai
+    return _genai
 
 
 def get_gemini_model():
+    genai = _get_genai()
     return genai.GenerativeModel(
         model_name=settings.gemini_model,
         generation_config=genai.GenerationConfig(
@@ -28,20 +58,12 @@ def get_gemini_model():
     )
 
 
-async def _enrich_with_doc_names(
-    db: AsyncSession,
-    chunks: list[dict],
-) -> list[dict]:
-    """Join ChromaDB results with document names from PostgreSQL."""
-    doc_ids = list({c["document_id"] for c in chunks})
+async def _fetch_doc_names(db: AsyncSession, doc_ids: list[int]) -> dict[int, str]:
+    """Look up document names in PostgreSQL for the given IDs."""
     result = await db.execute(
         select(Document.id, Document.original_filename).where(Document.id.in_(doc_ids))
     )
-    id_to_name = {row[0]: row[1] for row in result.fetchall()}
-
-    for chunk in chunks:
-        chunk["document_name"] = id_to_name.get(chunk["document_id"], f"Doc #{chunk['document_id']}")
-    return chunks
+    return {row[0]: row[1] for row in result.fetchall()}
 
 
 def build_rag_prompt(query: str, chunks: list[dict]) -> str:
@@ -64,6 +86,88 @@ USER QUESTION: {query}
 ANSWER (cite the source document name where relevant):"""
 
 
+async def _search(
+    db: AsyncSession,
+    query_embeddings: list[list[float]],
+    top_k: int,
+    document_ids: list[int] | None,
+) -> list[list[dict]]:
+    """Top-k child chunks per query vector, with shared vectors credited to the documents in scope."""
+    if not settings.chunk_dedup_enabled:
+        return await run_io(search_chunks_batch, query_embeddings, top_k=top_k, document_ids=document_ids)
+    scope = await dedup.search_scope(db, document_ids) if document_ids else None
+    # Over-fetch: hits outside the scope and near-duplicate hits are dropped
+    hits = await run_io(search_chunks_batch, query_embeddings, top_k=2 * top_k, document_ids=scope)
+    return await dedup.attribute(db, hits, document_ids, top_k)
+
+
+async def _retrieve_context(
+    db: AsyncSession,
+    query_embedding: list[float],
+    top_k: int,
+    document_ids: list[int] | None,
+) -> tuple[list[dict], PackStats | None]:
+    """
+    ChromaDB child search → parent expansion → document names → token-budgeted packing.
+    Returns ([], None) if nothing matched.
+    """
+    # 2. Retrieve top-k child chunks from ChromaDB
+    child_chunks = (await _search(db, [query_embedding], top_k, document_ids))[0]
+    if not child_chunks:
+        return [], None
+
+    # 3 + 4. Parent chunks (ChromaDB) and document names (PostgreSQL) are independent,
+    # so fetch both at once
+    parent_ids = list({c["parent_id"] for c in child_chunks if c.get("parent_id")})
+    doc_ids = list({c["document_id"] for c in child_chunks})
+
+    # Fallback to the child chunks themselves if no parent_ids exist (e.g. legacy data)
+    if parent_ids:
+        context_chunks, id_to_name = await asyncio.gather(
+            run_io(get_parent_chunks, parent_ids, doc_ids),
+            _fetch_doc_names(db, doc_ids),
+        )
+    else:
+        context_chunks = child_chunks
+        id_to_name = await _fetch_doc_names(db, doc_ids)
+
+    for chunk in context_chunks:
+        chunk["document_name"] = id_to_name.get(chunk["document_id"], f"Doc #{chunk['document_id']}")
+    return pack_context(context_chunks, child_chunks)
+
+
+def _prompt_tokens(prompt: str, response) -> int:
+    """Gemini's reported prompt token count, or our estimate if it is unavailable."""
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "prompt_token_count", 0) or estimate_tokens(prompt)
+
+
+def _query_stats(prompt: str, prompt_tokens: int, pack: PackStats, generation_ms: float) -> dict:
+    QUERY_STAGE_SECONDS.observe(generation_ms / 1000, stage="generation")
+    stats = {
+        "prompt_tokens": prompt_tokens,
+        "prompt_chars": len(prompt),
+        "context_chunks": pack.context_chunks,
+        "context_chunks_dropped": pack.context_chunks_dropped,
+        "generation_ms": round(generation_ms, 1),
+    }
+    logger.info(
+        "rag prompt_tokens=%d prompt_chars=%d context_chunks=%d dropped=%d generation_ms=%.1f",
+        *stats.values(),
+    )
+    return stats
+
+
+async def _generate_answer(prompt: str, pack: PackStats) -> tuple[str, dict]:
+    """Call Gemini; returns the answer and per-query prompt size / generation latency."""
+    model = get_gemini_model()
+    started = time.perf_counter()
+    response = await model.generate_content_async(prompt)
+    generation_ms = (time.perf_counter() - started) * 1000
+    stats = _query_stats(prompt, _prompt_tokens(prompt, response), pack, generation_ms)
+    return response.text.strip(), stats
+
+
 async def query_rag(
     db: AsyncSession,
     query: str,
@@ -73,39 +177,233 @@ async def query_rag(
     """Full RAG pipeline: Cohere embed → ChromaDB search → Gemini 2.5 Flash."""
     top_k = top_k or settings.top_k_results
 
+    use_cache = settings.answer_cache_enabled
+    cache_key = answer_cache.make_key(
+        query, document_ids, top_k, settings.gemini_model, PROMPT_VERSION
+    )
+    if use_cache:
+        cached = answer_cache.get(cache_key)
+        if cached is not None:
+            QUERIES.inc(mode="blocking", cached="true")
+            return {**cached, "cached": True}
+    started = time.perf_counter()
+
     # 1. Embed the query (Cohere "search_query" mode)
-    query_embedding = embed_query(query)
+    # (with the model of the active collection's index version, which may not be the configured one)
+    query_embedding = await embed_query_async(query, model=collection_model())
+    embed_ms = (time.perf_counter() - started) * 1000
 
-    # 2. Retrieve top-k child chunks from ChromaDB
-    child_chunks = search_chunks(query_embedding, top_k=top_k, document_ids=document_ids)
+    if use_cache:
+        cached = answer_cache.get_similar(cache_key, query_embedding)
+        if cached is not None:
+            QUERIES.inc(mode="blocking", cached="true")
+            return {**cached, "cached": True}
 
-    if not child_chunks:
+    QUERIES.inc(mode="blocking", cached="false")
+    context_chunks, pack = await _retrieve_context(db, query_embedding, top_k, document_ids)
+    if not context_chunks:
         return {
-            "answer": "No relevant documents found. Please upload some documents first.",
+            "answer": NO_RESULTS_ANSWER,
             "sources": [],
             "model": settings.gemini_model,
+            "cached": False,
         }
 
-    # 3. Retrieve broader context via Parent Chunks
-    parent_ids = list({c["parent_id"] for c in child_chunks if c.get("parent_id")})
-    
-    # Fallback to the child chunks themselves if no parent_ids exist (e.g. legacy data)
-    if parent_ids:
-        context_chunks = get_parent_chunks(parent_ids)
-    else:
-        context_chunks = child_chunks
+    # 5. Build prompt and call Gemini 1.5 Flash
+    answer, stats = await _generate_answer(build_rag_prompt(query, context_chunks), pack)
+
+    result = {
+        "answer": answer,
+        "sources": context_chunks,
+        "model": settings.gemini_model,
+    }
+    if use_cache:
+        compute_ms = (time.perf_counter() - started) * 1000
+        answer_cache.put(cache_key, result, query_embedding, compute_ms, embed_ms)
+    return {**result, "stats": stats, "cached": False}
 
-    # 4. Enrich context chunks with document names from PostgreSQL
-    context_chunks = await _enrich_with_doc_names(db, context_chunks)
 
-    # 5. Build prompt and call Gemini 1.5 Flash
+async def stream_rag(
+    db: AsyncSession,
+    query: str,
+    top_k: int | None = None,
+    document_ids: list[int] | None = None,
+) -> AsyncIterator[tuple[str, dict]]:
+    """
+    Streaming variant of query_rag. Yields (event, payload) pairs:
+    one "sources" event, then "token" events as Gemini streams, then a final "done".
+    """
+    top_k = top_k or settings.top_k_results
+
+    use_cache = settings.answer_cache_enabled
+    cache_key = answer_cache.make_key(
+        query, document_ids, top_k, settings.gemini_model, PROMPT_VERSION
+    )
+    cached = answer_cache.get(cache_key) if use_cache else None
+    started = time.perf_counter()
+
+    query_embedding, embed_ms = None, 0.0
+    if cached is None:
+        query_embedding = await embed_query_async(query, model=collection_model())
+        embed_ms = (time.perf_counter() - started) * 1000
+        if use_cache:
+            cached = answer_cache.get_similar(cache_key, query_embedding)
+
+    QUERIES.inc(mode="stream", cached="true" if cached is not None else "false")
+    if cached is not None:
+        yield "sources", {"sources": cached["sources"]}
+        yield "token", {"text": cached["answer"]}
+        yield "done", {"answer": cached["answer"], "model": cached["model"], "cached": True}
+        return
+
+    context_chunks, pack = await _retrieve_context(db, query_embedding, top_k, document_ids)
+    yield "sources", {"sources": context_chunks}
+    if not context_chunks:
+        yield "token", {"text": NO_RESULTS_ANSWER}
+        yield "done", {"answer": NO_RESULTS_ANSWER, "model": settings.gemini_model, "cached": False}
+        return
+
     prompt = build_rag_prompt(query, context_chunks)
     model = get_gemini_model()
-    response = model.generate_content(prompt)
-    answer = response.text.strip()
+    gen_started = time.perf_counter()
+    response = await model.generate_content_async(prompt, stream=True)
+
+    parts: list[str] = []
+    async for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. the final safety/finish-reason chunk)
+            continue
+        if text:
+            parts.append(text)
+            yield "token", {"text": text}
 
-    return {
+    answer = "".join(parts).strip()
+    stats = _query_stats(
+        prompt, _prompt_tokens(prompt, response), pack, (time.perf_counter() - gen_started) * 1000
+    )
+    result = {
         "answer": answer,
         "sources": context_chunks,
         "model": settings.gemini_model,
     }
+    if use_cache and answer:
+        compute_ms = (time.perf_counter() - started) * 1000
+        answer_cache.put(cache_key, result, query_embedding, compute_ms, embed_ms)
+    yield "done", {"answer": answer, "model": settings.gemini_model, "cached": False, "stats": stats}
+
+
+async def query_rag_batch(
+    db: AsyncSession,
+    queries: list[str],
+    top_k: int | None = None,
+    document_ids: list[int] | None = None,
+) -> list[dict]:
+    """
+    Answer many questions over one document scope.
+    One Cohere embed call, one ChromaDB query for all vectors, one parent fetch for the
+    union of parents, then Gemini generations concurrently up to batch_query_llm_concurrency.
+    Returns one result per question, in order; a failed generation sets "error".
+    """
+    top_k = top_k or settings.top_k_results
+    use_cache = settings.answer_cache_enabled
+    started = time.perf_counter()
+
+    keys = [
+        answer_cache.make_key(q, document_ids, top_k, settings.gemini_model, PROMPT_VERSION)
+        for q in queries
+    ]
+    results: list[dict | None] = [None] * len(queries)
+    if use_cache:
+        for i, key in enumerate(keys):
+            cached = answer_cache.get(key)
+            if cached is not None:
+                results[i] = {**cached, "cached": True}
+
+    # 1. Embed every uncached question in one call
+    pending = [i for i, r in enumerate(results) if r is None]
+    embeddings: dict[int, list[float]] = {}
+    embed_ms = 0.0
+    if pending:
+        embed_started = time.perf_counter()
+        vectors = await embed_queries_async([queries[i] for i in pending], model=collection_model())
+        embeddings = dict(zip(pending, vectors))
+        embed_ms = (time.perf_counter() - embed_started) * 1000
+    if use_cache:
+        for i in pending:
+            cached = answer_cache.get_similar(keys[i], embeddings[i])
+            if cached is not None:
+                results[i] = {**cached, "cached": True}
+        pending = [i for i in pending if results[i] is None]
+    QUERIES.inc(len(queries) - len(pending), mode="batch", cached="true")
+    QUERIES.inc(len(pending), mode="batch", cached="false")
+    if not pending:
+        return results
+
+    # 2. All query vectors in a single ChromaDB query
+    hits_per_query = await _search(db, [embeddings[i] for i in pending], top_k, document_ids)
+    child_hits = dict(zip(pending, hits_per_query))
+
+    # 3 + 4. Parents fetched once for the union across questions, names looked up once
+    parent_ids = list({c["parent_id"] for hits in hits_per_query for c in hits if c.get("parent_id")})
+    doc_ids = list({c["document_id"] for hits in hits_per_query for c in hits})
+    if not doc_ids:
+        parents, id_to_name = [], {}
+    elif parent_ids:
+        parents, id_to_name = await asyncio.gather(
+            run_io(get_parent_chunks, parent_ids, doc_ids),
+            _fetch_doc_names(db, doc_ids),
+        )
+    else:
+        parents, id_to_name = [], await _fetch_doc_names(db, doc_ids)
+    parent_by_id = {(p["document_id"], p.get("parent_id")): p for p in parents}
+    retrieval_ms = (time.perf_counter() - started) * 1000
+
+    def context_for(hits: list[dict]) -> tuple[list[dict], PackStats]:
+        chunks, seen = [], set()
+        for child in hits:
+            parent = parent_by_id.get((child["document_id"], child.get("parent_id")))
+            if child.get("parent_id") and parent is None:
+                continue
+            chunk = dict(parent) if parent is not None else dict(child)
+            key = (chunk["document_id"], chunk.get("parent_id") or chunk["chunk_index"])
+            if key in seen:
+                continue
+            seen.add(key)
+            chunk["document_name"] = id_to_name.get(chunk["document_id"], f"Doc #{chunk['document_id']}")
+            chunks.append(chunk)
+        return pack_context(chunks, hits)
+
+    # 5. Generations run concurrently, bounded so one batch can't flood the LLM quota
+    semaphore = asyncio.Semaphore(settings.batch_query_llm_concurrency)
+
+    async def answer_one(i: int) -> None:
+        context_chunks, pack = context_for(child_hits[i])
+        if not context_chunks:
+            results[i] = {
+                "answer": NO_RESULTS_ANSWER, "sources": [],
+                "model": settings.gemini_model, "cached": False,
+            }
+            return
+        try:
+            async with semaphore:
+                gen_started = time.perf_counter()
+                answer, stats = await _generate_answer(
+                    build_rag_prompt(queries[i], context_chunks), pack
+                )
+        except Exception as e:
+            results[i] = {
+                "answer": "", "sources": context_chunks, "model": settings.gemini_model,
+                "cached": False, "error": str(e),
+            }
+            return
+        result = {"answer": answer, "sources": context_chunks, "model": settings.gemini_model}
+        if use_cache:
+            # Attribute the shared retrieval cost to every question in the batch
+            compute_ms = retrieval_ms + (time.perf_counter() - gen_started) * 1000
+            answer_cache.put(keys[i], result, embeddings[i], compute_ms, embed_ms)
+        results[i] = {**result, "stats": stats, "cached": False}
+
+    await asyncio.gather(*(answer_one(i) for i in pending))
+    return results
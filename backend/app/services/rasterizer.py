@@ -0,0 +1,114 @@
+"""
+Page decoding at OCR resolution.
+
+Each page is decoded so its text reaches OCR at about `ocr_target_x_height` px of x-height,
+with at most one resample:
+  - PDFs: Poppler renders a small grayscale preview of every page, x-height is measured on it
+    (layout.estimate_x_height), and each page is then rendered once at the width that hits the
+    target. Pages with no measurable text are rendered at FALLBACK_DPI.
+  - JPEGs: x-height is measured on a draft() preview (the decoder's DCT scaling, nearly free),
+    and pages that need shrinking are decoded with draft() at the nearest larger scale, then
+    resized only if that is still off by more than RESAMPLE_TOLERANCE.
+  - Other images (PNG, TIFF frames, ...) are decoded in full, measured, and resized once if needed.
+Images with no measurable text (small crops, receipts, single lines) are upscaled to
+FALLBACK_MIN_SIDE on their short side, as preprocess_image did before.
+preprocess_image then leaves the page size alone (min_side=0), so nothing is resampled twice.
+With ocr_adaptive_resolution off, PDFs are rendered at FALLBACK_DPI and images decoded as-is.
+"""
+import math
+
+from PIL import Image
+from pdf2image import convert_from_path
+
+from app.config import get_settings
+from app.services.layout import ANALYSIS_WIDTH, estimate_x_height
+
+settings = get_settings()
+
+PREVIEW_WIDTH = ANALYSIS_WIDTH  # px; previews are measured without further scaling
+FALLBACK_DPI = 200
+FALLBACK_MIN_SIDE = 1000        # px; images whose x-height can't be measured
+MAX_PAGE_PIXELS = 40_000_000    # upscaling cap (≈ A3 at 300 DPI) for pages with tiny text
+RESAMPLE_TOLERANCE = 0.15       # don't resample for less than this relative size change
+
+
+def _target_scale(x_height: float | None, size: tuple[int, int]) -> float:
+    """Factor to apply to a page of `size` whose x-height is `x_height` px (1.0 = leave it)."""
+    w, h = size
+    if not x_height:
+        if min(w, h) >= FALLBACK_MIN_SIDE:
+            return 1.0
+        return min(FALLBACK_MIN_SIDE / min(w, h), math.sqrt(MAX_PAGE_PIXELS / (w * h)))
+    scale = min(settings.ocr_target_x_height / x_height, math.sqrt(MAX_PAGE_PIXELS / (w * h)))
+    return 1.0 if abs(scale - 1.0) <= RESAMPLE_TOLERANCE else scale
+
+
+def _resize(page: Image.Image, scale: float) -> Image.Image:
+    if page.mode in ("1", "P"):
+        # Resizing bilevel/palette images only does nearest-neighbour
+        page = page.convert("L" if page.mode == "1" else "RGB")
+    size = (max(1, round(page.width * scale)), max(1, round(page.height * scale)))
+    return page.resize(size, Image.LANCZOS)
+
+
+def rasterize_pdf(file_path: str, timeout: float | None = None) -> list[Image.Image]:
+    """Render every page; `timeout` (seconds, per Poppler run) kills Poppler when exceeded."""
+    if not settings.ocr_adaptive_resolution:
+        return convert_from_path(file_path, dpi=FALLBACK_DPI, timeout=timeout)
+
+    previews = convert_from_path(file_path, size=(PREVIEW_WIDTH, None), grayscale=True, timeout=timeout)
+    pages = []
+    for number, preview in enumerate(previews, start=1):
+        x_height = estimate_x_height(preview)
+        if x_height is None:
+            render = {"dpi": FALLBACK_DPI}
+        else:
+            # Poppler renders from the source at this width, so the one resample is its own
+            scale = min(
+                settings.ocr_target_x_height / x_height,
+                math.sqrt(MAX_PAGE_PIXELS / (preview.width * preview.height)),
+            )
+            render = {"size": (max(1, round(preview.width * scale)), None)}
+        pages += convert_from_path(file_path, first_page=number, last_page=number, timeout=timeout, **render)
+    return pages
+
+
+def _decode_jpeg(file_path: str) -> Image.Image:
+    with Image.open(file_path) as preview:
+        full_size = preview.size
+        preview.draft("L", (PREVIEW_WIDTH, PREVIEW_WIDTH * preview.height // preview.width))
+        preview.load()
+        x_height = estimate_x_height(preview)
+        if x_height is not None:
+            x_height *= full_size[0] / preview.width
+
+    scale = _target_scale(x_height, full_size)
+    with Image.open(file_path) as img:
+        if scale < 1.0:
+            img.draft(img.mode, (math.ceil(full_size[0] * scale), math.ceil(full_size[1] * scale)))
+        page = img.copy()
+    remaining = full_size[0] * scale / page.width
+    return page if abs(remaining - 1.0) <= RESAMPLE_TOLERANCE else _resize(page, remaining)
+
+
+def decode_image(file_path: str) -> list[Image.Image]:
+    """All frames of an image file, each at OCR resolution."""
+    with Image.open(file_path) as img:
+        if settings.ocr_adaptive_resolution and img.format == "JPEG":
+            return [_decode_jpeg(file_path)]
+
+        pages = []
+        try:
+            for i in range(img.n_frames):
+                img.seek(i)
+                pages.append(img.copy())
+        except (AttributeError, EOFError):
+            pages.append(img.copy())
+
+    if not settings.ocr_adaptive_resolution:
+        return pages
+    resized = []
+    for page in pages:
+        scale = _target_scale(estimate_x_height(page), page.size)
+        resized.append(page if scale == 1.0 else _resize(page, scale))
+    return resized
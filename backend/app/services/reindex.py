@@ -0,0 +1,294 @@
+"""
+Blue-green re-index of the vector store from stored OCR text — no OCR re-run.
+1. Create a BUILDING IndexVersion with its own ChromaDB collection
+2. Walk completed documents in id order: split_pages → chunk_pages → drop near-duplicate
+   children (dedup.py) → embed in large batches
+3. Upsert into the new collection, saving a resume cursor after every batch
+4. Swap: the new version becomes ACTIVE, the old one RETIRED (kept for rollback), and
+   Document.chunk_count switches to the new chunking
+While a version builds, the pipeline writes new documents into both collections.
+
+Every collection is embedded and queried with the Cohere model in its version's config,
+whatever settings.cohere_model the process runs with (chroma_store.collection_model), so
+a model change can be rolled out before, during or after the build. A collection from
+before index versions is adopted as ACTIVE with the running config the first time this
+code starts, so change the model only after that.
+"""
+import asyncio
+import json
+import logging
+import math
+from datetime import datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models import Document, DocumentStatus, IndexVersion, IndexVersionStatus
+from app.services import chroma_store, dedup
+from app.services.answer_cache import answer_cache
+from app.services.chunker import chunk_pages, split_pages
+from app.services.context_packer import estimate_tokens
+from app.services.embedder import embed_documents
+from app.utils.concurrency import run_io
+
+settings = get_settings()
+logger = logging.getLogger("ocrtorag.reindex")
+
+# Cohere accepts at most 96 texts per embed call
+EMBED_BATCH_SIZE = 90
+
+_running: set[int] = set()
+
+
+def current_config() -> dict:
+    """The settings an index is built with; a change in any of them calls for a re-index."""
+    return {
+        "parent_chunk_size": settings.parent_chunk_size,
+        "parent_chunk_overlap": settings.parent_chunk_overlap,
+        "child_chunk_size": settings.child_chunk_size,
+        "child_chunk_overlap": settings.child_chunk_overlap,
+        "cohere_model": settings.cohere_model,
+        "embed_dimension": settings.embed_dimension,
+    }
+
+
+async def _adopt_legacy_collection(db: AsyncSession) -> None:
+    """Record settings.chroma_collection, built before index versions, as ACTIVE."""
+    db.add(IndexVersion(
+        collection_name=settings.chroma_collection,
+        config=json.dumps(current_config(), sort_keys=True),
+        status=IndexVersionStatus.ACTIVE,
+        cursor_document_id=0,
+        documents_indexed=0,
+        chunks_indexed=0,
+        activated_at=datetime.utcnow(),
+    ))
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()  # another process adopted it first
+
+
+async def load_index_pointer(db: AsyncSession) -> None:
+    """Point chroma_store at the ACTIVE collection and any BUILDING ones, with their models."""
+    query = select(IndexVersion).where(
+        IndexVersion.status.in_([IndexVersionStatus.ACTIVE, IndexVersionStatus.BUILDING])
+    )
+    versions = (await db.execute(query)).scalars().all()
+    if not any(v.status == IndexVersionStatus.ACTIVE for v in versions):
+        await _adopt_legacy_collection(db)
+        versions = (await db.execute(query)).scalars().all()
+    active = next((v.collection_name for v in versions if v.status == IndexVersionStatus.ACTIVE), None)
+    building = [v.collection_name for v in versions if v.status == IndexVersionStatus.BUILDING]
+    models = {v.collection_name: json.loads(v.config)["cohere_model"] for v in versions}
+    chroma_store.set_index_collections(active, building, models)
+
+
+async def watch_loop() -> None:
+    """Background task: pick up swaps and builds started by other processes."""
+    from app.database import AsyncSessionLocal
+
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await load_index_pointer(db)
+        except Exception:
+            logger.exception("Failed to refresh index pointer")
+        await asyncio.sleep(settings.index_version_poll_seconds)
+
+
+async def _iter_documents(db: AsyncSession, after_id: int):
+    """Completed documents with stored text, in id order, one batch at a time."""
+    while True:
+        result = await db.execute(
+            select(Document.id, Document.user_id, Document.ocr_text)
+            .where(
+                Document.id > after_id,
+                Document.status == DocumentStatus.COMPLETED,
+                Document.ocr_text.is_not(None),
+            )
+            .order_by(Document.id)
+            .limit(settings.reindex_batch_documents)
+        )
+        rows = result.all()
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1].id
+
+
+def _chunk_batch(rows) -> list[tuple[int, list]]:
+    return [(row.id, chunk_pages(split_pages(row.ocr_text))) for row in rows]
+
+
+async def estimate(db: AsyncSession) -> dict:
+    """
+    Dry run: chunk everything with the current settings, drop near-duplicate children
+    as the re-index would, and price the embedding work.
+    """
+    documents = pages = parent_chunks = child_chunks = stored_children = tokens = 0
+    deduplicators: dict[int, dedup.Deduplicator] = {}
+    async for rows in _iter_documents(db, 0):
+        for row in rows:
+            page_list = split_pages(row.ocr_text)
+            chunks = chunk_pages(page_list)
+            children = [c for c in chunks if c.chunk_type == "child"]
+            if settings.chunk_dedup_enabled:
+                deduplicator = deduplicators.setdefault(row.user_id, dedup.Deduplicator(None, row.user_id, "estimate"))
+                stored = [c for c in await deduplicator.plan(row.id, chunks) if c.chunk_type == "child"]
+            else:
+                stored = children
+            documents += 1
+            pages += len(page_list)
+            parent_chunks += len(chunks) - len(children)
+            child_chunks += len(children)
+            stored_children += len(stored)
+            tokens += sum(estimate_tokens(c.text) for c in stored)
+    return {
+        "config": current_config(),
+        "documents": documents,
+        "pages": pages,
+        "parent_chunks": parent_chunks,
+        "child_chunks": child_chunks,
+        "duplicate_child_chunks": child_chunks - stored_children,
+        "stored_vectors": parent_chunks + stored_children,
+        "index_reduction": round(1 - (parent_chunks + stored_children) / max(1, parent_chunks + child_chunks), 4),
+        "embed_calls": math.ceil(stored_children / EMBED_BATCH_SIZE),
+        "embed_tokens": tokens,
+        "estimated_cost_usd": round(tokens / 1_000_000 * settings.cohere_embed_cost_per_million_tokens, 4),
+    }
+
+
+async def start_or_resume(db: AsyncSession) -> IndexVersion:
+    """Return the BUILDING version for the current config, creating it if needed."""
+    config = json.dumps(current_config(), sort_keys=True)
+    result = await db.execute(
+        select(IndexVersion).where(IndexVersion.status == IndexVersionStatus.BUILDING)
+    )
+    for version in result.scalars().all():
+        if version.config == config:
+            return version
+        version.status = IndexVersionStatus.FAILED
+        version.error_message = "Superseded: chunking/embedding settings changed before it finished."
+        await dedup.drop_collection(db, version.collection_name)
+
+    version = IndexVersion(
+        collection_name=f"{settings.chroma_collection}_{datetime.utcnow():%Y%m%d%H%M%S}",
+        config=config,
+        status=IndexVersionStatus.BUILDING,
+        cursor_document_id=0,
+        documents_indexed=0,
+        chunks_indexed=0,
+    )
+    db.add(version)
+    await db.commit()
+    await load_index_pointer(db)
+    return version
+
+
+async def _index_batch(collection_name: str, batch: list[tuple[int, list]], semaphore: asyncio.Semaphore) -> None:
+    # Embed the children of the whole batch together, in full-size API calls
+    texts = [c.text for _, chunks in batch for c in chunks if c.chunk_type == "child"]
+    slices = [texts[i : i + EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+    model = chroma_store.collection_model(collection_name)
+
+    async def embed(texts_slice: list[str]) -> list[list[float]]:
+        async with semaphore:
+            return await run_io(embed_documents, texts_slice, model)
+
+    embeddings = [e for part in await asyncio.gather(*(embed(s) for s in slices)) for e in part]
+
+    async def upsert(document_id: int, chunks: list, child_embeddings: list[list[float]]) -> None:
+        chunk_dicts, all_embeddings = chroma_store.chunk_records(chunks, child_embeddings)
+        async with semaphore:
+            await run_io(
+                chroma_store.upsert_chunks, document_id, chunk_dicts, all_embeddings,
+                collection_name=collection_name,
+            )
+
+    jobs, offset = [], 0
+    for document_id, chunks in batch:
+        n_children = sum(1 for c in chunks if c.chunk_type == "child")
+        jobs.append(upsert(document_id, chunks, embeddings[offset : offset + n_children]))
+        offset += n_children
+    await asyncio.gather(*jobs)
+
+
+async def _count_chunks(db: AsyncSession) -> None:
+    """Set Document.chunk_count to the current chunking (caller commits)."""
+    async for rows in _iter_documents(db, 0):
+        batch = await asyncio.to_thread(_chunk_batch, rows)
+        await db.execute(
+            update(Document), [{"id": document_id, "chunk_count": len(chunks)} for document_id, chunks in batch]
+        )
+
+
+async def activate(db: AsyncSession, version: IndexVersion) -> None:
+    """Swap `version` in as the collection serving searches."""
+    # Chunk counts change in the same transaction as the collection serving searches
+    await _count_chunks(db)
+    await db.execute(
+        update(IndexVersion)
+        .where(IndexVersion.status == IndexVersionStatus.ACTIVE)
+        .values(status=IndexVersionStatus.RETIRED)
+    )
+    version.status = IndexVersionStatus.ACTIVE
+    version.activated_at = datetime.utcnow()
+    version.error_message = None
+    await db.commit()
+    await load_index_pointer(db)
+    # Cached answers were retrieved from the old collection
+    answer_cache.clear()
+    logger.info("Index %s is now active", version.collection_name)
+
+
+async def run_reindex(version_id: int, concurrency: int | None = None) -> None:
+    """Build (or resume building) a version and activate it when every document is in."""
+    from app.database import AsyncSessionLocal
+
+    if version_id in _running:
+        return
+    _running.add(version_id)
+    semaphore = asyncio.Semaphore(concurrency or settings.reindex_concurrency)
+    try:
+        async with AsyncSessionLocal() as db:
+            version = await db.get(IndexVersion, version_id)
+            if version is None or version.status != IndexVersionStatus.BUILDING:
+                return
+            try:
+                async for rows in _iter_documents(db, version.cursor_document_id):
+                    batch = await asyncio.to_thread(_chunk_batch, rows)
+                    deduplicators: dict[int, dedup.Deduplicator] = {}
+                    stored_batch = batch
+                    if settings.chunk_dedup_enabled:
+                        stored_batch = []
+                        for row, (document_id, chunks) in zip(rows, batch):
+                            deduplicator = deduplicators.setdefault(
+                                row.user_id, dedup.Deduplicator(db, row.user_id, version.collection_name)
+                            )
+                            stored_batch.append((document_id, await deduplicator.plan(document_id, chunks)))
+                    await _index_batch(version.collection_name, stored_batch, semaphore)
+                    for deduplicator in deduplicators.values():
+                        deduplicator.save()
+                    version.cursor_document_id = rows[-1].id
+                    version.documents_indexed += len(batch)
+                    version.chunks_indexed += sum(len(chunks) for _, chunks in batch)
+                    await db.commit()
+                    logger.info(
+                        "Re-index %s: %d documents, %d chunks (cursor %d)",
+                        version.collection_name, version.documents_indexed,
+                        version.chunks_indexed, version.cursor_document_id,
+                    )
+            except Exception as e:
+                # Stay BUILDING so the next run resumes from the saved cursor
+                await db.rollback()
+                await db.refresh(version)
+                version.error_message = str(e)[:1000]
+                await db.commit()
+                logger.exception("Re-index %s stopped", version.collection_name)
+                raise
+            await activate(db, version)
+    finally:
+        _running.discard(version_id)
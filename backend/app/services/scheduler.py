@@ -0,0 +1,137 @@
+"""
+CPU-budget scheduler for the ingestion pipeline's page work.
+
+run_pipeline asks for a slot before each unit of CPU-heavy work: rasterizing a PDF, preprocessing and
+OCR of one page, and generating the searchable PDF. At most `ocr_cpu_budget // ocr_threads_per_page`
+slots are held at once per process, and Tesseract/OpenCV are limited to `ocr_threads_per_page`
+threads each, so parallel documents share the cores instead of oversubscribing them.
+
+A pipeline holds at most one slot at a time, so pages of different documents interleave.
+When a slot frees up it goes to:
+  1. documents with at most `ocr_small_document_pages` pages left (interactive uploads), then
+  2. everything else;
+rotating round-robin across users within each tier, and fewest-pages-left first within a user.
+"""
+import asyncio
+import itertools
+import logging
+import os
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator
+
+from app.config import get_settings
+from app.utils.metrics import OCR_SLOTS_IN_USE, OCR_SLOT_WAITERS
+
+logger = logging.getLogger("ocrtorag.scheduler")
+settings = get_settings()
+
+
+def apply_thread_limits() -> None:
+    """Cap Tesseract's OpenMP threads (inherited by its subprocess) and OpenCV's pool."""
+    threads = max(1, settings.ocr_threads_per_page)
+    os.environ["OMP_THREAD_LIMIT"] = str(threads)
+    import cv2
+    cv2.setNumThreads(threads)
+
+
+@dataclass(order=True)
+class _Waiter:
+    pages_left: int
+    seq: int
+    future: asyncio.Future = field(compare=False)
+
+
+class PageScheduler:
+    def __init__(self, slots: int, small_document_pages: int):
+        self.slots = max(1, slots)
+        self.small_document_pages = small_document_pages
+        self.in_use = 0
+        self._waiters: dict[int, list[_Waiter]] = {}
+        self._users: deque[int] = deque()  # users with waiters, in round-robin order
+        self._seq = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(w) for w in self._waiters.values())
+
+    @asynccontextmanager
+    async def slot(self, user_id: int, pages_left: int) -> AsyncIterator[None]:
+        await self.acquire(user_id, pages_left)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, user_id: int, pages_left: int) -> None:
+        if self.in_use < self.slots and not self._users:
+            self.in_use += 1
+            self._update_gauges()
+            return
+
+        waiter = _Waiter(pages_left, next(self._seq), asyncio.get_running_loop().create_future())
+        self._waiters.setdefault(user_id, []).append(waiter)
+        if user_id not in self._users:
+            self._users.append(user_id)
+        self._update_gauges()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release()  # granted just as we were cancelled
+            else:
+                self._remove(user_id, waiter)
+            raise
+
+    def release(self) -> None:
+        self.in_use -= 1
+        self._dispatch()
+        self._update_gauges()
+
+    def _dispatch(self) -> None:
+        while self.in_use < self.slots and self._users:
+            user_id = self._pick_user()
+            waiter = min(self._waiters[user_id])
+            self._remove(user_id, waiter)
+            # Served users go to the back of the rotation
+            if user_id in self._waiters:
+                self._users.remove(user_id)
+                self._users.append(user_id)
+            self.in_use += 1
+            waiter.future.set_result(None)
+
+    def _pick_user(self) -> int:
+        for user_id in self._users:
+            if min(self._waiters[user_id]).pages_left <= self.small_document_pages:
+                return user_id
+        return self._users[0]
+
+    def _remove(self, user_id: int, waiter: _Waiter) -> None:
+        waiters = self._waiters.get(user_id, [])
+        if waiter in waiters:
+            waiters.remove(waiter)
+        if not waiters:
+            self._waiters.pop(user_id, None)
+            if user_id in self._users:
+                self._users.remove(user_id)
+        self._update_gauges()
+
+    def _update_gauges(self) -> None:
+        OCR_SLOTS_IN_USE.set(self.in_use)
+        OCR_SLOT_WAITERS.set(self.waiting)
+
+
+_scheduler: PageScheduler | None = None
+
+
+def get_scheduler() -> PageScheduler:
+    global _scheduler
+    if _scheduler is None:
+        budget = settings.ocr_cpu_budget or os.cpu_count() or 1
+        _scheduler = PageScheduler(
+            slots=budget // max(1, settings.ocr_threads_per_page),
+            small_document_pages=settings.ocr_small_document_pages,
+        )
+        logger.info("Page scheduler: %d slots", _scheduler.slots)
+    return _scheduler
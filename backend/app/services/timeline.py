@@ -0,0 +1,147 @@
+"""
+Per-document processing timeline recorded by run_pipeline.
+Each span is one stage (optionally for one page) with wall-clock start/end, CPU time,
+bytes handled and retries. Stored on Document.timeline as compact columnar JSON:
+    {"v": 1, "t0": <epoch s>, "fields": [...FIELDS], "rows": [[...], ...]}
+with times in integer milliseconds relative to t0.
+"""
+import asyncio
+import json
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterator
+
+from app.utils.metrics import PIPELINE_STAGE_SECONDS
+
+FORMAT_VERSION = 1
+FIELDS = ("stage", "page", "start_ms", "end_ms", "cpu_ms", "bytes", "retries")
+
+
+@dataclass
+class Span:
+    stage: str
+    page: int | None
+    start: float
+    end: float = 0.0
+    cpu: float = 0.0
+    bytes: int = 0
+    retries: int = 0
+
+
+class Timeline:
+    def __init__(self):
+        self.t0 = time.time()
+        self._perf0 = time.perf_counter()
+        self.spans: list[Span] = []
+
+    def _now(self) -> float:
+        return time.perf_counter() - self._perf0
+
+    @contextmanager
+    def stage(self, name: str, page: int | None = None, observe: bool = True) -> Iterator[Span]:
+        """
+        Time an inline stage. CPU time is this thread's, so use run_in_executor for
+        work that runs in a thread pool. `observe` also feeds the /metrics histogram
+        (off for stages the service layer already instruments per call).
+        """
+        span = Span(stage=name, page=page, start=self._now())
+        cpu0 = time.thread_time()
+        try:
+            yield span
+        finally:
+            span.cpu += time.thread_time() - cpu0
+            span.end = self._now()
+            self.spans.append(span)
+            if observe:
+                PIPELINE_STAGE_SECONDS.observe(span.end - span.start, stage=name)
+
+    async def run_in_executor(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        page: int | None = None,
+        observe: bool = True,
+    ) -> Any:
+        """Run fn in the default executor, recording the worker thread's CPU time."""
+        def measured():
+            cpu0 = time.thread_time()
+            try:
+                return fn(*args)
+            finally:
+                cpu_box.append(time.thread_time() - cpu0)
+
+        cpu_box: list[float] = []
+        with self.stage(name, page=page, observe=observe) as span:
+            try:
+                return await asyncio.get_event_loop().run_in_executor(None, measured)
+            finally:
+                span.cpu = sum(cpu_box)
+
+    async def wait(self, name: str, awaitable: Awaitable[Any], page: int | None = None) -> Any:
+        """Record time spent waiting (e.g. for a scheduler slot) as a span with no CPU time."""
+        span = Span(stage=name, page=page, start=self._now())
+        try:
+            return await awaitable
+        finally:
+            span.end = self._now()
+            self.spans.append(span)
+
+    def to_json(self) -> str:
+        rows = [
+            [
+                s.stage, s.page, round(s.start * 1000), round(s.end * 1000),
+                round(s.cpu * 1000), s.bytes, s.retries,
+            ]
+            for s in self.spans
+        ]
+        return json.dumps(
+            {"v": FORMAT_VERSION, "t0": round(self.t0, 3), "fields": FIELDS, "rows": rows},
+            separators=(",", ":"),
+        )
+
+
+def parse(raw: str | None) -> dict | None:
+    """Stored timeline → {"started_at", "total_ms", "spans": [dict per span]}."""
+    if not raw:
+        return None
+    data = json.loads(raw)
+    fields = data["fields"]
+    spans = []
+    for row in data["rows"]:
+        span = dict(zip(fields, row))
+        span["duration_ms"] = span["end_ms"] - span["start_ms"]
+        spans.append(span)
+    return {
+        "started_at": data["t0"],
+        "total_ms": max((s["end_ms"] for s in spans), default=0),
+        "spans": spans,
+    }
+
+
+def stage_percentiles(timelines: list[dict]) -> dict[str, dict]:
+    """
+    p50/p95/p99/max of span durations per stage across parsed timelines.
+    Per-page stages (preprocessing, ocr) are counted per page; "total" is per document.
+    """
+    import numpy as np
+
+    durations: dict[str, list[int]] = {}
+    for tl in timelines:
+        for span in tl["spans"]:
+            durations.setdefault(span["stage"], []).append(span["duration_ms"])
+        durations.setdefault("total", []).append(tl["total_ms"])
+
+    out = {}
+    for stage, values in durations.items():
+        arr = np.asarray(values, dtype=np.float64)
+        p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+        out[stage] = {
+            "count": len(values),
+            "p50_ms": round(float(p50), 1),
+            "p95_ms": round(float(p95), 1),
+            "p99_ms": round(float(p99), 1),
+            "max_ms": round(float(arr.max()), 1),
+        }
+    return out
@@ -0,0 +1,232 @@
+"""
+Resumable chunked uploads.
+Each session is an append-only `<id>.part` file plus a `<id>.json` sidecar under
+storage/uploads/sessions. The bytes on disk are the source of truth for progress,
+so a session survives client disconnects and server restarts alike.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import AsyncIterator
+
+import aiofiles
+
+from app.config import get_settings
+from app.utils.concurrency import run_cpu
+from app.utils.file_utils import (
+    get_storage_paths, validate_file_extension, validate_magic_number,
+    generate_unique_filename, SavedUpload, UploadTooLargeError, MAGIC_NUMBERS,
+)
+
+settings = get_settings()
+logger = logging.getLogger("ocrtorag.uploads")
+
+_SESSION_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_locks: dict[str, asyncio.Lock] = {}
+
+
+class UploadSessionError(ValueError):
+    """Client-side protocol error (bad offset, wrong owner, incomplete upload...)."""
+
+
+class UploadSessionNotFound(LookupError):
+    pass
+
+
+@dataclass
+class UploadSession:
+    id: str
+    user_id: int
+    filename: str
+    file_type: str
+    total_size: int
+    created_at: float
+    expires_at: float
+    received_bytes: int = 0
+
+
+def _sessions_dir() -> Path:
+    uploads_dir, _ = get_storage_paths()
+    path = uploads_dir / "sessions"
+    path.mkdir(exist_ok=True)
+    return path
+
+
+def _paths(session_id: str) -> tuple[Path, Path]:
+    if not _SESSION_ID_RE.match(session_id):
+        raise UploadSessionNotFound(session_id)
+    base = _sessions_dir()
+    return base / f"{session_id}.json", base / f"{session_id}.part"
+
+
+def create_session(user_id: int, filename: str, total_size: int) -> UploadSession:
+    ext = validate_file_extension(filename)
+    if total_size <= 0:
+        raise UploadSessionError("total_size must be positive.")
+    if total_size > settings.max_upload_bytes:
+        raise UploadTooLargeError(
+            f"File exceeds the {settings.max_upload_bytes // (1024 * 1024)} MB upload limit."
+        )
+
+    now = time.time()
+    session = UploadSession(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        filename=filename,
+        file_type=ext,
+        total_size=total_size,
+        created_at=now,
+        expires_at=now + settings.upload_session_ttl_seconds,
+    )
+    meta_path, part_path = _paths(session.id)
+    part_path.touch()
+    data = asdict(session)
+    data.pop("received_bytes")
+    meta_path.write_text(json.dumps(data))
+    return session
+
+
+def get_session(session_id: str, user_id: int) -> UploadSession:
+    meta_path, part_path = _paths(session_id)
+    try:
+        data = json.loads(meta_path.read_text())
+    except FileNotFoundError:
+        raise UploadSessionNotFound(session_id)
+    session = UploadSession(**data, received_bytes=part_path.stat().st_size if part_path.exists() else 0)
+    if session.user_id != user_id:
+        # Don't reveal that another user's session exists
+        raise UploadSessionNotFound(session_id)
+    if session.expires_at <= time.time():
+        discard_session(session_id)
+        raise UploadSessionNotFound(session_id)
+    return session
+
+
+async def append_chunk(
+    session: UploadSession,
+    offset: int,
+    body: AsyncIterator[bytes],
+) -> UploadSession:
+    """
+    Append a chunk at `offset`. Offsets must equal the bytes received so far; a chunk
+    that was already fully received (client retry after a lost response) is a no-op.
+    """
+    lock = _locks.setdefault(session.id, asyncio.Lock())
+    async with lock:
+        _, part_path = _paths(session.id)
+        received = part_path.stat().st_size
+        if offset < received:
+            # Retried chunk — drain and ignore it if it ends within what we already have
+            drained = 0
+            async for piece in body:
+                drained += len(piece)
+            if offset + drained <= received:
+                session.received_bytes = received
+                return session
+            raise UploadSessionError(f"Chunk overlaps received data; resume at offset {received}.")
+        if offset > received:
+            raise UploadSessionError(f"Missing data; resume at offset {received}.")
+
+        # The magic number is checked once the file has enough bytes for the longest
+        # signature; body pieces (and client chunks) can be shorter than that
+        signature_length = max(len(m) for m in MAGIC_NUMBERS.get(session.file_type, (b"",)))
+        head = part_path.read_bytes()[:received] if received < signature_length else None
+        written = 0
+        async with aiofiles.open(part_path, "ab") as f:
+            try:
+                async for piece in body:
+                    written += len(piece)
+                    if written > settings.upload_chunk_max_bytes or received + written > session.total_size:
+                        raise UploadSessionError("Chunk exceeds the chunk size limit or the declared total_size.")
+                    if head is not None:
+                        head += piece[: signature_length - len(head)]
+                        if len(head) >= signature_length:
+                            validate_magic_number(head, session.file_type)
+                            head = None
+                    await f.write(piece)
+                if head is not None and received + written == session.total_size:
+                    # The whole file is shorter than the signature
+                    validate_magic_number(head, session.file_type)
+            except BaseException:
+                # Keep the file append-only and consistent: drop the partial chunk
+                await f.flush()
+                os.truncate(part_path, received)
+                raise
+
+        session.received_bytes = received + written
+        return session
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(1024 * 1024):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+async def finalize_session(session: UploadSession) -> SavedUpload:
+    """Move a complete upload into storage/uploads and return it like stream_upload does."""
+    lock = _locks.setdefault(session.id, asyncio.Lock())
+    async with lock:
+        meta_path, part_path = _paths(session.id)
+        received = part_path.stat().st_size
+        if received != session.total_size:
+            raise UploadSessionError(
+                f"Upload incomplete: received {received} of {session.total_size} bytes."
+            )
+        sha256 = await run_cpu(_hash_file, part_path)
+        uploads_dir, _ = get_storage_paths()
+        dest = uploads_dir / generate_unique_filename(session.filename)
+        os.replace(part_path, dest)
+        meta_path.unlink(missing_ok=True)
+    _locks.pop(session.id, None)
+    return SavedUpload(path=str(dest), size=received, sha256=sha256)
+
+
+def discard_session(session_id: str) -> None:
+    meta_path, part_path = _paths(session_id)
+    part_path.unlink(missing_ok=True)
+    meta_path.unlink(missing_ok=True)
+    _locks.pop(session_id, None)
+
+
+def gc_expired_sessions() -> int:
+    """Delete expired (or orphaned) incomplete sessions. Returns how many were removed."""
+    now = time.time()
+    removed = 0
+    base = _sessions_dir()
+    for meta_path in base.glob("*.json"):
+        try:
+            expires_at = json.loads(meta_path.read_text())["expires_at"]
+        except (OSError, ValueError, KeyError):
+            expires_at = 0
+        if expires_at <= now:
+            discard_session(meta_path.stem)
+            removed += 1
+    # .part files whose sidecar is gone (crash between writes) once they are old enough
+    for part_path in base.glob("*.part"):
+        if not (base / f"{part_path.stem}.json").exists():
+            if part_path.stat().st_mtime + settings.upload_session_ttl_seconds <= now:
+                part_path.unlink(missing_ok=True)
+                removed += 1
+    return removed
+
+
+async def gc_loop() -> None:
+    """Background task started from the app lifespan."""
+    while True:
+        try:
+            removed = await asyncio.to_thread(gc_expired_sessions)
+            if removed:
+                logger.info("Removed %d expired upload sessions", removed)
+        except Exception:
+            logger.exception("Upload session GC failed")
+        await asyncio.sleep(settings.upload_session_gc_interval_seconds)
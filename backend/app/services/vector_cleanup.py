@@ -0,0 +1,100 @@
+"""
+Asynchronous vector cleanup for deleted documents.
+DELETE /documents/{id} writes a VectorTombstone in the same transaction that deletes
+the Document row and returns straight away; this worker then removes the chunks from
+ChromaDB with a filter delete, retrying failures with exponential backoff. Tombstones
+live in the database, so PostgreSQL and the vector store converge across restarts.
+Vectors the document shares with other documents' duplicates are handed over to one of
+them first (dedup.release_document).
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import get_settings
+from app.models import VectorTombstone
+from app.services import chroma_store, dedup
+from app.utils.concurrency import run_io
+
+settings = get_settings()
+logger = logging.getLogger("ocrtorag.vector_cleanup")
+
+BATCH_SIZE = 100
+
+_wake = asyncio.Event()
+
+
+async def enqueue(db: AsyncSession, document_ids: list[int]) -> None:
+    """Tombstone documents; committed by the caller together with the Document delete."""
+    for document_id in document_ids:
+        await db.merge(VectorTombstone(document_id=document_id))
+    chroma_store.add_tombstones(document_ids)
+
+
+def wake() -> None:
+    """Nudge the worker after a commit instead of waiting for the next interval."""
+    _wake.set()
+
+
+def _backoff(attempts: int) -> timedelta:
+    delay = settings.vector_cleanup_retry_base_seconds * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.vector_cleanup_retry_max_seconds))
+
+
+async def run_once() -> int:
+    """Process due tombstones. Returns how many documents were cleaned up."""
+    from app.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        # Keep the in-memory search exclusion in step with tombstones written (and
+        # cleared) by other processes. Deleted Document rows already drop out of
+        # _resolve_allowed_ids, so this set is a second line of defence, not the only one.
+        pending = (await db.execute(select(VectorTombstone.document_id))).scalars().all()
+        chroma_store.set_tombstones(pending)
+
+        now = datetime.utcnow()
+        result = await db.execute(
+            select(VectorTombstone)
+            .where(VectorTombstone.next_attempt_at <= now)
+            .order_by(VectorTombstone.next_attempt_at)
+            .limit(BATCH_SIZE)
+        )
+        done: list[int] = []
+        for tombstone in result.scalars().all():
+            try:
+                await dedup.release_document(db, tombstone.document_id)
+                await run_io(chroma_store.delete_document_chunks, tombstone.document_id)
+            except Exception as e:
+                tombstone.attempts += 1
+                tombstone.last_error = str(e)[:1000]
+                tombstone.next_attempt_at = now + _backoff(tombstone.attempts)
+                logger.warning(
+                    "Vector cleanup failed for document %s (attempt %d): %s",
+                    tombstone.document_id, tombstone.attempts, e,
+                )
+            else:
+                await db.delete(tombstone)
+                done.append(tombstone.document_id)
+        await db.commit()
+
+    chroma_store.remove_tombstones(done)
+    if done:
+        logger.info("Removed vectors for %d deleted documents", len(done))
+    return len(done)
+
+
+async def cleanup_loop() -> None:
+    """Background task started from the app lifespan."""
+    while True:
+        try:
+            await run_once()
+        except Exception:
+            logger.exception("Vector cleanup pass failed")
+        try:
+            await asyncio.wait_for(_wake.wait(), timeout=settings.vector_cleanup_interval_seconds)
+        except asyncio.TimeoutError:
+            pass
+        _wake.clear()
@@ -0,0 +1,50 @@
+"""
+Optional background warm-up (settings.warmup_on_startup).
+Heavy SDKs and the OCR stack are imported lazily; on instances that will serve
+queries or uploads anyway, this pays those costs in a background thread right
+after startup instead of inside the first user request.
+"""
+import asyncio
+import importlib
+import logging
+import time
+
+logger = logging.getLogger("ocrtorag.warmup")
+
+
+def _import_ocr_stack() -> None:
+    for module in ("app.services.preprocessing", "app.services.ocr", "app.services.pdf_generator", "pypdf", "pdf2image"):
+        importlib.import_module(module)
+
+
+def _steps():
+    from app.services import chroma_store, embedder, rag
+
+    return [
+        ("ocr_stack", _import_ocr_stack),
+        ("cohere", embedder.get_cohere_client),
+        ("cohere_async", embedder.get_cohere_async_client),
+        ("gemini", rag.get_gemini_model),
+        ("chromadb", chroma_store.get_collection),  # also opens the connection
+    ]
+
+
+def _warm_up_sync() -> dict[str, float]:
+    timings: dict[str, float] = {}
+    for name, step in _steps():
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            # Warm-up is best-effort; the real request will surface the error
+            logger.warning("Warm-up step %s failed: %s", name, e)
+            continue
+        timings[name] = round((time.perf_counter() - start) * 1000, 1)
+    return timings
+
+
+async def warm_up() -> None:
+    """Started as a task from the lifespan, so it runs while the server already serves."""
+    await asyncio.sleep(0)
+    timings = await asyncio.to_thread(_warm_up_sync)
+    logger.info("Warm-up done (ms): %s", timings)
@@ -0,0 +1,50 @@
+"""
+Bounded thread pools that keep blocking work off the event loop:
+- io:  blocking SDK calls (ChromaDB HTTP client, sync Cohere client)
+- cpu: short CPU-bound calls that release the GIL (bcrypt), sized to the cores we may use
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from app.config import get_settings
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+_io_executor: ThreadPoolExecutor | None = None
+_cpu_executor: ThreadPoolExecutor | None = None
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(
+            max_workers=settings.io_thread_pool_size,
+            thread_name_prefix="io",
+        )
+    return _io_executor
+
+
+async def run_io(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking I/O-bound call in the shared bounded pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_io_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def get_cpu_executor() -> ThreadPoolExecutor:
+    global _cpu_executor
+    if _cpu_executor is None:
+        _cpu_executor = ThreadPoolExecutor(
+            max_workers=settings.cpu_thread_pool_size,
+            thread_name_prefix="cpu",
+        )
+    return _cpu_executor
+
+
+async def run_cpu(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a CPU-bound call in the shared bounded pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_executor(), functools.partial(fn, *args, **kwargs))
@@ -1,13 +1,43 @@
 import os
 import uuid
+import hashlib
 import aiofiles
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Protocol
 from app.config import get_settings
 
 settings = get_settings()
 
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".tiff", ".tif", ".pdf"}
 
+# Leading bytes each allowed extension must start with
+MAGIC_NUMBERS: dict[str, tuple[bytes, ...]] = {
+    ".pdf": (b"%PDF-",),
+    ".png": (b"\x89PNG\r\n\x1a\n",),
+    ".jpg": (b"\xff\xd8\xff",),
+    ".jpeg": (b"\xff\xd8\xff",),
+    ".tif": (b"II*\x00", b"MM\x00*"),
+    ".tiff": (b"II*\x00", b"MM\x00*"),
+}
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    pass
+
+
+class AsyncReadable(Protocol):
+    async def read(self, size: int = -1) -> bytes: ...
+
+
+@dataclass
+class SavedUpload:
+    path: str
+    size: int
+    sha256: str
+
 
 def get_storage_paths() -> tuple[Path, Path]:
     """Return (uploads_dir, pdfs_dir), creating them if needed."""
@@ -35,13 +65,51 @@ def generate_unique_filename(original_filename: str) -> str:
     return f"{uuid.uuid4().hex}{ext}"
 
 
-async def save_upload(file_bytes: bytes, filename: str) -> str:
-    """Save raw upload bytes to the uploads directory. Returns absolute path."""
+def validate_magic_number(head: bytes, ext: str) -> None:
+    """Raise ValueError if the file's leading bytes don't match its extension."""
+    if not head.startswith(MAGIC_NUMBERS.get(ext, (b"",))):
+        raise ValueError(f"File content does not look like a '{ext}' file.")
+
+
+async def stream_upload(
+    source: AsyncReadable,
+    filename: str,
+    ext: str,
+    max_bytes: int | None = None,
+) -> SavedUpload:
+    """
+    Copy an upload to the uploads directory in fixed-size chunks, hashing and counting
+    bytes on the way, so memory stays constant regardless of file size.
+    Rejects empty files, bad magic numbers and files over max_bytes; nothing is left
+    on disk on failure.
+    """
+    max_bytes = max_bytes or settings.max_upload_bytes
     uploads_dir, _ = get_storage_paths()
     dest = uploads_dir / filename
-    async with aiofiles.open(dest, "wb") as f:
-        await f.write(file_bytes)
-    return str(dest)
+    partial = dest.with_name(dest.name + ".part")
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        async with aiofiles.open(partial, "wb") as f:
+            while chunk := await source.read(UPLOAD_CHUNK_SIZE):
+                if size == 0:
+                    validate_magic_number(chunk, ext)
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(
+                        f"File exceeds the {max_bytes // (1024 * 1024)} MB upload limit."
+                    )
+                digest.update(chunk)
+                await f.write(chunk)
+        if size == 0:
+            raise ValueError("Uploaded file is empty.")
+        os.replace(partial, dest)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+
+    return SavedUpload(path=str(dest), size=size, sha256=digest.hexdigest())
 
 
 def get_pdf_path(stem: str) -> str:
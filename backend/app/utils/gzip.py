@@ -0,0 +1,37 @@
+"""
+GZip middleware that leaves streaming and already-compressed responses alone.
+Starlette's GZipMiddleware would buffer SSE events behind the compressor and
+waste CPU re-compressing PDFs and images.
+"""
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.types import Message, Receive, Scope, Send
+
+EXCLUDED_CONTENT_TYPES = ("text/event-stream", "application/pdf", "image/")
+
+
+class _SelectiveGZipResponder(GZipResponder):
+    async def send_with_gzip(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            await super().send_with_gzip(message)
+            if content_type.startswith(EXCLUDED_CONTENT_TYPES):
+                # Reuse the pass-through path GZipResponder takes for pre-encoded bodies.
+                # content_encoding_set is private to starlette 0.41 (pinned through
+                # fastapi==0.115.6); re-check this when upgrading FastAPI.
+                self.content_encoding_set = True
+            return
+        await super().send_with_gzip(message)
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            headers = Headers(scope=scope)
+            if "gzip" in headers.get("Accept-Encoding", ""):
+                responder = _SelectiveGZipResponder(
+                    self.app, self.minimum_size, compresslevel=self.compresslevel
+                )
+                await responder(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
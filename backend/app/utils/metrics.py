@@ -0,0 +1,269 @@
+"""
+Minimal in-process metrics in the Prometheus text exposition format.
+Counters, gauges and histograms with labels, safe to update from executor threads,
+plus `timed` to wrap existing service calls. Served by GET /metrics.
+Values are per process; scrape every worker (or run a single worker) to see them all.
+"""
+import asyncio
+import functools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+# Seconds. Pipeline stages run from milliseconds (chunking) to minutes (OCR of big scans).
+PIPELINE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# Query stages are network calls: a few ms to tens of seconds for long generations.
+QUERY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track_inprogress(self, **labels) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets=PIPELINE_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # per label set: [bucket counts..., sum, count]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+                    break
+            data[-2] += value
+            data[-1] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = []
+        for key, data in items:
+            cumulative = 0.0
+            for i, bound in enumerate(self.buckets):
+                cumulative += data[i]
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(data[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(data[-1])}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Called before each render, e.g. to copy cache stats into gauges."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def timed(histogram: Histogram, **labels):
+    """Decorator recording a sync or async function's duration in `histogram`."""
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with histogram.time(**labels):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ─── Application metrics ──────────────────────────────────────────────────────
+
+PIPELINE_STAGE_SECONDS = REGISTRY.register(Histogram(
+    "ocrtorag_pipeline_stage_seconds",
+    "Ingestion pipeline stage latency (ocr is per page, embedding per API batch).",
+    ("stage",), PIPELINE_BUCKETS,
+))
+QUERY_STAGE_SECONDS = REGISTRY.register(Histogram(
+    "ocrtorag_query_stage_seconds",
+    "Query path stage latency.",
+    ("stage",), QUERY_BUCKETS,
+))
+PIPELINES_IN_FLIGHT = REGISTRY.register(Gauge(
+    "ocrtorag_pipelines_in_flight",
+    "Ingestion pipelines currently running in this process.",
+))
+PIPELINE_RUNS = REGISTRY.register(Counter(
+    "ocrtorag_pipeline_runs_total",
+    "Finished ingestion pipelines by outcome.",
+    ("outcome",),
+))
+PIPELINE_PAGES = REGISTRY.register(Counter(
+    "ocrtorag_pipeline_pages_total",
+    "Pages processed by the ingestion pipeline.",
+))
+OCR_PAGES_SKIPPED = REGISTRY.register(Counter(
+    "ocrtorag_ocr_pages_skipped_total",
+    "Pages not sent to OCR because layout analysis found them blank.",
+    ("reason",),
+))
+OCR_PIXELS_SAVED = REGISTRY.register(Counter(
+    "ocrtorag_ocr_pixels_saved_total",
+    "Source-page pixels excluded from OCR by blank-page skipping and text-region cropping.",
+))
+CHUNK_DUPLICATES = REGISTRY.register(Counter(
+    "ocrtorag_chunk_duplicates_total",
+    "Child chunks not embedded or stored because they duplicate a stored chunk.",
+    ("scope",),
+))
+BYTES_PROCESSED = REGISTRY.register(Counter(
+    "ocrtorag_bytes_processed_total",
+    "Bytes handled: 'upload' = stored uploads, 'pipeline' = source files ingested.",
+    ("kind",),
+))
+QUERIES = REGISTRY.register(Counter(
+    "ocrtorag_queries_total",
+    "RAG queries by mode and whether the answer came from the cache.",
+    ("mode", "cached"),
+))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "ocrtorag_pipeline_queue_depth",
+    "Documents waiting to be processed (status pending), across all processes.",
+))
+OCR_SLOTS_IN_USE = REGISTRY.register(Gauge(
+    "ocrtorag_ocr_slots_in_use",
+    "Page-work slots of the CPU budget currently held by pipelines.",
+))
+OCR_SLOT_WAITERS = REGISTRY.register(Gauge(
+    "ocrtorag_ocr_slot_waiters",
+    "Pipelines waiting for a page-work slot.",
+))
+CACHE_HIT_RATE = REGISTRY.register(Gauge(
+    "ocrtorag_cache_hit_rate",
+    "Hit rate of in-process caches since start.",
+    ("cache",),
+))
+CACHE_ENTRIES = REGISTRY.register(Gauge(
+    "ocrtorag_cache_entries",
+    "Entries held by in-process caches.",
+    ("cache",),
+))
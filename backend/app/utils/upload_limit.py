@@ -0,0 +1,46 @@
+"""
+Reject oversized uploads from their Content-Length header before the multipart
+body is parsed and spooled to disk. stream_upload still enforces the limit on the
+actual byte count for chunked requests that send no Content-Length.
+"""
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Room for multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_bytes: int,
+        path_prefix: str = "/upload",
+        path_limits: dict[str, int] | None = None,
+    ):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_prefix = path_prefix
+        # More specific prefixes (e.g. archive uploads) with their own limits
+        self.path_limits = sorted((path_limits or {}).items(), key=lambda kv: len(kv[0]), reverse=True)
+
+    def _limit_for(self, path: str) -> int:
+        for prefix, limit in self.path_limits:
+            if path.startswith(prefix):
+                return limit
+        return self.max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"].startswith(self.path_prefix):
+            max_bytes = self._limit_for(scope["path"])
+            length = dict(scope["headers"]).get(b"content-length")
+            if length and length.isdigit() and int(length) > max_bytes + MULTIPART_OVERHEAD:
+                response = JSONResponse(
+                    status_code=413,
+                    content={
+                        "detail": f"File exceeds the {max_bytes // (1024 * 1024)} MB upload limit."
+                    },
+                )
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
@@ -0,0 +1,149 @@
+"""
+Standalone ingestion worker: runs document pipelines outside the API process.
+
+    python -m app.worker [--concurrency N]
+
+Run any number of these on one or many nodes against the same database (and shared
+storage) with INGEST_MODE=queue on the API, which then only enqueues uploads. Workers
+claim pending documents through leases in the documents table (services/ingest_queue.py),
+heartbeat them while processing, and take over documents whose worker stopped heartbeating.
+On SIGTERM/SIGINT a worker stops claiming, waits up to worker_drain_seconds for running
+documents, then requeues whatever is left.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+import uuid
+
+from app.config import get_settings
+from app.database import AsyncSessionLocal, init_db
+from app.services import ingest_queue, reindex
+from app.services.pipeline import run_pipeline
+
+logger = logging.getLogger("ocrtorag.worker")
+settings = get_settings()
+
+
+class Worker:
+    def __init__(self, concurrency: int):
+        self.id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.concurrency = max(1, concurrency)
+        self.active: dict[int, asyncio.Task] = {}
+        self._lost: set[int] = set()
+        self._draining = False
+        self._wake = asyncio.Event()
+
+    def drain(self) -> None:
+        if not self._draining:
+            logger.info("Draining: finishing %d document(s), claiming no more", len(self.active))
+        self._draining = True
+        self._wake.set()
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.drain)
+
+        await init_db()
+        async with AsyncSessionLocal() as session:
+            await reindex.load_index_pointer(session)
+        # Pipelines must mirror writes into collections a re-index is building
+        index_watch_task = asyncio.create_task(reindex.watch_loop())
+        heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+        logger.info("Worker %s started (concurrency %d)", self.id, self.concurrency)
+
+        try:
+            while not self._draining:
+                free = self.concurrency - len(self.active)
+                if free > 0:
+                    try:
+                        await self._claim(free)
+                    except Exception:
+                        logger.exception("Claiming documents failed")
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=settings.worker_poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+            await self._drain_active()
+        finally:
+            heartbeat_task.cancel()
+            index_watch_task.cancel()
+            await asyncio.gather(heartbeat_task, index_watch_task, return_exceptions=True)
+        logger.info("Worker %s stopped", self.id)
+
+    async def _claim(self, limit: int) -> None:
+        async with AsyncSessionLocal() as session:
+            await ingest_queue.fail_exhausted(session)
+            claimed = await ingest_queue.claim(session, self.id, limit)
+        for document_id, file_path, file_type in claimed:
+            logger.info("Claimed document %d", document_id)
+            self.active[document_id] = asyncio.create_task(
+                self._process(document_id, file_path, file_type)
+            )
+
+    async def _process(self, document_id: int, file_path: str, file_type: str) -> None:
+        requeue = False
+        try:
+            async with AsyncSessionLocal() as session:
+                await run_pipeline(session, document_id, file_path, file_type)
+        except asyncio.CancelledError:
+            # Drain timeout → hand it to another worker; lost lease → it already has one
+            requeue = document_id not in self._lost
+        except Exception:
+            logger.exception("Pipeline failed for document %d", document_id)
+        finally:
+            self.active.pop(document_id, None)
+            self._lost.discard(document_id)
+            try:
+                async with AsyncSessionLocal() as session:
+                    await ingest_queue.release(session, self.id, document_id, requeue=requeue)
+            except Exception:
+                logger.exception("Failed to release lease on document %d; it will expire", document_id)
+            self._wake.set()
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.worker_lease_seconds / 3)
+            try:
+                async with AsyncSessionLocal() as session:
+                    lost = await ingest_queue.renew(session, self.id, list(self.active))
+            except Exception:
+                logger.exception("Lease heartbeat failed")
+                continue
+            for document_id in lost:
+                # Another worker took it over (we stalled past the lease); stop duplicating work
+                logger.warning("Lost lease on document %d; abandoning it", document_id)
+                self._lost.add(document_id)
+                task = self.active.get(document_id)
+                if task:
+                    task.cancel()
+
+    async def _drain_active(self) -> None:
+        if not self.active:
+            return
+        _, pending = await asyncio.wait(list(self.active.values()), timeout=settings.worker_drain_seconds)
+        if pending:
+            logger.warning("Drain timeout: requeueing %d document(s)", len(pending))
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run ingestion pipelines for queued documents.")
+    parser.add_argument("--concurrency", type=int, default=settings.worker_concurrency)
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
+    )
+    asyncio.run(Worker(args.concurrency).run())
+
+
+if __name__ == "__main__":
+    main()
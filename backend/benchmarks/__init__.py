@@ -0,0 +1 @@
+"""Performance benchmarks and load-test harnesses (run from the backend directory)."""
@@ -0,0 +1,162 @@
+"""
+Index size reduction from near-duplicate child chunks.
+
+Builds one user's library of synthetic OCR text and plans it with dedup.Deduplicator,
+exactly as the pipeline does, without a database or embedding calls:
+  - invoices: a letterhead and remittance terms on every page, unique line items;
+  - forms: the same instructions on every page of a multi-page form, unique answers;
+  - letters: unique prose under a letterhead.
+OCR noise (a share of words with one character misread) makes repeated blocks near,
+not exact, duplicates. The same library with no shared text is the control, where every
+duplicate found is a false positive. Each duplicate is checked against the exact
+Jaccard similarity of its shingles and the chunk whose vector it shares.
+
+Reports child chunks, stored vectors (parents + unique children), the index reduction
+and the embedding tokens saved. For the real corpus, GET /admin/reindex/estimate
+reports the same numbers.
+
+Usage (from backend/):
+    python -m benchmarks.dedup --documents 300 --noise 0.01
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from app.config import get_settings
+from app.services import dedup
+from app.services.chunker import chunk_pages
+from app.services.context_packer import estimate_tokens
+
+settings = get_settings()
+
+WORDS = (
+    "invoice total amount due payment account number date customer reference order "
+    "quantity price tax subtotal balance shipping address terms agreement contract party "
+    "section clause schedule delivery warranty service period notice receipt item unit"
+).split()
+LETTERHEAD = (
+    "Northwind Supplies Ltd. 14 Harbour Road, Leeds LS1 4AB. Telephone 0113 496 0000. "
+    "Registered in England and Wales, company number 04821937, VAT number GB 382 1049 77. "
+)
+TERMS = (
+    "Payment is due within thirty days of the invoice date. Late payments accrue interest "
+    "at four percent above base rate. Please quote the invoice number with every remittance "
+    "and send payment to account 20-45-77 41902837. Goods remain our property until paid in full. "
+)
+INSTRUCTIONS = (
+    "Complete every section in black ink using capital letters. Do not write outside the boxes. "
+    "If a question does not apply to you, write N/A. Attach copies of supporting documents, "
+    "never originals. Incomplete forms will be returned and may delay your application. "
+)
+
+
+def _prose(rng: random.Random, words: int) -> str:
+    sentences, left = [], words
+    while left > 0:
+        n = min(left, rng.randint(8, 18))
+        sentence = " ".join(
+            rng.choice(WORDS) if rng.random() > 0.2 else str(rng.randint(1, 99999)) for _ in range(n)
+        )
+        sentences.append(sentence.capitalize() + ".")
+        left -= n
+    return " ".join(sentences) + " "
+
+
+def _misread(text: str, rng: random.Random, rate: float) -> str:
+    words = text.split(" ")
+    for i, word in enumerate(words):
+        if word and rng.random() < rate:
+            j = rng.randrange(len(word))
+            words[i] = word[:j] + rng.choice("il1o0ec") + word[j + 1 :]
+    return " ".join(words)
+
+
+def _library(documents: int, seed: int, noise: float, shared: bool) -> list[list[tuple[int, str]]]:
+    rng = random.Random(seed)
+    library = []
+    for n in range(documents):
+        kind = ("invoice", "form", "letter")[n % 3]
+        pages = {"invoice": rng.randint(1, 3), "form": rng.randint(4, 8), "letter": rng.randint(1, 2)}[kind]
+        boilerplate = {
+            "invoice": (LETTERHEAD, TERMS),
+            "form": (INSTRUCTIONS, ""),
+            "letter": (LETTERHEAD, ""),
+        }[kind]
+        body = {"invoice": 150, "form": 220, "letter": 380}[kind]
+        document = []
+        for page in range(1, pages + 1):
+            head, tail = boilerplate if shared else (
+                _prose(rng, len(b.split())) if b else "" for b in boilerplate
+            )
+            document.append((page, _misread(head + _prose(rng, body) + tail, rng, noise)))
+        library.append(document)
+    return library
+
+
+async def _plan(library: list[list[tuple[int, str]]]) -> dict:
+    deduplicator = dedup.Deduplicator(None, user_id=1, collection_name="bench")
+    parents = children = stored_children = tokens = stored_tokens = 0
+    texts: dict[tuple[int, int], str] = {}
+    started = time.perf_counter()
+    for document_id, pages in enumerate(library, start=1):
+        chunks = chunk_pages(pages)
+        stored = await deduplicator.plan(document_id, chunks)
+        for chunk in chunks:
+            if chunk.chunk_type == "child":
+                texts[(document_id, chunk.chunk_index)] = chunk.text
+                children += 1
+                tokens += estimate_tokens(chunk.text)
+            else:
+                parents += 1
+        for chunk in stored:
+            if chunk.chunk_type == "child":
+                stored_children += 1
+                stored_tokens += estimate_tokens(chunk.text)
+    elapsed = time.perf_counter() - started
+
+    # Every duplicate against the chunk whose vector it shares
+    similarities = []
+    for fingerprint in deduplicator._fingerprints:
+        canonical = dedup._shingles(texts[(fingerprint.document_id, fingerprint.chunk_index)])
+        for duplicate in fingerprint.duplicates:
+            shingles = dedup._shingles(texts[(duplicate.document_id, duplicate.chunk_index)])
+            similarities.append(len(canonical & shingles) / len(canonical | shingles))
+    below = sum(1 for s in similarities if s < settings.chunk_dedup_threshold)
+
+    return {
+        "documents": len(library),
+        "pages": sum(len(pages) for pages in library),
+        "parent_chunks": parents,
+        "child_chunks": children,
+        "duplicates_in_document": deduplicator.in_document,
+        "duplicates_in_library": deduplicator.in_library,
+        "stored_vectors": parents + stored_children,
+        "index_reduction": round(1 - (parents + stored_children) / max(1, parents + children), 4),
+        "embed_tokens": stored_tokens,
+        "embed_tokens_saved": round(1 - stored_tokens / max(1, tokens), 4),
+        "min_exact_jaccard": round(min(similarities), 3) if similarities else None,
+        "duplicates_below_threshold": below,
+        "plan_ms_per_child": round(elapsed * 1000 / max(1, children), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=300)
+    parser.add_argument("--noise", type=float, default=0.01, help="share of words with one misread character")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = {
+        "threshold": settings.chunk_dedup_threshold,
+        "noise": args.noise,
+        "library": asyncio.run(_plan(_library(args.documents, args.seed, args.noise, shared=True))),
+        "control": asyncio.run(_plan(_library(args.documents, args.seed, args.noise, shared=False))),
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Deterministic local stand-ins for the external services (Cohere, ChromaDB, Gemini).
+
+Each fake sleeps for a configurable latency so benchmarks exercise the real
+service code paths without network access or API keys. Sync methods block the
+calling thread (like the real SDK clients); async methods yield to the loop.
+With `jitter` > 0 each call's latency is log-normal around the configured median,
+and `failure_rate` makes that fraction of calls raise FakeServiceError. Both draw
+from a seeded generator, so runs are repeatable.
+"""
+import asyncio
+import math
+import random
+import threading
+import time
+from dataclasses import dataclass
+from types import SimpleNamespace
+
+
+class FakeServiceError(RuntimeError):
+    """Injected failure of a fake external service."""
+
+
+_rng = random.Random(0)
+_rng_lock = threading.Lock()
+
+
+def seed_fakes(seed: int) -> None:
+    with _rng_lock:
+        _rng.seed(seed)
+
+
+@dataclass
+class FakeLatency:
+    embed_s: float = 0.08
+    chroma_count_s: float = 0.02
+    chroma_query_s: float = 0.04
+    chroma_get_s: float = 0.03
+    llm_s: float = 0.40
+    jitter: float = 0.0          # log-normal sigma; 0 = fixed latencies
+    failure_rate: float = 0.0    # fraction of calls that raise FakeServiceError
+
+    def sample(self, median_s: float, service: str) -> float:
+        """Latency for one call, or FakeServiceError if this call is chosen to fail."""
+        with _rng_lock:
+            failed = self.failure_rate and _rng.random() < self.failure_rate
+            factor = math.exp(_rng.gauss(0.0, self.jitter)) if self.jitter else 1.0
+        if failed:
+            raise FakeServiceError(f"injected {service} failure")
+        return median_s * factor
+
+    def wait(self, median_s: float, service: str) -> None:
+        time.sleep(self.sample(median_s, service))
+
+    async def wait_async(self, median_s: float, service: str) -> None:
+        await asyncio.sleep(self.sample(median_s, service))
+
+
+def _vector(text: str, dim: int) -> list[float]:
+    """Cheap deterministic pseudo-embedding."""
+    seed = sum(map(ord, text)) or 1
+    return [((seed * (i + 1)) % 97) / 97.0 for i in range(dim)]
+
+
+class FakeCohereClient:
+    def __init__(self, latency: FakeLatency, dim: int = 1024):
+        self.latency = latency
+        self.dim = dim
+
+    def embed(self, texts: list[str], **kwargs):
+        self.latency.wait(self.latency.embed_s, "cohere")
+        return SimpleNamespace(embeddings=SimpleNamespace(float_=[_vector(t, self.dim) for t in texts]))
+
+
+class FakeAsyncCohereClient(FakeCohereClient):
+    async def embed(self, texts: list[str], **kwargs):
+        await self.latency.wait_async(self.latency.embed_s, "cohere")
+        return SimpleNamespace(embeddings=SimpleNamespace(float_=[_vector(t, self.dim) for t in texts]))
+
+
+class FakeCollection:
+    """In-memory collection answering Chroma's query/get/count/upsert/delete shapes."""
+
+    def __init__(self, latency: FakeLatency, document_ids: list[int], children_per_doc: int = 20):
+        self.latency = latency
+        self.rows: dict[str, dict] = {}
+        for doc_id in document_ids:
+            for i in range(children_per_doc):
+                parent_id = f"page1_idx{i // 4}"
+                self.rows[f"doc{doc_id}_chunk{i}"] = {
+                    "document": f"child chunk {i} of document {doc_id}",
+                    "metadata": {
+                        "document_id": doc_id, "chunk_index": i, "page_number": 1,
+                        "chunk_type": "child", "parent_id": parent_id,
+                    },
+                }
+                if i % 4 == 0:
+                    self.rows[f"doc{doc_id}_parent{i}"] = {
+                        "document": f"parent chunk {i // 4} of document {doc_id} " * 20,
+                        "metadata": {
+                            "document_id": doc_id, "chunk_index": 1000 + i, "page_number": 1,
+                            "chunk_type": "parent", "parent_id": parent_id,
+                        },
+                    }
+
+    @staticmethod
+    def _matches(metadata: dict, where: dict | None) -> bool:
+        """Enough of Chroma's `where` syntax for the filters chroma_store builds."""
+        if not where:
+            return True
+        if "$and" in where:
+            return all(FakeCollection._matches(metadata, w) for w in where["$and"])
+        for field, cond in where.items():
+            value = metadata.get(field)
+            for op, operand in (cond.items() if isinstance(cond, dict) else [("$eq", cond)]):
+                if op == "$eq" and value != operand:
+                    return False
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$nin" and value in operand:
+                    return False
+                if op == "$gte" and not (value is not None and value >= operand):
+                    return False
+        return True
+
+    def count(self) -> int:
+        self.latency.wait(self.latency.chroma_count_s, "chroma")
+        return len(self.rows)
+
+    def query(self, query_embeddings: list[list[float]], n_results: int = 5, where: dict | None = None, **kwargs):
+        self.latency.wait(self.latency.chroma_query_s, "chroma")
+        hits = [(k, v) for k, v in self.rows.items() if self._matches(v["metadata"], where)][:n_results]
+        per_query = {
+            "ids": [k for k, _ in hits],
+            "documents": [v["document"] for _, v in hits],
+            "metadatas": [v["metadata"] for _, v in hits],
+            "distances": [0.1 + 0.01 * i for i in range(len(hits))],
+        }
+        return {key: [per_query[key]] * len(query_embeddings) for key in per_query}
+
+    def get(self, ids: list[str] | None = None, where: dict | None = None, include=None, **kwargs):
+        self.latency.wait(self.latency.chroma_get_s, "chroma")
+        rows = [
+            (k, v) for k, v in self.rows.items()
+            if (ids is None or k in ids) and self._matches(v["metadata"], where)
+        ]
+        result = {
+            "ids": [k for k, _ in rows],
+            "documents": [v["document"] for _, v in rows],
+            "metadatas": [v["metadata"] for _, v in rows],
+        }
+        if include and "embeddings" in include:
+            result["embeddings"] = [v.get("embedding") for _, v in rows]
+        return result
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        self.latency.wait(self.latency.chroma_query_s, "chroma")
+        for i, chunk_id in enumerate(ids):
+            self.rows[chunk_id] = {"document": documents[i], "metadata": metadatas[i], "embedding": embeddings[i]}
+
+    def delete(self, ids: list[str] | None = None, where: dict | None = None):
+        self.latency.wait(self.latency.chroma_get_s, "chroma")
+        for chunk_id in [k for k, v in self.rows.items() if self._matches(v["metadata"], where)] if where else []:
+            self.rows.pop(chunk_id, None)
+        for chunk_id in ids or []:
+            self.rows.pop(chunk_id, None)
+
+
+class FakeChromaClient:
+    """Hands out one FakeCollection per name, like chromadb.HttpClient."""
+
+    def __init__(self, latency: FakeLatency):
+        self.latency = latency
+        self.collections: dict[str, FakeCollection] = {}
+
+    def get_or_create_collection(self, name: str, **kwargs) -> FakeCollection:
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(self.latency, [])
+        return self.collections[name]
+
+
+class _FakeChunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _FakeAsyncStream:
+    def __init__(self, parts: list[str], delay_s: float):
+        self.parts = list(parts)
+        self.delay_s = delay_s
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.parts:
+            raise StopAsyncIteration
+        await asyncio.sleep(self.delay_s)
+        return _FakeChunk(self.parts.pop(0))
+
+
+class FakeGeminiModel:
+    ANSWER = "The total amount due is $1,234.56 according to the invoice."
+
+    def __init__(self, latency: FakeLatency):
+        self.latency = latency
+
+    def generate_content(self, prompt: str):
+        self.latency.wait(self.latency.llm_s, "gemini")
+        return _FakeChunk(self.ANSWER)
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        if stream:
+            words = [w + " " for w in self.ANSWER.split()]
+            return _FakeAsyncStream(words, self.latency.sample(self.latency.llm_s, "gemini") / len(words))
+        await self.latency.wait_async(self.latency.llm_s, "gemini")
+        return _FakeChunk(self.ANSWER)
+
+
+def install_query_fakes(latency: FakeLatency, document_ids: list[int]) -> None:
+    """Swap the real clients used by the query path for local fakes."""
+    from app.services import embedder, chroma_store, rag
+
+    embedder._client = FakeCohereClient(latency)
+    if hasattr(embedder, "_async_client"):
+        embedder._async_client = FakeAsyncCohereClient(latency)
+    chroma_store._collections[chroma_store.active_collection_name()] = FakeCollection(latency, document_ids)
+    model = FakeGeminiModel(latency)
+    rag.get_gemini_model = lambda: model
+
+
+def install_ingest_fakes(latency: FakeLatency) -> None:
+    """Swap the clients used by run_pipeline (Cohere embed, Chroma upsert) for local fakes."""
+    from app.services import embedder, chroma_store
+
+    embedder._client = FakeCohereClient(latency)
+    chroma_store._client = FakeChromaClient(latency)
+    chroma_store._collections.clear()
@@ -0,0 +1,279 @@
+"""
+End-to-end load test of the query path through the real FastAPI app.
+
+Starts the app under uvicorn on a local port (its own thread and event loop), swaps in
+the fakes from benchmarks/fakes.py, and seeds users with completed documents plus
+documents that are still "processing". Then, for --duration seconds, it drives:
+  - --concurrency closed-loop clients calling POST /query;
+  - one GET /documents/{id}/events SSE stream per processing document, while a
+    simulated pipeline appends OCR text page by page and then completes the document.
+Reports throughput, p50/p95/p99 latency, errors by status, SSE time-to-first-event,
+and the server event loop's lag, as JSON.
+
+The load generator shares the process (and the GIL) with the server, so compare runs
+with each other rather than against a real deployment.
+
+Usage (from backend/, with DATABASE_URL pointing at a scratch SQLite file):
+    DATABASE_URL=sqlite+aiosqlite:///./bench.db python -m benchmarks.http_load \\
+        --concurrency 50 --duration 20 --jitter 0.5 --failure-rate 0.01
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from benchmarks.fakes import FakeChromaClient, FakeLatency, install_query_fakes, seed_fakes
+from benchmarks.query_load import percentile
+
+
+def _latency_summary(samples: list[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 1),
+        "p95_ms": round(percentile(samples, 95) * 1000, 1),
+        "p99_ms": round(percentile(samples, 99) * 1000, 1),
+        "max_ms": round(max(samples) * 1000, 1),
+    }
+
+
+async def _seed(users: int, docs_per_user: int, processing_per_user: int) -> tuple[list[dict], list[int]]:
+    """Returns ([{token, document_ids, processing_ids}], all completed ids)."""
+    from app.database import AsyncSessionLocal, init_db
+    from app.models import Document, DocumentStatus, User
+    from app.services.auth_service import create_access_token
+
+    await init_db()
+    seeded, completed = [], []
+    async with AsyncSessionLocal() as session:
+        for u in range(users):
+            user = User(name=f"load{u}", email=f"load{u}-{time.time_ns()}@example.com", password_hash="x")
+            session.add(user)
+            await session.flush()
+            docs = [
+                Document(
+                    user_id=user.id, filename=f"load{u}_{i}.png", original_filename=f"load{u}_{i}.png",
+                    file_type=".png", status=DocumentStatus.COMPLETED, page_count=1, chunk_count=25,
+                )
+                for i in range(docs_per_user)
+            ]
+            processing = [
+                Document(
+                    user_id=user.id, filename=f"ingest{u}_{i}.png", original_filename=f"ingest{u}_{i}.png",
+                    file_type=".png", status=DocumentStatus.PROCESSING, processing_step="OCR", ocr_text="",
+                )
+                for i in range(processing_per_user)
+            ]
+            session.add_all(docs + processing)
+            await session.flush()
+            seeded.append({
+                "token": create_access_token(user.id, user.email),
+                "document_ids": [d.id for d in docs],
+                "processing_ids": [d.id for d in processing],
+            })
+            completed += [d.id for d in docs]
+        await session.commit()
+    return seeded, completed
+
+
+async def _simulate_ingestion(document_ids: list[int], pages: int, page_s: float) -> None:
+    """Write progress the way run_pipeline does, so SSE streams see real DB changes."""
+    from app.database import AsyncSessionLocal
+    from app.models import Document, DocumentStatus
+    from sqlalchemy import select
+
+    async def one(doc_id: int) -> None:
+        async with AsyncSessionLocal() as session:
+            doc = (await session.execute(select(Document).where(Document.id == doc_id))).scalar_one()
+            for page in range(1, pages + 1):
+                await asyncio.sleep(page_s)
+                doc.ocr_text += f"Page {page} of document {doc_id}. " * 40 + "\n\n\f"
+                await session.commit()
+            doc.processing_step = "Done"
+            doc.status = DocumentStatus.COMPLETED
+            await session.commit()
+
+    await asyncio.gather(*(one(d) for d in document_ids))
+
+
+async def _lag_monitor(stop: threading.Event, samples: list[float], interval: float = 0.01) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+
+class _Server:
+    """uvicorn in a background thread with its own event loop."""
+
+    def __init__(self):
+        from main import app
+
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+
+    def _serve(self) -> None:
+        self.loop.run_until_complete(self.server.serve())
+        # Let the lifespan's cancelled background tasks finish unwinding
+        pending = asyncio.all_tasks(self.loop)
+        self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        self.loop.close()
+
+    def start(self) -> str:
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.05)
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+async def _drive(base_url: str, seeded: list[dict], args) -> dict:
+    rng = random.Random(args.seed)
+    query_latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    deadline = time.perf_counter() + args.duration
+
+    async def query_worker(worker: int, client: httpx.AsyncClient) -> None:
+        n = 0
+        while time.perf_counter() < deadline:
+            user = rng.choice(seeded)
+            # Repeated questions can be served by the answer cache
+            if rng.random() < args.repeat_ratio:
+                question = f"common question {rng.randint(0, 9)}?"
+            else:
+                question = f"question {worker}-{n}?"
+            n += 1
+            started = time.perf_counter()
+            try:
+                res = await client.post(
+                    "/query", json={"query": question, "top_k": 5},
+                    headers={"Authorization": f"Bearer {user['token']}"},
+                )
+                key = str(res.status_code)
+            except httpx.HTTPError as exc:
+                key = type(exc).__name__
+            statuses[key] = statuses.get(key, 0) + 1
+            if key == "200":
+                query_latencies.append(time.perf_counter() - started)
+
+    first_event: list[float] = []
+    stream_totals: list[float] = []
+    stream_events: list[int] = []
+    stream_errors: dict[str, int] = {}
+
+    async def events_stream(client: httpx.AsyncClient, token: str, doc_id: int) -> None:
+        started = time.perf_counter()
+        events = 0
+        try:
+            async with client.stream(
+                "GET", f"/documents/{doc_id}/events", headers={"Authorization": f"Bearer {token}"},
+            ) as res:
+                res.raise_for_status()
+                async for line in res.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    if events == 0:
+                        first_event.append(time.perf_counter() - started)
+                    events += 1
+                    if json.loads(line[5:])["status"] in ("completed", "failed"):
+                        break
+        except httpx.HTTPError as exc:
+            stream_errors[type(exc).__name__] = stream_errors.get(type(exc).__name__, 0) + 1
+            return
+        stream_totals.append(time.perf_counter() - started)
+        stream_events.append(events)
+
+    limits = httpx.Limits(max_connections=args.concurrency + args.users * args.processing_docs + 10)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(query_worker(w, client) for w in range(args.concurrency)),
+            *(
+                events_stream(client, u["token"], doc_id)
+                for u in seeded for doc_id in u["processing_ids"]
+            ),
+        )
+        wall = time.perf_counter() - started
+
+    return {
+        "wall_s": round(wall, 2),
+        "query": {
+            "throughput_qps": round(len(query_latencies) / wall, 1),
+            "statuses": statuses,
+            "error_rate": round(1 - statuses.get("200", 0) / max(1, sum(statuses.values())), 4),
+            "latency": _latency_summary(query_latencies),
+        },
+        "events": {
+            "streams": len(stream_totals),
+            "errors": stream_errors,
+            "time_to_first_event": _latency_summary(first_event),
+            "stream_duration": _latency_summary(stream_totals),
+            "events_per_stream": round(sum(stream_events) / max(1, len(stream_events)), 1),
+        },
+    }
+
+
+def run(args) -> dict:
+    seed_fakes(args.seed)
+    latency = FakeLatency(jitter=args.jitter, failure_rate=args.failure_rate)
+    seeded, completed = asyncio.run(_seed(args.users, args.docs, args.processing_docs))
+
+    server = _Server()
+    base_url = server.start()
+    from app.services import chroma_store
+
+    # After startup, so the lifespan's index-pointer load doesn't race the swap
+    chroma_store._client = FakeChromaClient(latency)
+    install_query_fakes(latency, completed)
+
+    stop = threading.Event()
+    lag_samples: list[float] = []
+    monitor = server.submit(_lag_monitor(stop, lag_samples))
+    processing = [d for u in seeded for d in u["processing_ids"]]
+    ingestion = server.submit(_simulate_ingestion(processing, args.pages, args.duration / (args.pages + 1)))
+    try:
+        report = asyncio.run(_drive(base_url, seeded, args))
+    finally:
+        stop.set()
+        monitor.result(timeout=5)
+        ingestion.result(timeout=args.duration + 30)
+        server.stop()
+
+    return {
+        "config": {
+            "concurrency": args.concurrency, "duration_s": args.duration, "users": args.users,
+            "docs_per_user": args.docs, "event_streams": len(processing),
+            "repeat_ratio": args.repeat_ratio, "fake_latency_s": latency.__dict__,
+        },
+        **report,
+        "event_loop_lag": _latency_summary(lag_samples),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent /query clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of /query traffic")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--docs", type=int, default=3, help="Completed documents per user")
+    parser.add_argument("--processing-docs", type=int, default=2, help="Documents per user streamed over SSE")
+    parser.add_argument("--pages", type=int, default=5, help="Simulated OCR pages per streamed document")
+    parser.add_argument("--repeat-ratio", type=float, default=0.0, help="Fraction of repeated (cacheable) questions")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Log-normal sigma of fake service latency")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of fake service calls that fail")
+    parser.add_argument("--seed", type=int, default=0)
+    print(json.dumps(run(parser.parse_args()), indent=2))
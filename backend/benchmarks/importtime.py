@@ -0,0 +1,58 @@
+"""
+Import-time profile of the API process, from `python -X importtime`.
+
+Imports `main` (or --module) in a fresh interpreter, then reports total import time
+and the top-level packages with the largest cumulative cost.
+
+Usage (from backend/):
+    python -m benchmarks.importtime [--module main] [--top 15] [--runs 3]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+_LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| *(\S+)")
+
+
+def profile(module: str) -> tuple[int, dict[str, int]]:
+    """Return (total_us, cumulative µs per top-level package) for one cold import."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=os.environ.copy(), check=True,
+    )
+    total = 0
+    packages: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        m = _LINE_RE.match(line)
+        if not m:
+            continue
+        cumulative, name = int(m.group(2)), m.group(3)
+        if name == module:
+            total = cumulative
+        # The outermost import of a package carries its whole cumulative cost
+        root = name.split(".")[0]
+        packages[root] = max(packages.get(root, 0), cumulative)
+    return total, packages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=3, help="Report the fastest of N cold imports")
+    args = parser.parse_args()
+
+    runs = [profile(args.module) for _ in range(args.runs)]
+    total, packages = min(runs, key=lambda r: r[0])
+    print(f"import {args.module}: {total / 1000:.0f} ms (best of {args.runs})\n")
+    print("| package | cumulative ms |")
+    print("|---|---:|")
+    for name, us in sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[: args.top]:
+        if name not in (args.module, "app"):
+            print(f"| {name} | {us / 1000:.0f} |")
+
+
+if __name__ == "__main__":
+    main()
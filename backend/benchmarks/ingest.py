@@ -0,0 +1,195 @@
+"""
+Offline ingestion benchmark: run_pipeline on synthetic scanned documents, with local
+fakes for Cohere and ChromaDB and a scratch SQLite metadata DB.
+
+Each case (format × DPI × pages) runs in a fresh process, so its peak RSS is its own.
+The output is JSON with pages/sec, per-stage time from the document timelines, and peak RSS.
+Pass --baseline with an earlier result to fail (exit 1) when a case gets slower or bigger
+than --tolerance allows. Use that to catch regressions in preprocessing, OCR or PDF generation.
+
+Needs Tesseract, and Poppler for the PDF cases (without Poppler the PDF cases fall back to
+text extraction and report 0 OCR pages).
+
+Usage (from backend/):
+    DATABASE_URL=sqlite+aiosqlite:///./bench.db python -m benchmarks.ingest \\
+        [--docs 2] [--formats png,tiff,pdf] [--dpis 150,200,300] [--pages 4] \\
+        [--service-latency] [--output results.json] [--baseline results.json --tolerance 0.2]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from benchmarks.fakes import FakeLatency, install_ingest_fakes
+from benchmarks.synthetic import write_document
+
+NO_LATENCY = FakeLatency(embed_s=0, chroma_count_s=0, chroma_query_s=0, chroma_get_s=0, llm_s=0)
+# Stages shorter than this per page are too noisy to flag as regressions
+MIN_COMPARABLE_MS = 5.0
+
+
+def build_cases(formats: list[str], dpis: list[int], pages: int) -> list[dict]:
+    """Single images at every DPI; multi-page TIFF/PDF at the middle DPI."""
+    cases = []
+    for fmt in formats:
+        if fmt == "png":
+            cases += [{"name": f"png-{dpi}dpi", "format": fmt, "dpi": dpi, "pages": 1} for dpi in dpis]
+        else:
+            dpi = sorted(dpis)[len(dpis) // 2]
+            cases.append({"name": f"{fmt}-{dpi}dpi-{pages}p", "format": fmt, "dpi": dpi, "pages": pages})
+    return cases
+
+
+async def _run_case_async(case: dict, docs: int, latency: FakeLatency, workdir: str) -> dict:
+    from app.database import AsyncSessionLocal, init_db
+    from app.models import Document, DocumentStatus, User
+    from app.services import timeline
+    from app.services.pipeline import run_pipeline
+
+    install_ingest_fakes(latency)
+    await init_db()
+
+    paths = [
+        write_document(Path(workdir) / f"{case['name']}-{i}", case["format"], case["pages"], seed=i, dpi=case["dpi"])
+        for i in range(docs)
+    ]
+    async with AsyncSessionLocal() as session:
+        user = User(name="bench", email=f"bench-{time.time_ns()}@example.com", password_hash="x")
+        session.add(user)
+        await session.flush()
+        rows = [
+            Document(
+                user_id=user.id, filename=p.name, original_filename=p.name, file_type=p.suffix,
+                file_size=p.stat().st_size,
+            )
+            for p in paths
+        ]
+        session.add_all(rows)
+        await session.commit()
+        doc_ids = [d.id for d in rows]
+
+    rss_before_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    for doc_id, path in zip(doc_ids, paths):
+        async with AsyncSessionLocal() as session:
+            try:
+                await run_pipeline(session, doc_id, str(path), path.suffix)
+            except Exception:
+                pass  # recorded on the Document row
+    wall = time.perf_counter() - started
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            Document.__table__.select().where(Document.id.in_(doc_ids))
+        )
+        docs_done = result.mappings().all()
+
+    completed = [d for d in docs_done if d["status"] == DocumentStatus.COMPLETED]
+    timelines = [timeline.parse(d["timeline"]) for d in docs_done if d["timeline"]]
+    ocr_pages = sum(1 for tl in timelines for s in tl["spans"] if s["stage"] == "ocr")
+    layout_spans = [s for tl in timelines for s in tl["spans"] if s["stage"] == "layout"]
+
+    stages: dict[str, dict] = {}
+    for tl in timelines:
+        for span in tl["spans"]:
+            agg = stages.setdefault(span["stage"], {"total_ms": 0, "cpu_ms": 0, "count": 0})
+            agg["total_ms"] += span["duration_ms"]
+            agg["cpu_ms"] += span["cpu_ms"]
+            agg["count"] += 1
+    percentiles = timeline.stage_percentiles(timelines) if timelines else {}
+    for name, agg in stages.items():
+        agg["ms_per_page"] = round(agg["total_ms"] / max(1, ocr_pages), 1)
+        agg.update({k: v for k, v in percentiles[name].items() if k != "count"})
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        **case,
+        "documents": docs,
+        "completed": len(completed),
+        "failed": [d["error_message"] for d in docs_done if d["status"] == DocumentStatus.FAILED],
+        "input_bytes": sum(p.stat().st_size for p in paths),
+        "ocr_pages": ocr_pages,
+        "skipped_pages": max(0, len(layout_spans) - ocr_pages),
+        "pixels_saved": sum(s["bytes"] for s in layout_spans),
+        "wall_s": round(wall, 3),
+        "pages_per_sec": round(ocr_pages / wall, 3) if wall else 0.0,
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "rss_growth_mb": round((peak_kb - rss_before_kb) / 1024, 1),
+        "stages": stages,
+    }
+
+
+def _run_case(case: dict, docs: int, latency: dict, workdir: str) -> dict:
+    return asyncio.run(_run_case_async(case, docs, FakeLatency(**latency), workdir))
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Human-readable regressions of `current` against `baseline` beyond `tolerance`."""
+    previous = {c["name"]: c for c in baseline["cases"]}
+    regressions = []
+    for case in current["cases"]:
+        base = previous.get(case["name"])
+        if not base:
+            continue
+        if base["pages_per_sec"] and case["pages_per_sec"] < base["pages_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{case['name']}: pages/sec {base['pages_per_sec']} → {case['pages_per_sec']}"
+            )
+        if case["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(
+                f"{case['name']}: peak RSS {base['peak_rss_mb']} MB → {case['peak_rss_mb']} MB"
+            )
+        for stage, stats in case["stages"].items():
+            before = base["stages"].get(stage, {}).get("ms_per_page", 0)
+            if before >= MIN_COMPARABLE_MS and stats["ms_per_page"] > before * (1 + tolerance):
+                regressions.append(
+                    f"{case['name']}: {stage} {before} → {stats['ms_per_page']} ms/page"
+                )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=2, help="Documents per case")
+    parser.add_argument("--formats", default="png,tiff,pdf")
+    parser.add_argument("--dpis", default="150,200,300")
+    parser.add_argument("--pages", type=int, default=4, help="Pages per TIFF/PDF document")
+    parser.add_argument(
+        "--service-latency", action="store_true",
+        help="Give the fake embedder/vector store their default latencies (otherwise zero)",
+    )
+    parser.add_argument("--output", help="Write the JSON result here as well as to stdout")
+    parser.add_argument("--baseline", help="Earlier JSON result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    cases = build_cases(args.formats.split(","), [int(d) for d in args.dpis.split(",")], args.pages)
+    latency = FakeLatency() if args.service_latency else NO_LATENCY
+
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as workdir:
+        for case in cases:
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                results.append(pool.submit(_run_case, case, args.docs, latency.__dict__, workdir).result())
+            print(f"{case['name']}: {results[-1]['pages_per_sec']} pages/s", file=sys.stderr)
+
+    report = {"fake_latency_s": latency.__dict__, "cases": results}
+    if args.baseline:
+        report["regressions"] = compare(report, json.loads(Path(args.baseline).read_text()), args.tolerance)
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
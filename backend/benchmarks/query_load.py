@@ -0,0 +1,91 @@
+"""
+Concurrent load test for query_rag against local fakes of Cohere, ChromaDB and Gemini.
+
+Runs N concurrent queries (each with a unique question, so the answer cache never
+hits) and reports p50/p99 latency plus the worst event-loop stall observed.
+
+Usage (from backend/, with DATABASE_URL pointing at a scratch SQLite file):
+    DATABASE_URL=sqlite+aiosqlite:///./bench.db python -m benchmarks.query_load --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from app.database import AsyncSessionLocal, init_db
+from app.models import Document, DocumentStatus, User
+from benchmarks.fakes import FakeLatency, install_query_fakes
+
+
+async def _seed_documents(count: int) -> list[int]:
+    await init_db()
+    async with AsyncSessionLocal() as session:
+        user = User(name="bench", email=f"bench-{time.time_ns()}@example.com", password_hash="x")
+        session.add(user)
+        await session.flush()
+        docs = [
+            Document(
+                user_id=user.id, filename=f"bench{i}.png", original_filename=f"bench{i}.png",
+                file_type=".png", status=DocumentStatus.COMPLETED,
+            )
+            for i in range(count)
+        ]
+        session.add_all(docs)
+        await session.commit()
+        return [d.id for d in docs]
+
+
+async def _loop_lag_monitor(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Return the worst observed delay of a periodic timer (event-loop lag)."""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+async def run(concurrency: int, latency: FakeLatency) -> dict:
+    from app.services.rag import query_rag
+
+    document_ids = await _seed_documents(3)
+    install_query_fakes(latency, document_ids)
+
+    async def one(i: int) -> float:
+        async with AsyncSessionLocal() as session:
+            started = time.perf_counter()
+            await query_rag(session, f"question number {i}?", top_k=5, document_ids=document_ids)
+            return time.perf_counter() - started
+
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(_loop_lag_monitor(stop))
+    wall_started = time.perf_counter()
+    latencies = await asyncio.gather(*(one(i) for i in range(concurrency)))
+    wall = time.perf_counter() - wall_started
+    stop.set()
+    max_lag = await monitor
+
+    return {
+        "concurrency": concurrency,
+        "fake_latency_s": latency.__dict__,
+        "p50_ms": round(statistics.median(latencies) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies) * 1000, 1),
+        "wall_s": round(wall, 2),
+        "throughput_qps": round(concurrency / wall, 1),
+        "max_event_loop_lag_ms": round(max_lag * 1000, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.concurrency, FakeLatency())), indent=2))
@@ -0,0 +1,77 @@
+"""
+Compare time-to-first-byte of the blocking POST /query endpoint against the
+streaming POST /query/stream endpoint on a running server.
+
+Usage (from backend/):
+    python -m benchmarks.query_ttfb --token <JWT> --query "What is the total amount?" --runs 5
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import httpx
+
+API_URL = "http://localhost:8000"
+
+
+async def measure_blocking(client: httpx.AsyncClient, body: dict) -> tuple[float, float]:
+    started = time.perf_counter()
+    async with client.stream("POST", "/query", json=body) as res:
+        res.raise_for_status()
+        ttfb = None
+        async for _ in res.aiter_bytes():
+            if ttfb is None:
+                ttfb = time.perf_counter() - started
+    total = time.perf_counter() - started
+    return ttfb * 1000, total * 1000
+
+
+async def measure_stream(client: httpx.AsyncClient, body: dict) -> tuple[float, float]:
+    """TTFB here is the arrival of the first answer token, not the sources event."""
+    started = time.perf_counter()
+    ttfb = None
+    async with client.stream("POST", "/query/stream", json=body) as res:
+        res.raise_for_status()
+        event = None
+        async for line in res.aiter_lines():
+            if line.startswith("event:"):
+                event = line.split(":", 1)[1].strip()
+            elif line.startswith("data:") and event == "token" and ttfb is None:
+                ttfb = time.perf_counter() - started
+            elif line.startswith("data:") and event == "error":
+                raise RuntimeError(json.loads(line.split(":", 1)[1])["detail"])
+    total = time.perf_counter() - started
+    return (ttfb or total) * 1000, total * 1000
+
+
+def _summary(samples: list[tuple[float, float]]) -> dict:
+    return {
+        "ttfb_ms_p50": round(statistics.median(s[0] for s in samples), 1),
+        "total_ms_p50": round(statistics.median(s[1] for s in samples), 1),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    headers = {"Authorization": f"Bearer {args.token}"}
+    async with httpx.AsyncClient(base_url=args.url, headers=headers, timeout=120) as client:
+        report = {}
+        for name, fn in (("blocking", measure_blocking), ("stream", measure_stream)):
+            samples = []
+            for i in range(args.runs):
+                # Vary the query so the answer cache does not flatten the numbers
+                body = {"query": f"{args.query} (run {i} {name})", "top_k": args.top_k}
+                samples.append(await fn(client, body))
+            report[name] = _summary(samples)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=API_URL)
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--query", default="What is this document about?")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,82 @@
+"""
+Synthetic "scanned" documents for the ingestion benchmark.
+
+Pages are US Letter, rendered at a given DPI with seeded pseudo-text, then rotated by a
+small skew and degraded with Gaussian and salt-and-pepper noise, so preprocessing and
+OCR do realistic work. Everything is deterministic for a given seed.
+"""
+import random
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+LETTER_INCHES = (8.5, 11.0)
+WORDS = (
+    "invoice total amount due payment account number date customer reference order "
+    "quantity price tax subtotal balance shipping address terms net thirty days "
+    "please remit agreement contract party section clause schedule page signature"
+).split()
+
+
+def render_page(
+    seed: int,
+    dpi: int = 200,
+    skew_deg: float = 1.5,
+    noise_sigma: float = 12.0,
+    speckle: float = 0.002,
+) -> Image.Image:
+    """One grayscale page of paragraphs, skewed and noisy like a cheap flatbed scan."""
+    rng = random.Random(seed)
+    width, height = int(LETTER_INCHES[0] * dpi), int(LETTER_INCHES[1] * dpi)
+    page = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(page)
+    font = ImageFont.load_default(size=max(8, dpi // 7))  # ≈ 10–11 pt
+
+    margin = dpi
+    line_height = int(font.size * 1.6)
+    y = margin
+    while y < height - margin - line_height:
+        if rng.random() < 0.12:  # paragraph break
+            y += line_height
+            continue
+        words, x = [], margin
+        while True:
+            word = rng.choice(WORDS) if rng.random() > 0.15 else str(rng.randint(1, 99999))
+            advance = draw.textlength(word + " ", font=font)
+            if x + advance > width - margin:
+                break
+            words.append(word)
+            x += advance
+        draw.text((margin, y), " ".join(words), fill=rng.randint(0, 60), font=font)
+        y += line_height
+
+    page = page.rotate(rng.uniform(-skew_deg, skew_deg), resample=Image.BILINEAR, fillcolor=255)
+
+    np_rng = np.random.default_rng(seed)
+    pixels = np.asarray(page, dtype=np.float32)
+    pixels += np_rng.normal(0.0, noise_sigma, pixels.shape)
+    specks = np_rng.random(pixels.shape)
+    pixels[specks < speckle / 2] = 0
+    pixels[specks > 1 - speckle / 2] = 255
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), mode="L")
+
+
+def write_document(path: Path, fmt: str, pages: int, seed: int, dpi: int, **page_kwargs) -> Path:
+    """
+    Write a synthetic document: "png" (single page), "tiff" (multi-frame) or "pdf"
+    (image-only, like a scanner's output). Returns the path with its extension.
+    """
+    images = [render_page(seed * 1000 + i, dpi=dpi, **page_kwargs) for i in range(pages)]
+    if fmt == "png":
+        path = path.with_suffix(".png")
+        images[0].save(path, dpi=(dpi, dpi))
+    elif fmt == "tiff":
+        path = path.with_suffix(".tiff")
+        images[0].save(path, save_all=True, append_images=images[1:], compression="tiff_lzw", dpi=(dpi, dpi))
+    elif fmt == "pdf":
+        path = path.with_suffix(".pdf")
+        images[0].save(path, save_all=True, append_images=images[1:], resolution=float(dpi))
+    else:
+        raise ValueError(f"Unknown synthetic format '{fmt}'")
+    return path
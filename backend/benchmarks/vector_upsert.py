@@ -0,0 +1,220 @@
+"""
+Vector upsert throughput against a local Chroma server.
+
+Upserts synthetic documents (1024-dim embeddings, chunk texts of realistic length) three
+ways and reports records/s:
+  - single:   the whole document in one collection.upsert call (the old behaviour);
+  - batched:  upsert_chunks, batches sent one after another;
+  - parallel: upsert_chunks_async, batches sent chroma_upsert_concurrency at a time.
+It then checks idempotency: a document whose upsert failed part-way is upserted again,
+and re-upserting with fewer chunks drops the surplus; the collection count must match.
+--rtt-ms adds a fixed delay to every upsert call, standing in for the network round trip
+to Chroma Cloud that a server on localhost doesn't have.
+
+Usage (from backend/; starts `chroma run` on a scratch directory unless --port is given):
+    python -m benchmarks.vector_upsert --docs 20 --chunks 600
+    python -m benchmarks.vector_upsert --rtt-ms 60
+    python -m benchmarks.vector_upsert --port 8000   # an already running server
+"""
+import argparse
+import asyncio
+import json
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from app.services import chroma_store
+
+DIMENSIONS = 1024
+WORDS = "the of and to in invoice total amount paid date account number page section".split()
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(path: str, port: int) -> subprocess.Popen:
+    chroma = shutil.which("chroma") or str(Path(sys.executable).with_name("chroma"))
+    server = subprocess.Popen(
+        [chroma, "run", "--path", path, "--port", str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("localhost", port), timeout=0.5).close()
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("Chroma server did not start")
+
+
+def _document(chunks: int, rng: random.Random) -> tuple[list[dict], list[list[float]]]:
+    records, embeddings = [], []
+    for i in range(chunks):
+        records.append({
+            "text": " ".join(rng.choices(WORDS, k=rng.randint(60, 180))),
+            "chunk_index": i,
+            "page_number": i // 20 + 1,
+            "chunk_type": "child",
+            "parent_id": f"page{i // 20 + 1}_idx{i // 4}",
+        })
+        embeddings.append([rng.uniform(-1, 1) for _ in range(DIMENSIONS)])
+    return records, embeddings
+
+
+def _count(collection, document_id: int) -> int:
+    return len(collection.get(where={"document_id": {"$eq": document_id}}, include=[])["ids"])
+
+
+class _RemoteCollection:
+    """
+    Adds `rtt` seconds to every upsert and, with `fail_every`, fails every n-th upsert
+    call like a dropped connection.
+    """
+
+    def __init__(self, collection, rtt: float = 0.0, fail_every: int = 0):
+        self._collection, self._rtt, self._fail_every, self._calls = collection, rtt, fail_every, 0
+        self._lock = threading.Lock()  # batches arrive from several I/O threads
+
+    def upsert(self, **kwargs):
+        with self._lock:
+            self._calls += 1
+            call = self._calls
+        time.sleep(self._rtt)
+        if self._fail_every and call % self._fail_every == 0:
+            raise ConnectionError("injected failure")
+        return self._collection.upsert(**kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+
+def _reset(name: str, rtt: float = 0.0):
+    client = chroma_store.get_chroma_client()
+    try:
+        client.delete_collection(name)
+    except Exception:
+        pass
+    chroma_store._collections.pop(name, None)
+    collection = _RemoteCollection(chroma_store.get_collection(name), rtt)
+    chroma_store._collections[name] = collection
+    return collection
+
+
+def _upsert_single(document_id, records, embeddings, collection_name):
+    ids, documents, metadatas = chroma_store._upsert_payload(document_id, records)
+    chroma_store.get_collection(collection_name).upsert(
+        ids=ids, documents=documents, embeddings=embeddings, metadatas=metadatas
+    )
+
+
+def _upsert_batched(document_id, records, embeddings, collection_name):
+    chroma_store.upsert_chunks(document_id, records, embeddings, collection_name=collection_name)
+
+
+async def run(docs: int, chunks: int, rtt: float) -> dict:
+    rng = random.Random(0)
+    corpus = [_document(chunks, rng) for _ in range(docs)]
+    total = docs * chunks
+
+    # Each document goes into a fresh collection and the modes take turns, so none of them
+    # pays more than the others for a bigger index or for the server compacting earlier writes
+    modes = {
+        "single": _upsert_single,
+        "batched": _upsert_batched,
+        "parallel": chroma_store.upsert_chunks_async,
+    }
+    elapsed = dict.fromkeys(modes, 0.0)
+    for document_id, (records, embeddings) in enumerate(corpus, start=1):
+        order = list(modes)[document_id % len(modes):] + list(modes)[: document_id % len(modes)]
+        for mode in order:
+            _reset("bench_upsert", rtt)
+            started = time.perf_counter()
+            done = modes[mode](document_id, records, embeddings, collection_name="bench_upsert")
+            if asyncio.iscoroutine(done):
+                await done
+            elapsed[mode] += time.perf_counter() - started
+    results = {mode: total / seconds for mode, seconds in elapsed.items()}
+
+    # Idempotency: a partial failure, a retry of the whole document, then a shorter re-upsert
+    collection = _reset("bench_idempotent")._collection
+    records, embeddings = corpus[0]
+    settings = chroma_store.settings
+    retries, settings.chroma_upsert_retries = settings.chroma_upsert_retries, 0
+    chroma_store._collections["bench_idempotent"] = _RemoteCollection(collection, fail_every=2)
+    try:
+        await chroma_store.upsert_chunks_async(1, records, embeddings, collection_name="bench_idempotent")
+        partial_failed = False
+    except ConnectionError:
+        partial_failed = True
+    after_partial = _count(collection, 1)
+    settings.chroma_upsert_retries = retries
+    # With retries, every injected failure is absorbed
+    result = await chroma_store.upsert_chunks_async(1, records, embeddings, collection_name="bench_idempotent")
+    chroma_store._collections["bench_idempotent"] = collection
+    after_retry = _count(collection, 1)
+    chroma_store.upsert_chunks(1, records, embeddings, collection_name="bench_idempotent")
+    after_repeat = _count(collection, 1)
+    shorter = chunks // 2
+    await chroma_store.upsert_chunks_async(1, records[:shorter], embeddings[:shorter], collection_name="bench_idempotent")
+    after_shorter = _count(collection, 1)
+
+    return {
+        "documents": docs,
+        "chunks_per_document": chunks,
+        "dimensions": DIMENSIONS,
+        "rtt_ms": round(rtt * 1000),
+        "batch_size": settings.chroma_upsert_batch_size,
+        "batch_bytes": settings.chroma_upsert_batch_bytes,
+        "concurrency": settings.chroma_upsert_concurrency,
+        "records_per_s": {mode: round(rate) for mode, rate in results.items()},
+        "idempotency": {
+            "partial_upsert_failed": partial_failed,
+            "after_partial": after_partial,
+            "after_retry": after_retry,
+            "retries_absorbed": result.retries,
+            "after_repeat": after_repeat,
+            "after_shorter_reupsert": after_shorter,
+            "expected": [chunks, chunks, shorter],
+        },
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20)
+    parser.add_argument("--chunks", type=int, default=600, help="chunks per document")
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="simulated round trip per upsert call")
+    parser.add_argument("--port", type=int, help="use a Chroma server already listening on localhost")
+    args = parser.parse_args()
+
+    import chromadb
+
+    server, scratch = None, None
+    port = args.port
+    if port is None:
+        scratch = tempfile.TemporaryDirectory()
+        port = _free_port()
+        server = _start_server(scratch.name, port)
+    try:
+        chroma_store._client = chromadb.HttpClient(host="localhost", port=port)
+        print(json.dumps(asyncio.run(run(args.docs, args.chunks, args.rtt_ms / 1000)), indent=2))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+            scratch.cleanup()
+
+
+if __name__ == "__main__":
+    main()
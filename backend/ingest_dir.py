@@ -0,0 +1,64 @@
+"""
+Bulk-ingest every supported document under a directory for one user.
+
+    python ingest_dir.py --email alice@example.com /path/to/scans [--concurrency 4]
+"""
+import argparse
+import asyncio
+import sys
+
+from sqlalchemy import select
+
+from app.database import AsyncSessionLocal
+from app.models import User
+from app.services import bulk_ingest
+from app.services.document_listing import invalidate_document_total
+
+
+async def _report_progress(user_id: int, batch_id: str, interval: float = 2.0) -> None:
+    while True:
+        async with AsyncSessionLocal() as session:
+            p = await bulk_ingest.batch_progress(session, user_id, batch_id)
+        print(
+            f"  {p['completed'] + p['failed']}/{p['total']} done "
+            f"(processing={p['processing']} pending={p['pending']} failed={p['failed']})",
+            flush=True,
+        )
+        if p["done"]:
+            return
+        await asyncio.sleep(interval)
+
+
+async def main(email: str, directory: str, concurrency: int | None) -> int:
+    async with AsyncSessionLocal() as session:
+        user = (await session.execute(select(User).where(User.email == email))).scalar_one_or_none()
+        if user is None:
+            print(f"No user with email {email}", file=sys.stderr)
+            return 1
+
+        items, skipped = await asyncio.to_thread(bulk_ingest.collect_directory, directory)
+        for s in skipped:
+            print(f"  skipped {s['name']}: {s['reason']}")
+        if not items:
+            print("No supported documents found.", file=sys.stderr)
+            return 1
+
+        batch_id, docs = await bulk_ingest.create_documents(session, user.id, items)
+        invalidate_document_total(user.id)
+        print(f"Batch {batch_id}: {len(docs)} documents queued, {len(skipped)} skipped")
+
+    jobs = [(d.id, d.original_path, d.file_type) for d in docs]
+    await asyncio.gather(
+        bulk_ingest.process_documents(jobs, concurrency),
+        _report_progress(user.id, batch_id),
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory")
+    parser.add_argument("--email", required=True, help="Owner of the ingested documents")
+    parser.add_argument("--concurrency", type=int, default=None, help="Parallel pipelines (default: settings)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.email, args.directory, args.concurrency)))
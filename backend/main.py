@@ -1,6 +1,7 @@
 """
 FastAPI application entry point for OCR-to-RAG pipeline.
 """
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
@@ -8,8 +9,14 @@ from fastapi.middleware.cors import CORSMiddleware
 from pathlib import Path
 
 from app.config import get_settings
-from app.database import init_db
-from app.routers import upload, documents, query, auth
+from app.database import init_db, AsyncSessionLocal
+from app.routers import upload, documents, query, auth, admin, metrics
+from app.services import reindex
+from app.services.warmup import warm_up
+from app.services.upload_sessions import gc_loop as upload_session_gc_loop
+from app.services.vector_cleanup import cleanup_loop as vector_cleanup_loop
+from app.utils.gzip import SelectiveGZipMiddleware
+from app.utils.upload_limit import UploadSizeLimitMiddleware
 
 logging.basicConfig(
     level=logging.INFO,
@@ -26,9 +33,20 @@ async def lifespan(app: FastAPI):
     Path(settings.storage_dir).mkdir(parents=True, exist_ok=True)
     (Path(settings.storage_dir) / "uploads").mkdir(exist_ok=True)
     (Path(settings.storage_dir) / "pdfs").mkdir(exist_ok=True)
+    upload_gc_task = asyncio.create_task(upload_session_gc_loop())
+    vector_cleanup_task = asyncio.create_task(vector_cleanup_loop())
+    async with AsyncSessionLocal() as session:
+        await reindex.load_index_pointer(session)
+    index_watch_task = asyncio.create_task(reindex.watch_loop())
+    warmup_task = asyncio.create_task(warm_up()) if settings.warmup_on_startup else None
     logger.info("OCR-to-RAG API is online.")
     yield
     logger.info("Shutting down...")
+    upload_gc_task.cancel()
+    vector_cleanup_task.cancel()
+    index_watch_task.cancel()
+    if warmup_task:
+        warmup_task.cancel()
 
 
 from fastapi.staticfiles import StaticFiles
@@ -48,11 +66,23 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(
+    SelectiveGZipMiddleware,
+    minimum_size=settings.gzip_minimum_size,
+    compresslevel=settings.gzip_compresslevel,
+)
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_bytes=settings.max_upload_bytes,
+    path_limits={"/upload/bulk": settings.bulk_max_archive_bytes},
+)
 
 app.include_router(auth.router)
 app.include_router(upload.router)
 app.include_router(documents.router)
 app.include_router(query.router)
+app.include_router(admin.router)
+app.include_router(metrics.router)
 
 @app.get("/health", tags=["system"])
 async def health():
@@ -0,0 +1,35 @@
+"""
+Re-chunk and re-embed every document's stored OCR text into a new ChromaDB
+collection and swap it in, e.g. after changing chunk sizes or the Cohere model.
+Interrupted runs resume from their cursor when started again.
+
+    python reindex.py --dry-run
+    python reindex.py [--concurrency 8]
+"""
+import argparse
+import asyncio
+import json
+import logging
+
+from app.database import AsyncSessionLocal
+from app.services import reindex
+
+
+async def main(dry_run: bool, concurrency: int | None) -> None:
+    async with AsyncSessionLocal() as session:
+        if dry_run:
+            print(json.dumps(await reindex.estimate(session), indent=2))
+            return
+        await reindex.load_index_pointer(session)
+        version = await reindex.start_or_resume(session)
+        print(f"Building {version.collection_name} from document id > {version.cursor_document_id}")
+    await reindex.run_reindex(version.id, concurrency)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Only estimate chunks, embed calls and cost")
+    parser.add_argument("--concurrency", type=int, default=None, help="Parallel embed/upsert calls (default: settings)")
+    args = parser.parse_args()
+    asyncio.run(main(args.dry_run, args.concurrency))
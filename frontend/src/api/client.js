@@ -50,6 +50,7 @@ export const getMe = () =>
 export const fetchDocuments = () => client.get('/documents').then(r => r.data)
 export const fetchDocument = (id) => client.get(`/documents/${id}`).then(r => r.data)
 export const deleteDocument = (id) => client.delete(`/documents/${id}`).then(r => r.data)
+export const cancelDocument = (id) => client.post(`/documents/${id}/cancel`).then(r => r.data)
 export const getDownloadUrl = (id) => `${API_BASE}/documents/${id}/download`
 export const downloadDocument = (id) => client.get(`/documents/${id}/download`, { responseType: 'blob' }).then(r => r.data)
 